@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class FriendshipsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.friendships'
+
+    def ready(self):
+        import apps.friendships.signals
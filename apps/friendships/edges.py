@@ -0,0 +1,82 @@
+from apps.friendships.models import Friendship, FriendshipEdge
+from utils.consistency import check_rows
+
+'''
+Maintains FriendshipEdge, the per-user side of friendships, so that a user's
+friends, incoming requests and outgoing requests are each a range of one
+index instead of an OR across the two users of Friendship:
+
+    (owner=X, status='accepted')  the friends of X
+    (owner=X, status='incoming')  the requests X received
+    (owner=X, status='outgoing')  the requests X sent
+
+Friendship.save() writes both edges of the friendship in its transaction
+(one upsert), and deleting a friendship or a user cascades to its edges.
+
+`manage.py checkfriendshipedges [--repair]` finds the edges that updates
+bypassing save() left wrong (see utils/consistency.py).
+'''
+
+EDGE_FIELDS = ['owner_id', 'friend_id', 'friendship_id', 'status', 'since']
+
+def expected_edges(friendships):
+    '''
+    Returns the edges of friendships.
+
+    Args:
+        friendships (iterable of tuple): (id, low_id, high_id, direction, status, created_at)
+            of the friendships.
+
+    Returns:
+        set of tuple: (owner_id, friend_id, friendship_id, status, since) edges.
+    '''
+    edges = set()
+    for friendship_id, low_id, high_id, direction, status, created_at in friendships:
+        if status == Friendship.Status.ACCEPTED:
+            low_status = high_status = FriendshipEdge.Status.ACCEPTED
+        elif direction == Friendship.Direction.FROM_LOW:
+            low_status, high_status = FriendshipEdge.Status.OUTGOING, FriendshipEdge.Status.INCOMING
+        else:
+            low_status, high_status = FriendshipEdge.Status.INCOMING, FriendshipEdge.Status.OUTGOING
+        edges.add((low_id, high_id, friendship_id, low_status, created_at))
+        edges.add((high_id, low_id, friendship_id, high_status, created_at))
+    return edges
+
+def create_edges(edges):
+    ''' Inserts edges, replacing the existing edges of the same users. '''
+    FriendshipEdge.objects.bulk_create(
+            [FriendshipEdge(**dict(zip(EDGE_FIELDS, edge))) for edge in edges],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['owner', 'friend'],
+            update_fields=['friendship', 'status', 'since']
+    )
+
+def write_edges(friendship):
+    ''' Writes the two edges of a saved friendship. '''
+    create_edges(expected_edges([(
+            friendship.id, friendship.low_id, friendship.high_id,
+            friendship.direction, friendship.status, friendship.created_at
+    )]))
+
+def rewrite_edges(friendship_ids, edges):
+    FriendshipEdge.objects.filter(friendship_id__in=friendship_ids).delete()
+    create_edges(edges)
+
+def check(repair=False, chunk_size=1000):
+    '''
+    Compares the edge table with the friendships (see utils/consistency.py).
+
+    Returns:
+        tuple: (missing, extra) numbers of edges.
+    '''
+    return check_rows(
+            Friendship.objects.values_list('id', 'low_id', 'high_id', 'direction', 'status', 'created_at'),
+            expected_edges,
+            lambda first_id, last_id: FriendshipEdge.objects.filter(
+                    friendship_id__gte=first_id, friendship_id__lte=last_id).values_list(*EDGE_FIELDS),
+            rewrite_edges,
+            EDGE_FIELDS.index('friendship_id'),
+            repair=repair,
+            chunk_size=chunk_size
+    )
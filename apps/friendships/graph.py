@@ -0,0 +1,235 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from apps.friendships.models import FriendshipEdge
+from apps.users.models import User
+from utils.pagination import EntryPagination
+from array import array
+import bisect
+import logging
+import threading
+import time
+
+'''
+In-memory friendship graph.
+
+Every process keeps the accepted friendships in compressed sparse row (CSR)
+form, two flat arrays indexed by user id:
+
+    offsets    array('q'): the friends of user u are neighbors[offsets[u]:offsets[u + 1]]
+    neighbors  array('i'): the friend ids of every user, sorted per user
+
+so a user's friend count is a subtraction, "are A and B friends" a binary
+search of A's friends, and the mutual friends of two users an intersection
+of two sorted arrays (binary searches of the larger one). No query is made:
+counts and checks take about 3µs, and mutual friends about 10µs for users
+with 20 friends each (benchmarks/bench_graph.py).
+
+Memory: every friendship is stored once per user, 4 bytes each (8 if user ids
+reach 2**31), plus 8 bytes of offset per user id. A million friendships take
+8MB and a million users 8MB more. The arrays are built from the accepted
+edges (see apps/friendships/edges.py) in a single ordered read, about 4s per
+million friendships.
+
+The graph is loaded on first use. Friendships saved or deleted by the process
+are recorded when their transaction commits (see apps/friendships/signals.py)
+in a delta overlay, per user sets of added and removed friends that lookups
+merge with the arrays. Every FRIEND_GRAPH_REFRESH seconds a background thread
+rebuilds the arrays from the database, which folds the overlay in and picks
+up the changes of other processes.
+
+Settings:
+    FRIEND_GRAPH_REFRESH (int): Seconds between rebuilds of the graph. Defaults to 300.
+'''
+
+logger = logging.getLogger(__name__)
+
+def get_refresh():
+    return getattr(settings, 'FRIEND_GRAPH_REFRESH', 300)
+
+def intersect(first, second):
+    '''
+    Returns the common items of two sorted sequences, sorted.
+
+    Each item of the shorter sequence is binary searched in the longer one,
+    from the position of the previous item, so the cost is
+    O(short * log(long)) with the loop over the short one only.
+    '''
+    if len(first) > len(second):
+        first, second = second, first
+    common = []
+    position = 0
+    end = len(second)
+    for item in first:
+        position = bisect.bisect_left(second, item, position)
+        if position == end:
+            break
+        if second[position] == item:
+            common.append(item)
+    return common
+
+def build_arrays():
+    '''
+    Reads the accepted friendships into CSR arrays.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    max_id = User.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    offsets = array('q')
+    neighbors = array('i' if max_id < 2 ** 31 else 'q')
+    rows = (FriendshipEdge.objects.filter(status='accepted').order_by('owner_id', 'friend_id')
+            .values_list('owner_id', 'friend_id').iterator(chunk_size=10000))
+    for owner_id, friend_id in rows:
+        while len(offsets) <= owner_id:
+            offsets.append(len(neighbors))
+        neighbors.append(friend_id)
+    offsets.append(len(neighbors))
+    return offsets, neighbors
+
+class FriendGraph:
+    ''' The friendship graph of a process. See the module docstring. '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Serializes loads, which take long: lookups only wait on self.lock.
+        self.load_lock = threading.Lock()
+        self.offsets = array('q', [0])
+        self.neighbors = array('i')
+        self.added = {}
+        self.removed = {}
+        # Changes recorded while the arrays are rebuilt, replayed on the new ones.
+        self.replay = None
+        self.loaded_at = None
+        self.reloading = False
+
+    def load(self):
+        ''' Replaces the graph with the friendships of the database. '''
+        with self.load_lock:
+            self.rebuild()
+
+    def rebuild(self):
+        ''' Rebuilds the arrays. Call with the load lock held. '''
+        replay = []
+        with self.lock:
+            self.replay = replay
+        try:
+            offsets, neighbors = build_arrays()
+        except Exception:
+            with self.lock:
+                self.replay = None
+            raise
+        with self.lock:
+            self.offsets, self.neighbors = offsets, neighbors
+            self.added, self.removed = {}, {}
+            for change in replay:
+                self.apply(*change)
+            self.replay = None
+            self.loaded_at = time.monotonic()
+            self.reloading = False
+
+    def reload_in_background(self):
+        with self.lock:
+            if self.reloading:
+                return
+            self.reloading = True
+
+        def reload():
+            try:
+                self.load()
+            except Exception:
+                logger.warning('Failed to reload the friendship graph', exc_info=True)
+                with self.lock:
+                    self.reloading = False
+            finally:
+                # The thread got its own connection; don't leak it.
+                connection.close()
+
+        threading.Thread(target=reload, daemon=True).start()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None:
+            with self.load_lock:
+                # Another request may have loaded it while this one waited.
+                if self.loaded_at is None:
+                    self.rebuild()
+        elif time.monotonic() - self.loaded_at >= get_refresh():
+            self.reload_in_background()
+
+    def span(self, user_id):
+        ''' Returns the (start, end) of a user's friends in the arrays. Call with the lock held. '''
+        if user_id + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[user_id], self.offsets[user_id + 1]
+
+    def in_arrays(self, user_id, friend_id):
+        ''' Whether the arrays hold a friendship. Call with the lock held. '''
+        start, end = self.span(user_id)
+        position = bisect.bisect_left(self.neighbors, friend_id, start, end)
+        return position < end and self.neighbors[position] == friend_id
+
+    def apply(self, user_id, friend_id, accepted):
+        ''' Applies a change of a friendship to the overlay. Call with the lock held. '''
+        for owner_id, other_id in ((user_id, friend_id), (friend_id, user_id)):
+            undo, do = (self.removed, self.added) if accepted else (self.added, self.removed)
+            if other_id in undo.get(owner_id, ()):
+                undo[owner_id].discard(other_id)
+                if not undo[owner_id]:
+                    del undo[owner_id]
+            elif self.in_arrays(owner_id, other_id) != accepted:
+                do.setdefault(owner_id, set()).add(other_id)
+
+    def record(self, user_id, friend_id, accepted):
+        '''
+        Records that two users became friends (accepted) or stopped being
+        friends. Ignored until the graph is loaded, since loading reads it.
+        '''
+        with self.lock:
+            if self.replay is not None:
+                self.replay.append((user_id, friend_id, accepted))
+            elif self.loaded_at is None:
+                return
+            self.apply(user_id, friend_id, accepted)
+
+    def friends(self, user_id):
+        ''' Returns the sorted ids of a user's friends. '''
+        self.ensure_loaded()
+        with self.lock:
+            start, end = self.span(user_id)
+            friends = self.neighbors[start:end].tolist()
+            added, removed = self.added.get(user_id), self.removed.get(user_id)
+            if added or removed:
+                friends = sorted(set(friends).difference(removed or ()).union(added or ()))
+        return friends
+
+    def friend_count(self, user_id):
+        self.ensure_loaded()
+        with self.lock:
+            start, end = self.span(user_id)
+            return end - start + len(self.added.get(user_id, ())) - len(self.removed.get(user_id, ()))
+
+    def are_friends(self, user_id, other_id):
+        self.ensure_loaded()
+        with self.lock:
+            if other_id in self.added.get(user_id, ()):
+                return True
+            if other_id in self.removed.get(user_id, ()):
+                return False
+            return self.in_arrays(user_id, other_id)
+
+    def mutual_friends(self, user_id, other_id):
+        ''' Returns the sorted ids of the friends two users have in common. '''
+        return intersect(self.friends(user_id), self.friends(other_id))
+
+graph = FriendGraph()
+
+def friendship_changed(user_id, friend_id, accepted):
+    graph.record(user_id, friend_id, accepted)
+
+class MutualFriendsPagination(EntryPagination):
+    ''' Paginates the mutual friends of two users by id, from the graph. '''
+    names = ['id']
+
+    def get_entries(self, request, view, cursor, limit):
+        mutual = graph.mutual_friends(view.kwargs['user_id'], view.kwargs['other_id'])
+        end = len(mutual) if cursor is None else bisect.bisect_left(mutual, cursor[0])
+        return [(user_id,) for user_id in reversed(mutual[max(end - limit, 0):end])]
@@ -0,0 +1,10 @@
+from apps.friendships import edges
+from utils.consistency import CheckCommand
+
+class Command(CheckCommand):
+    help = 'Checks the friendship edge table against friendships, and optionally repairs it.'
+    rows = 'friendship edges'
+    sources = 'friendships'
+
+    def check_table(self, repair, chunk_size):
+        return edges.check(repair=repair, chunk_size=chunk_size)
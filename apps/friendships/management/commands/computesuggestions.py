@@ -0,0 +1,16 @@
+from apps.jobs.management.base import PeriodicTaskCommand
+from apps.friendships import suggestions
+from apps.friendships.tasks import compute_friend_suggestions
+
+class Command(PeriodicTaskCommand):
+    help = 'Recomputes the friend suggestions of every user, or schedules their periodic recomputation.'
+    task = compute_friend_suggestions
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of user ids whose suggestions are replaced per transaction.')
+
+    def run(self, **options):
+        stored = suggestions.compute_suggestions(chunk_size=options['chunk_size'])
+        return f'Stored {stored} friend suggestions.'
@@ -1,6 +1,15 @@
-from django.db.models import Manager, Q
+from django.db.models import Manager
 
 class FriendshipManager(Manager):
+    '''
+    Queries of friendships. A user's friendships are looked up through their
+    edges (see apps/friendships/edges.py): one range of the edge index, then
+    the friendships by primary key.
+    '''
+    def edges(self):
+        ''' Returns the manager of FriendshipEdge. '''
+        return self.model._meta.get_field('edges').related_model.objects
+
     def friendships_of_user(self, user):
         '''
         Retrieve friendships of a given user that are in the accepted status.
@@ -19,7 +28,7 @@ class FriendshipManager(Manager):
                 # Due to select_related, this won't query the database
                 print(f.user1.username)
         '''
-        return self.filter(Q(user1=user) | Q(user2=user), status='accepted').select_related('user1', 'user2')
+        return self.filter(edges__owner=user, edges__status='accepted').select_related('low', 'high')
 
     def pending_friendships_of_user(self, user):
         '''
@@ -37,7 +46,8 @@ class FriendshipManager(Manager):
             pending = Friendship.objects.pending_friendships_of_user(user)
         '''
 
-        return self.filter(Q(user1=user) | Q(user2=user), status='pending').select_related('user1', 'user2')
+        return (self.filter(edges__owner=user, edges__status__in=['incoming', 'outgoing'])
+                .select_related('low', 'high'))
     def incoming_requests_for_user(self, user):
         '''
         Retrieve friendships that are incoming and pending for a given user.
@@ -48,12 +58,12 @@ class FriendshipManager(Manager):
             user (apps.users.models.User): The user for whom to retrieve incoming friendship requests.
 
         Returns:
-            QuerySet: A QuerySet containing the friendships that are pending and have user1 set to user.
+            QuerySet: A QuerySet containing the friendships that are pending and have user2 set to user.
 
         Example:
             incoming_requests = Friendship.objects.incoming_requests_for_user(user)
         '''
-        return self.filter(user2=user, status='pending').select_related('user1', 'user2')
+        return self.filter(edges__owner=user, edges__status='incoming').select_related('low', 'high')
 
     def outgoing_requests_for_user(self, user):
         '''
@@ -65,10 +75,63 @@ class FriendshipManager(Manager):
             user (apps.users.models.User): The user for whom to retrieve incoming friendship requests.
 
         Returns:
-            QuerySet: A QuerySet containing the friendships that are pending and have user2 set to user.
+            QuerySet: A QuerySet containing the friendships that are pending and have user1 set to user.
 
         Example:
-            incoming_requests = Friendship.objects.incoming_requests_for_user(user)
+            outgoing_requests = Friendship.objects.outgoing_requests_for_user(user)
+        '''
+        return self.filter(edges__owner=user, edges__status='outgoing').select_related('low', 'high')
+
+
+    def friend_ids_of_user(self, user_id):
+        '''
+        Retrieve the ids of the friends (accepted friendships) of a given user.
+
+        Args:
+            user_id (int): The id of the user for whom to retrieve friends.
+
+        Returns:
+            set: The ids of the user's friends.
+        '''
+        return set(self.edges().of_user(user_id, 'accepted').values_list('friend_id', flat=True))
+
+    def pending_pairs(self):
+        '''
+        Retrieve the users of every pending friendship.
+
+        Returns:
+            QuerySet: (low_id, high_id) tuples of the pending friendships.
         '''
-        return self.filter(user1=user, status='pending').select_related('user1', 'user2')
+        return self.filter(status='pending').values_list('low_id', 'high_id')
+
+    def between(self, user, other):
+        '''
+        Retrieve the friendship (accepted or pending, in either direction) of two users.
+
+        A single lookup of the unique (low, high) index.
 
+        Args:
+            user (apps.users.models.User): One of the users.
+            other (apps.users.models.User): The other user.
+
+        Returns:
+            QuerySet: A QuerySet containing the friendship of the two users, if any.
+        '''
+        low_id, high_id = sorted((user.pk, other.pk))
+        return self.filter(low_id=low_id, high_id=high_id)
+
+class FriendshipEdgeManager(Manager):
+    def of_user(self, user, status):
+        '''
+        Retrieve the edges of a user with a given status, most recent first.
+
+        A single range of the (owner, status, since) index.
+
+        Args:
+            user (apps.users.models.User or int): The owner of the edges, or their id.
+            status (str): 'accepted' (friends), 'incoming' or 'outgoing' (requests).
+
+        Returns:
+            QuerySet: A QuerySet containing the edges.
+        '''
+        return self.filter(owner=user, status=status).order_by('-since', '-id')
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user1', 'status', '-created_at', '-id'], name='friendship_user1_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user2', 'status', '-created_at', '-id'], name='friendship_user2_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('friendships', '0002_friendship_friendship_user1_recent_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='friendship',
+            name='low',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='low_friendships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='friendship',
+            name='high',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='high_friendships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='friendship',
+            name='direction',
+            field=models.CharField(choices=[('from_low', 'From Low'), ('from_high', 'From High')], default='from_low', max_length=10),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+from django.db.models import Exists, F, OuterRef
+
+CHUNK_SIZE = 1000
+
+def keep_first(friendship, twin):
+    ''' Whether a friendship is kept over its reversed twin: accepted first, then the oldest. '''
+    return (friendship.status != 'accepted', friendship.created_at, friendship.id) <= \
+            (twin.status != 'accepted', twin.created_at, twin.id)
+
+def dedupe(Friendship):
+    '''
+    Deletes one friendship of each pair stored in both directions, (A, B) and
+    (B, A), keeping the accepted one, or else the oldest.
+    '''
+    reversed_twin = Friendship.objects.filter(user1_id=OuterRef('user2_id'), user2_id=OuterRef('user1_id'))
+    last_id = 0
+    while True:
+        chunk = list(Friendship.objects.filter(Exists(reversed_twin), id__gt=last_id, user1_id__lt=F('user2_id'))
+                .order_by('id')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        twins = {
+                (twin.user2_id, twin.user1_id): twin
+                for twin in Friendship.objects.filter(
+                        user2_id__in=[friendship.user1_id for friendship in chunk],
+                        user1_id__in=[friendship.user2_id for friendship in chunk]
+                )
+        }
+        deleted = []
+        for friendship in chunk:
+            twin = twins.get((friendship.user1_id, friendship.user2_id))
+            if twin is not None:
+                deleted.append(twin.id if keep_first(friendship, twin) else friendship.id)
+        Friendship.objects.filter(id__in=deleted).delete()
+
+def populate(apps, schema_editor):
+    ''' Stores every friendship as its canonical (low, high) pair and direction. '''
+    Friendship = apps.get_model('friendships', 'Friendship')
+    dedupe(Friendship)
+    last_id = 0
+    while True:
+        chunk = list(Friendship.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'user1_id', 'user2_id')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for friendship in chunk:
+            if friendship.user1_id < friendship.user2_id:
+                friendship.low_id, friendship.high_id, friendship.direction = friendship.user1_id, friendship.user2_id, 'from_low'
+            else:
+                friendship.low_id, friendship.high_id, friendship.direction = friendship.user2_id, friendship.user1_id, 'from_high'
+        Friendship.objects.bulk_update(chunk, ['low', 'high', 'direction'])
+
+def restore(apps, schema_editor):
+    ''' Restores the sender and recipient columns from the pair (deleted twins aren't restored). '''
+    Friendship = apps.get_model('friendships', 'Friendship')
+    last_id = 0
+    while True:
+        chunk = list(Friendship.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'low_id', 'high_id', 'direction')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        for friendship in chunk:
+            if friendship.direction == 'from_low':
+                friendship.user1_id, friendship.user2_id = friendship.low_id, friendship.high_id
+            else:
+                friendship.user1_id, friendship.user2_id = friendship.high_id, friendship.low_id
+        Friendship.objects.bulk_update(chunk, ['user1', 'user2'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0003_friendship_pair'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, restore),
+    ]
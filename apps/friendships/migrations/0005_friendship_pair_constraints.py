@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('friendships', '0004_populate_friendship_pair'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='friendship',
+            name='friendship_user1_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='friendship',
+            name='friendship_user2_recent_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='friendship',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='friendship',
+            name='user1',
+        ),
+        migrations.RemoveField(
+            model_name='friendship',
+            name='user2',
+        ),
+        migrations.AlterField(
+            model_name='friendship',
+            name='low',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_friendships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='friendship',
+            name='high',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='high_friendships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.UniqueConstraint(fields=('low', 'high'), name='friendship_pair_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.CheckConstraint(check=models.Q(('low__lt', models.F('high'))), name='friendship_pair_ordered'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['low', 'status', '-created_at', '-id'], name='friendship_low_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['high', 'status', '-created_at', '-id'], name='friendship_high_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('friendships', '0005_friendship_pair_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendshipEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('accepted', 'Accepted'), ('incoming', 'Incoming'), ('outgoing', 'Outgoing')], max_length=10)),
+                ('since', models.DateTimeField()),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('friendship', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edges', to='friendships.friendship')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='friendshipedge',
+            index=models.Index(fields=['owner', 'status', '-since', '-id'], name='friendship_edge_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friendshipedge',
+            constraint=models.UniqueConstraint(fields=('owner', 'friend'), name='friendship_edge_unique'),
+        ),
+    ]
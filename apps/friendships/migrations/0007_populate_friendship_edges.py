@@ -0,0 +1,40 @@
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+def populate(apps, schema_editor):
+    ''' Writes the two edges of every existing friendship. '''
+    Friendship = apps.get_model('friendships', 'Friendship')
+    FriendshipEdge = apps.get_model('friendships', 'FriendshipEdge')
+    last_id = 0
+    while True:
+        chunk = list(Friendship.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'low_id', 'high_id', 'direction', 'status', 'created_at')[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        edges = []
+        for friendship_id, low_id, high_id, direction, status, created_at in chunk:
+            if status == 'accepted':
+                low_status = high_status = 'accepted'
+            elif direction == 'from_low':
+                low_status, high_status = 'outgoing', 'incoming'
+            else:
+                low_status, high_status = 'incoming', 'outgoing'
+            edges += [
+                    FriendshipEdge(owner_id=low_id, friend_id=high_id, friendship_id=friendship_id,
+                                   status=low_status, since=created_at),
+                    FriendshipEdge(owner_id=high_id, friend_id=low_id, friendship_id=friendship_id,
+                                   status=high_status, since=created_at)
+            ]
+        FriendshipEdge.objects.bulk_create(edges)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0006_friendshipedge'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
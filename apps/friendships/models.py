@@ -1,20 +1,36 @@
-from django.db import models
+from django.db import models, transaction
 from apps.users.models import User
-from apps.friendships.managers import FriendshipManager
+from apps.friendships.managers import FriendshipManager, FriendshipEdgeManager
 
 class Friendship(models.Model):
     '''
     Represents a friendship between two users.
 
     Two users can be seen as friends if the status of their friendship is ACCEPTED.
+
+    A pair of users is stored once, in canonical order: `low` holds the user
+    with the lower id and `high` the other one, so the unique index on
+    (low, high) also rejects the reversed pair and "are A and B related" is a
+    single lookup of that index (see FriendshipManager.between). `direction`
+    records who sent the request.
+
+    user1 (the sender) and user2 (the recipient) are properties over the pair;
+    they can be passed to the constructor and assigned like fields, but
+    queries must use low, high and direction.
     '''
     class Status(models.TextChoices):
         ''' Possible status values for a friendship '''
         PENDING = 'pending'
         ACCEPTED = 'accepted'
 
-    user1 = models.ForeignKey(User, related_name='user1_friends', on_delete=models.CASCADE)
-    user2 = models.ForeignKey(User, related_name='user2_friends', on_delete=models.CASCADE)
+    class Direction(models.TextChoices):
+        ''' Which user of the pair sent the request '''
+        FROM_LOW = 'from_low'
+        FROM_HIGH = 'from_high'
+
+    low = models.ForeignKey(User, related_name='low_friendships', on_delete=models.CASCADE)
+    high = models.ForeignKey(User, related_name='high_friendships', on_delete=models.CASCADE)
+    direction = models.CharField(choices=Direction.choices, default=Direction.FROM_LOW, max_length=10)
     status = models.CharField(choices=Status.choices, default=Status.PENDING, max_length=10)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -22,7 +38,72 @@ class Friendship(models.Model):
     objects = FriendshipManager()
 
     class Meta:
-        unique_together = ['user1', 'user2']
+        constraints = [
+            models.UniqueConstraint(fields=['low', 'high'], name='friendship_pair_unique'),
+            models.CheckConstraint(check=models.Q(low__lt=models.F('high')), name='friendship_pair_ordered')
+        ]
+        indexes = [
+            # A user's friendships and requests, most recent first (keyset pagination).
+            models.Index(fields=['low', 'status', '-created_at', '-id'], name='friendship_low_recent_idx'),
+            models.Index(fields=['high', 'status', '-created_at', '-id'], name='friendship_high_recent_idx')
+        ]
+
+    def save(self, *args, **kwargs):
+        # Imported here: edges depend on the models.
+        from apps.friendships import edges
+        # The edges are written in the transaction of the friendship.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            edges.write_edges(self)
+
+    def set_users(self, sender, recipient):
+        ''' Stores the pair of a request from sender to recipient in canonical order. '''
+        if sender.pk < recipient.pk:
+            self.low, self.high, self.direction = sender, recipient, self.Direction.FROM_LOW
+        else:
+            self.low, self.high, self.direction = recipient, sender, self.Direction.FROM_HIGH
+
+    def set_user(self, role, user):
+        # The constructor assigns user1 and user2 one at a time; the pair is
+        # stored once both are known.
+        pending = self.__dict__.setdefault('_pending_users', {})
+        pending[role] = user
+        if self.low_id is not None and self.high_id is not None:
+            pending.setdefault('user1', self.user1)
+            pending.setdefault('user2', self.user2)
+        if 'user1' in pending and 'user2' in pending:
+            del self.__dict__['_pending_users']
+            self.set_users(pending['user1'], pending['user2'])
+
+    @property
+    def sends_from_low(self):
+        return self.direction == self.Direction.FROM_LOW
+
+    @property
+    def user1(self):
+        ''' The user who sent the request. '''
+        return self.low if self.sends_from_low else self.high
+
+    @user1.setter
+    def user1(self, user):
+        self.set_user('user1', user)
+
+    @property
+    def user2(self):
+        ''' The user who received the request. '''
+        return self.high if self.sends_from_low else self.low
+
+    @user2.setter
+    def user2(self, user):
+        self.set_user('user2', user)
+
+    @property
+    def user1_id(self):
+        return self.low_id if self.sends_from_low else self.high_id
+
+    @property
+    def user2_id(self):
+        return self.high_id if self.sends_from_low else self.low_id
 
     def get_friend_of_user(self, user):
         '''
@@ -31,7 +112,7 @@ class Friendship(models.Model):
         IMPORTANT NOTES: 
             - 'user' should be a user within this friendship
             - If the users aren't prefetched, this function will result in a database hit.
-              Make sure to do select_related('user1', 'user2') on the friendship query before
+              Make sure to do select_related('low', 'high') on the friendship query before
               calling this function, especially if there are mulitple friendship objects.
 
         Args:
@@ -42,11 +123,71 @@ class Friendship(models.Model):
                                                       None if the user doesn't exist in this friendship.
         '''
         friend = None
-        if user == self.user1:
-            friend = self.user2
-        elif user == self.user2:
-            friend = self.user1
+        if user.pk == self.low_id:
+            friend = self.high
+        elif user.pk == self.high_id:
+            friend = self.low
         return friend
 
     def __str__(self):
         return f'{self.user1.username} <-> {self.user2.username}'
+
+class FriendshipEdge(models.Model):
+    '''
+    One side of a friendship, owned by one of its users (see
+    apps/friendships/edges.py).
+
+    Every friendship has two edges, (low -> high) and (high -> low), so a
+    user's friends, incoming requests and outgoing requests are each a single
+    range of the (owner, status, since) index instead of an OR across the low
+    and high columns of Friendship.
+
+    Attributes:
+        status: ACCEPTED for friends, INCOMING for a request the owner received
+            and OUTGOING for a request the owner sent.
+        since: When the request was sent (Friendship.created_at).
+    '''
+    class Status(models.TextChoices):
+        ''' Possible status values for an edge '''
+        ACCEPTED = 'accepted'
+        INCOMING = 'incoming'
+        OUTGOING = 'outgoing'
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    friend = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    friendship = models.ForeignKey(Friendship, on_delete=models.CASCADE, related_name='edges')
+    status = models.CharField(choices=Status.choices, max_length=10)
+    since = models.DateTimeField()
+
+    objects = FriendshipEdgeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'friend'], name='friendship_edge_unique')
+        ]
+        indexes = [
+            # A user's friends or requests, most recent first (keyset pagination).
+            models.Index(fields=['owner', 'status', '-since', '-id'], name='friendship_edge_recent_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.owner_id} -> {self.friend_id} ({self.status})'
+
+class FriendSuggestion(models.Model):
+    '''
+    Someone a user may know: a friend of their friends who isn't their friend
+    and has no pending request with them, ranked by their number of mutual
+    friends (see apps/friendships/suggestions.py).
+    '''
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    mutual_friends = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'candidate'], name='friend_suggestion_unique')
+        ]
+        indexes = [
+            # A user's suggestions, most mutual friends first (keyset pagination).
+            models.Index(fields=['user', '-mutual_friends', '-id'], name='friend_suggestion_rank_idx')
+        ]
@@ -6,7 +6,7 @@ class FriendshipContainsUser(BasePermission):
     def has_object_permission(self, request, view, obj):
         if not request.user.is_authenticated:
             return False
-        return request.user == obj.user1 or request.user == obj.user2
+        return request.user.id in (obj.low_id, obj.high_id)
 
 class IsRequestedUser(BasePermission):
     ''' Checks if the user in the url is the user making the request. '''
@@ -30,5 +30,5 @@ class IsRecipientUser(BasePermission):
     def has_object_permission(self, request, view, obj):
         if not request.user.is_authenticated:
             return False
-        return obj.user2 == request.user
+        return obj.user2_id == request.user.id
 
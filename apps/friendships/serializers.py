@@ -1,9 +1,26 @@
 from rest_framework import serializers
-from apps.friendships.models import Friendship
+from rest_framework.relations import PKOnlyObject
+from apps.friendships.models import Friendship, FriendshipEdge, FriendSuggestion
 from apps.users.models import User
 from apps.users.serializers import UserSerializer
-from django.db.models import Q
 from django.urls import reverse
+from utils.links import CachedHyperlinkedRelatedField
+from utils.query_planner import uses_related
+from utils.serializers import BaseHyperlinkedSerializer
+from utils.compiled import CompiledListSerializer, render_nested
+
+class PairUserField(serializers.HyperlinkedRelatedField):
+    '''
+    Links to the sender (user1) or recipient (user2) of a friendship, read from
+    its canonical pair (see apps/friendships/models.py) without loading the user.
+    '''
+    def __init__(self, **kwargs):
+        kwargs.setdefault('view_name', 'user-detail')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return PKOnlyObject(pk=getattr(instance, f'{self.source}_id'))
 
 class CreateFriendshipSerializer(serializers.HyperlinkedModelSerializer):
     '''
@@ -19,11 +36,13 @@ class CreateFriendshipSerializer(serializers.HyperlinkedModelSerializer):
         view_name='user-detail',
         write_only=True
     )
+    user1 = PairUserField()
+    user2 = PairUserField()
  
     class Meta:
         model = Friendship
         fields = ['self', 'sender', 'to', 'user1', 'user2', 'status']
-        read_only_fields = ['user1', 'user2', 'status']
+        read_only_fields = ['status']
 
     def validate(self, data):
         sender = data['sender']
@@ -32,7 +51,7 @@ class CreateFriendshipSerializer(serializers.HyperlinkedModelSerializer):
         if sender == to:
             raise serializers.ValidationError({"to": "You cannot add yourself as a friend."})
 
-        friendship = Friendship.objects.filter(Q(user1=sender, user2=to) | Q(user1=to, user2=sender)).first()
+        friendship = Friendship.objects.between(sender, to).first()
         if friendship:
             raise serializers.ValidationError([
                 "Friendship already exists. Modify the friendship at the existing URL.",
@@ -48,67 +67,88 @@ class CreateFriendshipSerializer(serializers.HyperlinkedModelSerializer):
         validated_data['user2'] = validated_data.pop('to')
         return super().create(validated_data)
 
-class FriendshipSerializer(serializers.HyperlinkedModelSerializer):
+class FriendshipSerializer(BaseHyperlinkedSerializer):
     '''
     Serializer class for displaying friendship details.
     '''
+    user1 = PairUserField()
+    user2 = PairUserField()
+
     class Meta:
         model = Friendship
         fields = ['self', 'user1', 'user2', 'status']
-        read_only_fields = ['user1', 'user2']
+        list_serializer_class = CompiledListSerializer
 
-class AcceptedFriendshipSerializer(serializers.HyperlinkedModelSerializer):
+class AcceptedFriendshipSerializer(BaseHyperlinkedSerializer):
     '''
     Serializer class for displaying a list of friends (status = accepted).
-    
+
+    Renders the edges of the user in the url (see apps/friendships/edges.py),
+    linking to their friendships.
+
     NOTE: requires "request" in the context dict from the calling view.
     '''
+    self = CachedHyperlinkedRelatedField(
+            source='friendship',
+            view_name='friendship-detail',
+            read_only=True
+    )
     friend = serializers.SerializerMethodField()
 
     class Meta:
-        model = Friendship
+        model = FriendshipEdge
         fields = ['self', 'friend']
+        list_serializer_class = CompiledListSerializer
 
+    @uses_related('friend', serializer=UserSerializer)
     def get_friend(self, obj):
-        # Displays the friend of a user by choosing the user in the friendship
-        # that isn't the user in the url.
-        user_id = self.context['view'].kwargs.get('user_id')
-        friend = obj.user2 if obj.user1.id == user_id else obj.user1
-        return UserSerializer(friend, context={'request': self.context['request']}).data
+        return render_nested(UserSerializer, obj.friend, self.context)
 
-class IncomingRequestSerializer(serializers.HyperlinkedModelSerializer):
+class IncomingRequestSerializer(BaseHyperlinkedSerializer):
     '''
-    Serializer class for displaying incoming friend requests.
+    Serializer class for displaying incoming friend requests: the edges of the
+    user in the url whose friend sent the request.
 
     NOTE: requires "request" in the context dict from the calling view.
     '''
+    self = CachedHyperlinkedRelatedField(
+            source='friendship',
+            view_name='friendship-detail',
+            read_only=True
+    )
     user = serializers.SerializerMethodField()
 
     class Meta:
-        model = Friendship
+        model = FriendshipEdge
         fields = ['self', 'user']
+        list_serializer_class = CompiledListSerializer
 
+    @uses_related('friend', serializer=UserSerializer)
     def get_user(self, obj):
-        return UserSerializer(
-                obj.user1,
-                context={'request': self.context['request']}
-        ).data
+        return render_nested(UserSerializer, obj.friend, self.context)
 
-class OutgoingRequestSerializer(serializers.HyperlinkedModelSerializer):
-    #TODO: Can combine this with the above serializer and switch obj.user depending on context
+class OutgoingRequestSerializer(IncomingRequestSerializer):
     '''
-    Serializer class for displaying outgoing friend requests.
+    Serializer class for displaying outgoing friend requests: the edges of the
+    user in the url whose friend received the request.
+
+    NOTE: requires "request" in the context dict from the calling view.
+    '''
+
+class FriendSuggestionSerializer(BaseHyperlinkedSerializer):
+    '''
+    Serializer class for displaying friend suggestions: the suggested user and
+    the number of friends they have in common with the user in the url.
 
     NOTE: requires "request" in the context dict from the calling view.
     '''
     user = serializers.SerializerMethodField()
 
     class Meta:
-        model = Friendship
-        fields = ['self', 'user']
+        model = FriendSuggestion
+        fields = ['user', 'mutual_friends']
+        list_serializer_class = CompiledListSerializer
 
+    @uses_related('candidate', serializer=UserSerializer)
     def get_user(self, obj):
-        return UserSerializer(
-                obj.user2,
-                context={'request': self.context['request']}
-        ).data
+        return render_nested(UserSerializer, obj.candidate, self.context)
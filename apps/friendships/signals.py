@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.friendships.models import Friendship, FriendshipEdge
+from apps.users.models import User
+from apps.users.signals import is_login
+from apps.friendships import graph
+from utils.generations import bump_generation
+
+'''
+Invalidates the cached friend lists (see utils/generations.py) of both users
+of a friendship when it changes, and the friend lists of every friend of a
+user whose card changes. Committed friendship changes are recorded in the
+friendship graph (see apps/friendships/graph.py).
+'''
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def friendship_changed(sender, instance, **kwargs):
+    bump_generation(instance.low_id, instance.high_id)
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def friendship_graph_changed(sender, instance, **kwargs):
+    accepted = kwargs['signal'] is post_save and instance.status == Friendship.Status.ACCEPTED
+    low_id, high_id = instance.low_id, instance.high_id
+    transaction.on_commit(lambda: graph.friendship_changed(low_id, high_id, accepted))
+
+@receiver(post_save, sender=User)
+def friend_changed(sender, instance, created, **kwargs):
+    if created or is_login(kwargs):
+        return
+    bump_generation(*FriendshipEdge.objects.filter(owner=instance).values_list('friend_id', flat=True))
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from apps.friendships.models import Friendship, FriendshipEdge, FriendSuggestion
+from apps.friendships.graph import build_arrays
+from collections import Counter
+from operator import itemgetter
+import heapq
+import itertools
+
+'''
+Friend suggestions ("people you may know"): the friends of a user's friends,
+most mutual friends first.
+
+With A the adjacency matrix of accepted friendships, (A x A)[u, v] is the
+number of friends u and v have in common, so the suggestions of u are the
+largest entries of row u of A x A, leaving out u, their friends and the users
+they have a pending request with. compute_suggestions() runs the product one
+row at a time (Gustavson's algorithm) on the CSR arrays of the friendship
+graph (see apps/friendships/graph.py):
+
+    row u of A x A = the sum of the rows of A of the friends of u
+
+and a row is summed by counting the concatenated friend lists of u's friends
+in one Counter.update() (a C loop), then cut to its top
+FRIEND_SUGGESTIONS_LIMIT entries with heapq.nlargest. The cost is the sum of
+the squared friend counts; friends with more than FRIEND_SUGGESTIONS_MAX_DEGREE
+friends are skipped, since a celebrity's friends aren't people one knows and
+would dominate the cost. Computing the suggestions of 1M users with 10M
+friendships (20 friends each) takes about 2 minutes
+(benchmarks/bench_suggestions.py), before the rows are written.
+
+The results replace the FriendSuggestion rows of a chunk of users at a time,
+so a run never leaves a user without suggestions. The
+compute_friend_suggestions job runs it every FRIEND_SUGGESTIONS_INTERVAL
+seconds (or run `manage.py computesuggestions`), and reads drop the
+suggestions that became friends or requests since.
+
+Settings:
+    FRIEND_SUGGESTIONS_LIMIT (int): Suggestions kept per user. Defaults to 20.
+    FRIEND_SUGGESTIONS_MAX_DEGREE (int): Friends above which a friend's
+        friends aren't suggested. Defaults to 1000.
+    FRIEND_SUGGESTIONS_INTERVAL (int): Seconds between runs. Defaults to 86400.
+'''
+
+def get_limit():
+    return getattr(settings, 'FRIEND_SUGGESTIONS_LIMIT', 20)
+
+def get_max_degree():
+    return getattr(settings, 'FRIEND_SUGGESTIONS_MAX_DEGREE', 1000)
+
+def get_interval():
+    return getattr(settings, 'FRIEND_SUGGESTIONS_INTERVAL', 86400)
+
+def top_candidates(offsets, neighbors, user_id, excluded=(), limit=20, max_degree=1000):
+    '''
+    Returns the top entries of a user's row of A x A.
+
+    Args:
+        offsets (array): The CSR offsets of the graph, indexed by user id.
+        neighbors (array): The CSR friend ids of the graph.
+        user_id (int): The user to suggest friends to. Must be in the arrays.
+        excluded (iterable of int, optional): Users not to suggest. Defaults to none.
+        limit (int, optional): The maximum number of candidates. Defaults to 20.
+        max_degree (int, optional): Friends above which a friend's friends are
+            skipped. Defaults to 1000.
+
+    Returns:
+        list of tuple: (candidate id, mutual friends) pairs, most mutual friends first.
+    '''
+    friends = neighbors[offsets[user_id]:offsets[user_id + 1]]
+    spans = ((offsets[friend_id], offsets[friend_id + 1]) for friend_id in friends)
+    counts = Counter()
+    counts.update(itertools.chain.from_iterable(
+            neighbors[start:end] for start, end in spans if end - start <= max_degree
+    ))
+    counts.pop(user_id, None)
+    for other_id in itertools.chain(friends, excluded):
+        counts.pop(other_id, None)
+    return heapq.nlargest(limit, counts.items(), key=itemgetter(1))
+
+def pending_requests():
+    ''' Returns a dict mapping users to the users they have a pending request with. '''
+    pending = {}
+    for low_id, high_id in Friendship.objects.pending_pairs().iterator(chunk_size=10000):
+        pending.setdefault(low_id, []).append(high_id)
+        pending.setdefault(high_id, []).append(low_id)
+    return pending
+
+def compute_suggestions(chunk_size=1000):
+    '''
+    Recomputes the suggestions of every user, replacing them a chunk of user
+    ids at a time.
+
+    Returns:
+        int: The number of stored suggestions.
+    '''
+    offsets, neighbors = build_arrays()
+    pending = pending_requests()
+    limit, max_degree = get_limit(), get_max_degree()
+    users = len(offsets) - 1
+    stored = 0
+    for start in range(0, users, chunk_size):
+        end = min(start + chunk_size, users)
+        rows = [
+                FriendSuggestion(user_id=user_id, candidate_id=candidate_id, mutual_friends=count)
+                for user_id in range(start, end) if offsets[user_id] != offsets[user_id + 1]
+                for candidate_id, count in top_candidates(
+                        offsets, neighbors, user_id, pending.get(user_id, ()), limit, max_degree)
+        ]
+        with transaction.atomic():
+            FriendSuggestion.objects.filter(user_id__gte=start, user_id__lt=end).delete()
+            FriendSuggestion.objects.bulk_create(rows, batch_size=1000)
+        stored += len(rows)
+    # Users past the arrays have no friends.
+    FriendSuggestion.objects.filter(user_id__gte=users).delete()
+    return stored
+
+def suggestions_for(user):
+    '''
+    Returns the stored suggestions of a user, leaving out the candidates they
+    became friends with or exchanged a request with since the last run (a
+    lookup of the unique edge index per suggestion).
+    '''
+    related = FriendshipEdge.objects.filter(owner_id=OuterRef('user_id'), friend_id=OuterRef('candidate_id'))
+    return FriendSuggestion.objects.filter(user=user).exclude(Exists(related))
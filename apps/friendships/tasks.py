@@ -0,0 +1,17 @@
+from apps.jobs.registry import task
+from apps.friendships import suggestions
+from datetime import timedelta
+
+@task(max_attempts=1)
+def compute_friend_suggestions(reschedule=True):
+    '''
+    Schedules the next run in FRIEND_SUGGESTIONS_INTERVAL seconds, then
+    recomputes the friend suggestions (see apps/friendships/suggestions.py).
+    Start the chain with `manage.py computesuggestions --schedule`.
+
+    Like recompute_discover_scores, the next run is scheduled first so that a
+    run whose worker dies doesn't end the chain.
+    '''
+    if reschedule:
+        compute_friend_suggestions.enqueue(delay=timedelta(seconds=suggestions.get_interval()))
+    suggestions.compute_suggestions()
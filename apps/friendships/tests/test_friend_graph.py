@@ -0,0 +1,177 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.friendships import graph
+from apps.friendships.graph import FriendGraph, intersect
+from django.urls import reverse
+from unittest import mock
+from utils.test_helper import TestHelper
+import re
+import threading
+import time
+
+'''
+This module provides tests for the in-memory friendship graph (apps/friendships/graph.py).
+
+Classes:
+    - FriendGraphTest: Provides methods to test lookups and updates of the graph.
+    - MutualFriendsViewTest: Provides methods to test GET on the user-mutual-friends endpoint and profiles.
+'''
+
+class FriendGraphTest(APITestCase):
+    ''' Tests that the graph answers from its arrays and follows committed changes '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.users = [self.helper.create_user() for _ in range(5)]
+        self.ids = [user.id for user in self.users]
+        self.friendships = [
+                self.helper.make_friends(self.users[0], self.users[1]),
+                self.helper.make_friends(self.users[2], self.users[0]),
+                self.helper.make_friends(self.users[1], self.users[2])
+        ]
+        self.helper.send_friend_request(self.users[3], self.users[0])
+        self.graph = FriendGraph()
+        self.graph.load()
+
+    def test_intersect(self):
+        ''' Sorted sequences should intersect in order, whichever is longer '''
+        self.assertEqual(intersect([1, 3, 5, 7], [2, 3, 4, 7, 9]), [3, 7])
+        self.assertEqual(intersect([2, 3, 4, 7, 9, 11], [7]), [7])
+        self.assertEqual(intersect([], [1, 2]), [])
+
+    def test_lookups(self):
+        ''' Friends, counts and checks should only hold accepted friendships '''
+        self.assertEqual(self.graph.friends(self.ids[0]), [self.ids[1], self.ids[2]])
+        self.assertEqual(self.graph.friend_count(self.ids[0]), 2)
+        self.assertEqual(self.graph.friend_count(self.ids[3]), 0)
+        self.assertTrue(self.graph.are_friends(self.ids[2], self.ids[1]))
+        self.assertFalse(self.graph.are_friends(self.ids[0], self.ids[3]))
+        self.assertEqual(self.graph.mutual_friends(self.ids[0], self.ids[1]), [self.ids[2]])
+        # Users created after the graph was built have no friends yet.
+        self.assertEqual(self.graph.friends(self.ids[4] + 100), [])
+
+    def test_overlay(self):
+        ''' Committed changes should be merged into lookups until the next rebuild '''
+        with mock.patch.object(graph, 'graph', self.graph), self.captureOnCommitCallbacks(execute=True):
+            self.helper.make_friends(self.users[4], self.users[0])
+            self.friendships[0].delete()
+        self.assertEqual(self.graph.friends(self.ids[0]), [self.ids[2], self.ids[4]])
+        self.assertEqual(self.graph.friend_count(self.ids[1]), 1)
+        self.assertFalse(self.graph.are_friends(self.ids[1], self.ids[0]))
+        self.assertEqual(self.graph.mutual_friends(self.ids[4], self.ids[2]), [self.ids[0]])
+
+        # Undoing a change empties the overlay.
+        with mock.patch.object(graph, 'graph', self.graph), self.captureOnCommitCallbacks(execute=True):
+            self.helper.make_friends(self.users[0], self.users[1])
+        self.assertNotIn(self.ids[1], self.graph.removed.get(self.ids[0], ()))
+
+        self.graph.load()
+        self.assertEqual((self.graph.added, self.graph.removed), ({}, {}))
+        self.assertEqual(self.graph.friends(self.ids[0]), [self.ids[1], self.ids[2], self.ids[4]])
+
+    def test_change_during_rebuild(self):
+        ''' A change committed while the arrays are rebuilt should be kept '''
+        build_arrays = graph.build_arrays
+
+        def build_then_change():
+            arrays = build_arrays()
+            self.graph.record(self.ids[3], self.ids[4], True)
+            return arrays
+
+        with mock.patch.object(graph, 'build_arrays', build_then_change):
+            self.graph.load()
+        self.assertTrue(self.graph.are_friends(self.ids[4], self.ids[3]))
+        self.assertEqual(self.graph.friend_count(self.ids[3]), 1)
+
+    def test_concurrent_first_loads(self):
+        ''' Lookups racing to load the graph should load it once, without errors '''
+        fresh = FriendGraph()
+        arrays = (self.graph.offsets, self.graph.neighbors)
+        def slow_build():
+            time.sleep(0.05)
+            return arrays
+        errors = []
+        def lookup():
+            try:
+                fresh.friend_count(self.ids[0])
+            except Exception as error:
+                errors.append(error)
+        with mock.patch.object(graph, 'build_arrays', side_effect=slow_build) as build:
+            threads = [threading.Thread(target=lookup) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(fresh.friend_count(self.ids[0]), 2)
+
+class MutualFriendsViewTest(APITestCase):
+    ''' Tests listing mutual friends and the counts of profiles '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.other = self.helper.create_user()
+        self.mutual = [self.helper.create_user() for _ in range(3)]
+        for friend in self.mutual:
+            self.helper.make_friends(self.user, friend)
+            self.helper.make_friends(friend, self.other)
+        self.helper.make_friends(self.user, self.helper.create_user())
+        graph.graph.load()
+        self.url = reverse('user-mutual-friends', args=[self.user.id, self.other.id])
+
+    def get_ids(self, response):
+        return [int(user['self'].rstrip('/').rsplit('/', 1)[1]) for user in response.data]
+
+    def test_list(self):
+        ''' Mutual friends should be listed by id, newest first, a page at a time '''
+        self.client.force_authenticate(user=self.user)
+        ids = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += self.get_ids(response)
+            if 'Link' not in response:
+                break
+            response = self.client.get(re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1))
+        self.assertEqual(ids, sorted((friend.id for friend in self.mutual), reverse=True))
+
+    def test_permissions(self):
+        ''' Only the user in the url and admins can list mutual friends, of existing users '''
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('user-mutual-friends', args=[self.user.id, 999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profile(self):
+        ''' Profiles should show friend counts, and mutual friends to other users '''
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('user-detail', args=[self.other.id]))
+        self.assertEqual(response.data['friend_count'], 3)
+        self.assertEqual(response.data['mutual_friend_count'], 3)
+        self.assertFalse(response.data['is_friend'])
+
+        response = self.client.get(reverse('user-detail', args=[self.user.id]))
+        self.assertEqual(response.data['friend_count'], 4)
+        self.assertNotIn('mutual_friend_count', response.data)
+        self.assertNotIn('is_friend', response.data)
+
+    def test_profile_etag(self):
+        ''' A profile's ETag should change with the viewer's friendships, which its counts depend on '''
+        friend = self.helper.create_user()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.helper.make_friends(friend, self.other)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-detail', args=[self.other.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Doesn't change the other user.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.helper.make_friends(self.user, friend)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['mutual_friend_count'], 4)
@@ -0,0 +1,114 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.friendships.models import FriendSuggestion
+from apps.friendships.tasks import compute_friend_suggestions
+from apps.friendships import suggestions
+from apps.jobs.models import Job
+from array import array
+from django.core.management import call_command
+from django.urls import reverse
+from io import StringIO
+from unittest import mock
+from utils.test_helper import TestHelper
+
+'''
+This module provides tests for friend suggestions (apps/friendships/suggestions.py).
+
+Classes:
+    - TopCandidatesTest: Provides methods to test ranking the friends of friends of a user.
+    - FriendSuggestionTest: Provides methods to test computing, storing and listing suggestions.
+'''
+
+class TopCandidatesTest(APITestCase):
+    ''' Tests the rows of the squared adjacency matrix '''
+
+    def setUp(self):
+        # 0 - 1, 0 - 2, 1 - 3, 2 - 3, 2 - 4, 3 - 4
+        friends = [[1, 2], [0, 3], [0, 3, 4], [1, 2, 4], [2, 3]]
+        self.offsets = array('q', [0])
+        for row in friends:
+            self.offsets.append(self.offsets[-1] + len(row))
+        self.neighbors = array('i', [friend_id for row in friends for friend_id in row])
+
+    def test_mutual_friends(self):
+        ''' Friends of friends should be ranked by mutual friends, without friends or the user '''
+        self.assertEqual(suggestions.top_candidates(self.offsets, self.neighbors, 0), [(3, 2), (4, 1)])
+        self.assertEqual(suggestions.top_candidates(self.offsets, self.neighbors, 4), [(0, 1), (1, 1)])
+
+    def test_exclusions(self):
+        ''' Excluded users, the limit and high-degree friends should cut the candidates '''
+        top = lambda **kwargs: suggestions.top_candidates(self.offsets, self.neighbors, 0, **kwargs)
+        self.assertEqual(top(excluded=[3]), [(4, 1)])
+        self.assertEqual(top(limit=1), [(3, 2)])
+        # Only user 1 has at most 2 friends.
+        self.assertEqual(top(max_degree=2), [(3, 1)])
+
+class FriendSuggestionTest(APITestCase):
+    ''' Tests storing and listing the suggestions of users '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.users = [self.helper.create_user() for _ in range(6)]
+        for first, second in ((0, 1), (0, 2), (1, 3), (2, 3), (1, 4), (2, 5)):
+            self.helper.make_friends(self.users[first], self.users[second])
+        self.helper.send_friend_request(self.users[5], self.users[0])
+        self.url = reverse('user-friend-suggestions', args=[self.users[0].id])
+
+    def get_suggestions(self, user):
+        return list(
+                FriendSuggestion.objects.filter(user=user).order_by('-mutual_friends', 'candidate_id')
+                .values_list('candidate_id', 'mutual_friends')
+        )
+
+    def test_compute(self):
+        ''' Suggestions should leave out pending requests and be replaced by later runs '''
+        suggestions.compute_suggestions(chunk_size=2)
+        self.assertEqual(self.get_suggestions(self.users[0]), [(self.users[3].id, 2), (self.users[4].id, 1)])
+        self.assertEqual(self.get_suggestions(self.users[3]), [(self.users[0].id, 2), (self.users[4].id, 1),
+                                                                (self.users[5].id, 1)])
+
+        self.helper.make_friends(self.users[0], self.users[3])
+        self.users[1].delete()
+        suggestions.compute_suggestions(chunk_size=2)
+        self.assertEqual(self.get_suggestions(self.users[0]), [])
+        self.assertEqual(self.get_suggestions(self.users[4]), [])
+
+    def test_list(self):
+        ''' Suggestions should be listed by mutual friends, without the users befriended since '''
+        suggestions.compute_suggestions()
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([suggestion['mutual_friends'] for suggestion in response.data], [2, 1])
+        self.assertTrue(response.data[0]['user']['self'].endswith(reverse('user-detail', args=[self.users[3].id])))
+
+        self.helper.send_friend_request(self.users[0], self.users[3])
+        response = self.client.get(self.url)
+        self.assertEqual([suggestion['mutual_friends'] for suggestion in response.data], [1])
+
+    def test_permissions(self):
+        ''' Only the user in the url and admins can list their suggestions '''
+        self.client.force_authenticate(user=self.users[1])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_task_reschedules(self):
+        ''' The suggestions job should schedule the next run '''
+        call_command('computesuggestions', '--schedule', stdout=StringIO())
+        call_command('computesuggestions', '--schedule', stdout=StringIO())
+        jobs = Job.objects.filter(task=compute_friend_suggestions.name)
+        self.assertEqual(jobs.count(), 1)
+
+        compute_friend_suggestions(**jobs.get().payload)
+        self.assertTrue(FriendSuggestion.objects.exists())
+        self.assertEqual(jobs.count(), 2)
+
+    def test_task_reschedules_before_running(self):
+        ''' The next run should be scheduled before this one computes, in case it never finishes '''
+        jobs = Job.objects.filter(task=compute_friend_suggestions.name)
+        def crash(*args, **kwargs):
+            self.assertEqual(jobs.count(), 1)
+            raise RuntimeError('worker died')
+        with mock.patch.object(suggestions, 'compute_suggestions', side_effect=crash):
+            with self.assertRaises(RuntimeError):
+                compute_friend_suggestions()
+        self.assertEqual(jobs.count(), 1)
@@ -0,0 +1,111 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.friendships.models import Friendship, FriendshipEdge
+from apps.friendships import edges
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from io import StringIO
+from utils.test_helper import TestHelper
+
+'''
+This module provides tests for the per-user friendship edges (apps/friendships/edges.py).
+
+Classes:
+    - FriendshipEdgeTest: Provides methods to test that edges follow friendship changes.
+    - FriendshipEdgeCheckTest: Provides methods to test the consistency checker.
+'''
+
+class FriendshipEdgeTest(APITestCase):
+    ''' Tests that the edges of a friendship follow requests, accepts and deletes '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        # The sender has the higher id: the request is sent from the high end of the pair.
+        self.recipient = self.helper.create_user()
+        self.sender = self.helper.create_user()
+
+    def get_edges(self):
+        return set(FriendshipEdge.objects.values_list('owner_id', 'friend_id', 'status'))
+
+    def test_request(self):
+        ''' A request should be outgoing for its sender and incoming for its recipient '''
+        self.helper.send_friend_request(self.sender, self.recipient)
+        self.assertEqual(self.get_edges(), {
+                (self.sender.id, self.recipient.id, 'outgoing'),
+                (self.recipient.id, self.sender.id, 'incoming')
+        })
+
+    def test_accept(self):
+        ''' Accepting a request should make both edges accepted '''
+        friendship = self.helper.send_friend_request(self.sender, self.recipient)
+        self.client.force_authenticate(user=self.recipient)
+        response = self.client.patch(
+                reverse('friendship-detail', args=[friendship.id]),
+                {'status': 'accepted'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_edges(), {
+                (self.sender.id, self.recipient.id, 'accepted'),
+                (self.recipient.id, self.sender.id, 'accepted')
+        })
+
+    def test_delete(self):
+        ''' Deleting a friendship or one of its users should delete its edges '''
+        friendship = self.helper.make_friends(self.sender, self.recipient)
+        friendship.delete()
+        self.assertEqual(self.get_edges(), set())
+
+        self.helper.make_friends(self.sender, self.recipient)
+        self.recipient.delete()
+        self.assertEqual(self.get_edges(), set())
+
+    def test_list_uses_edge_index(self):
+        ''' Friends and requests should be listed from one range of the edge index '''
+        self.helper.make_friends(self.sender, self.recipient)
+        self.client.force_authenticate(user=self.sender)
+        for url in ('user-friends', 'user-friends-incoming', 'user-friends-outgoing'):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse(url, args=[self.sender.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            sql = next(query['sql'] for query in context.captured_queries
+                    if 'friendships_friendshipedge' in query['sql'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertIn('friendship_edge_recent_idx', plan)
+            self.assertNotIn('friendships_friendship ', plan)
+
+class FriendshipEdgeCheckTest(APITestCase):
+    ''' Tests finding and repairing edges that don't match their friendships '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.users = [self.helper.create_user() for _ in range(4)]
+        self.friendships = [
+                self.helper.make_friends(self.users[0], self.users[1]),
+                self.helper.send_friend_request(self.users[2], self.users[0]),
+                self.helper.send_friend_request(self.users[3], self.users[1])
+        ]
+
+    def test_consistent(self):
+        ''' Edges written by save() should be consistent '''
+        self.assertEqual(edges.check(chunk_size=2), (0, 0))
+
+    def test_repair(self):
+        ''' Updates that skip save() should be found and repaired '''
+        Friendship.objects.filter(id=self.friendships[1].id).update(status='accepted')
+        FriendshipEdge.objects.filter(friendship=self.friendships[2], owner=self.users[3]).delete()
+        self.assertEqual(edges.check(chunk_size=2), (3, 2))
+
+        out = StringIO()
+        call_command('checkfriendshipedges', '--repair', stdout=out)
+        self.assertIn('Repaired 3 missing and 2 extra', out.getvalue())
+        self.assertEqual(edges.check(), (0, 0))
+        self.assertEqual(
+                set(FriendshipEdge.objects.filter(owner=self.users[0]).values_list('friend_id', 'status')),
+                {(self.users[1].id, 'accepted'), (self.users[2].id, 'accepted')}
+        )
@@ -1,6 +1,6 @@
 from rest_framework import status
 from rest_framework.test import APITestCase
-from apps.friendships.models import Friendship
+from apps.friendships.models import FriendshipEdge
 from apps.friendships.serializers import AcceptedFriendshipSerializer
 from apps.users.models import User
 from django.urls import reverse
@@ -37,7 +37,7 @@ class GetAllFriendsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         serializer = AcceptedFriendshipSerializer(
-                Friendship.objects.friendships_of_user(self.user),
+                FriendshipEdge.objects.of_user(self.user, 'accepted'),
                 many=True
         )
         self.assertEqual(response.data, serializer.data)
@@ -60,7 +60,7 @@ class GetAllFriendsTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         serializer = AcceptedFriendshipSerializer(
-                Friendship.objects.friendships_of_user(self.user),
+                FriendshipEdge.objects.of_user(self.user, 'accepted'),
                 many=True
         )
         self.assertEqual(response.data, serializer.data)
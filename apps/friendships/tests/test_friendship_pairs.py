@@ -0,0 +1,92 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.friendships.models import Friendship
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.urls import reverse
+from utils.test_helper import TestHelper
+
+'''
+This module provides tests for storing friendships as canonical pairs.
+
+Classes:
+    - FriendshipPairTest: Provides methods to test the canonical pair and direction of friendships.
+    - FriendshipPairMigrationTest: Provides methods to test migrating friendships to canonical pairs.
+'''
+
+class FriendshipPairTest(APITestCase):
+    ''' Tests that a pair of users has at most one friendship, whoever sent the request '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.low = self.helper.create_user()
+        self.high = self.helper.create_user()
+
+    def test_direction(self):
+        ''' The sender and recipient should be kept when the pair is stored in order '''
+        friendship = self.helper.send_friend_request(self.high, self.low)
+        friendship.refresh_from_db()
+        self.assertEqual((friendship.low, friendship.high), (self.low, self.high))
+        self.assertEqual((friendship.user1, friendship.user2), (self.high, self.low))
+        self.assertEqual(Friendship.objects.outgoing_requests_for_user(self.high).get(), friendship)
+        self.assertEqual(Friendship.objects.incoming_requests_for_user(self.low).get(), friendship)
+
+    def test_reversed_pair(self):
+        ''' The reversed pair of an existing friendship should be rejected '''
+        self.helper.send_friend_request(self.low, self.high)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.helper.send_friend_request(self.high, self.low)
+
+    def test_between(self):
+        ''' The friendship of two users should be found with one lookup, in either order '''
+        friendship = self.helper.make_friends(self.high, self.low)
+        with self.assertNumQueries(1):
+            self.assertEqual(Friendship.objects.between(self.low, self.high).get(), friendship)
+        self.assertEqual(Friendship.objects.between(self.high, self.low).get(), friendship)
+
+    def test_request_back(self):
+        ''' Requesting a user who already sent a request should point to the existing friendship '''
+        friendship = self.helper.send_friend_request(self.low, self.high)
+        self.client.force_authenticate(user=self.high)
+        response = self.client.post(
+                reverse('user-friends', args=[self.high.id]),
+                {'to': reverse('user-detail', args=[self.low.id])}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        link = response.data['non_field_errors'][1]['friendship']
+        self.assertTrue(link.endswith(reverse('friendship-detail', args=[friendship.id])))
+
+class FriendshipPairMigrationTest(TransactionTestCase):
+    ''' Tests that existing friendships are migrated to canonical pairs and deduplicated '''
+    before = [('friendships', '0002_friendship_friendship_user1_recent_idx_and_more')]
+    after = [('friendships', '0005_friendship_pair_constraints')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_migrate(self):
+        ''' Pairs stored in both directions should be merged, keeping the accepted friendship '''
+        apps = self.migrate(self.before)
+        User = apps.get_model('users', 'User')
+        Friendship = apps.get_model('friendships', 'Friendship')
+        users = [User.objects.create(username=f'user{index}', email=f'user{index}@test.com') for index in range(4)]
+        Friendship.objects.create(user1=users[1], user2=users[0], status='pending')
+        accepted = Friendship.objects.create(user1=users[0], user2=users[1], status='accepted')
+        request = Friendship.objects.create(user1=users[3], user2=users[2], status='pending')
+
+        apps = self.migrate(self.after)
+        Friendship = apps.get_model('friendships', 'Friendship')
+        self.assertEqual(
+                sorted(Friendship.objects.values_list('id', 'low_id', 'high_id', 'direction', 'status')),
+                [
+                    (accepted.id, users[0].id, users[1].id, 'from_low', 'accepted'),
+                    (request.id, users[2].id, users[3].id, 'from_high', 'pending')
+                ]
+        )
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
@@ -1,10 +1,12 @@
 from django.urls import path, include, reverse
 from rest_framework.routers import DefaultRouter
-from apps.friendships.views import FriendshipListView, FriendshipDetailView, IncomingFriendRequestView, OutgoingFriendRequestView
+from apps.friendships.views import FriendshipListView, FriendshipDetailView, IncomingFriendRequestView, OutgoingFriendRequestView, MutualFriendsView, FriendSuggestionListView
 
 urlpatterns = [
         path('users/<int:user_id>/friends', FriendshipListView.as_view(), name='user-friends'),
         path('users/<int:user_id>/friends/incoming-requests', IncomingFriendRequestView.as_view(), name='user-friends-incoming'),
         path('users/<int:user_id>/friends/outgoing-requests', OutgoingFriendRequestView.as_view(), name='user-friends-outgoing'),
+        path('users/<int:user_id>/mutual-friends/<int:other_id>', MutualFriendsView.as_view(), name='user-mutual-friends'),
+        path('users/<int:user_id>/friend-suggestions', FriendSuggestionListView.as_view(), name='user-friend-suggestions'),
         path('friendships/<int:pk>', FriendshipDetailView.as_view(), name='friendship-detail') 
 ]
@@ -1,12 +1,18 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.generics import ListCreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework import permissions, exceptions
-from apps.friendships.models import Friendship
-from apps.friendships.serializers import FriendshipSerializer, AcceptedFriendshipSerializer, IncomingRequestSerializer, OutgoingRequestSerializer, CreateFriendshipSerializer
+from apps.friendships.models import Friendship, FriendshipEdge
+from apps.friendships.serializers import FriendshipSerializer, AcceptedFriendshipSerializer, IncomingRequestSerializer, OutgoingRequestSerializer, CreateFriendshipSerializer, FriendSuggestionSerializer
 from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from apps.friendships.graph import MutualFriendsPagination
+from apps.friendships.suggestions import suggestions_for
 from apps.friendships.permissions import FriendshipContainsUser, IsRequestedUser, IsPendingFriendship, IsRecipientUser
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from utils.query_planner import PlannedQuerysetMixin
+from utils.streaming import StreamingListMixin
+from utils.response_cache import CachedListMixin
+from utils.conditional import ConditionalDetailMixin, ConditionalListMixin
 
 '''
 Handles views for Friendships.
@@ -18,12 +24,15 @@ Naming convention notes:
     'ListView' = collection/
     'DetailView' = collection/<collection_item>/
 '''
-class FriendshipListView(ListCreateAPIView):
+class FriendshipListView(StreamingListMixin, CachedListMixin, PlannedQuerysetMixin, ListCreateAPIView):
     ''' 
     List and create friendships.
 
     NOTE: All listed friendshps under this endpoint are ACCEPTED.
     '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-since', '-id')
     permission_classes = [(permissions.IsAuthenticated & IsRequestedUser) | permissions.IsAdminUser]
 
     def get_serializer_class(self):
@@ -33,7 +42,7 @@ class FriendshipListView(ListCreateAPIView):
 
     def get_queryset(self):
         user = get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
-        queryset = Friendship.objects.friendships_of_user(user)
+        queryset = FriendshipEdge.objects.of_user(user, 'accepted')
         return queryset
 
     def create(self, request, *args, **kwargs):
@@ -45,30 +54,68 @@ class FriendshipListView(ListCreateAPIView):
         # Proceed with creation as normal
         return super().create(request, *args, **kwargs)
     
-class IncomingFriendRequestView(ListAPIView):
+class IncomingFriendRequestView(StreamingListMixin, CachedListMixin, PlannedQuerysetMixin, ListAPIView):
     ''' List all incoming requests for the user in the url '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-since', '-id')
     serializer_class = IncomingRequestSerializer
     permission_classes = [(permissions.IsAuthenticated & IsRequestedUser) | permissions.IsAdminUser]
 
     def get_queryset(self):
         user = get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
-        queryset = Friendship.objects.incoming_requests_for_user(user)
+        queryset = FriendshipEdge.objects.of_user(user, 'incoming')
         return queryset
 
-class OutgoingFriendRequestView(ListAPIView):
+class OutgoingFriendRequestView(StreamingListMixin, CachedListMixin, PlannedQuerysetMixin, ListAPIView):
     ''' List all outgoing requests for the user in the url '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-since', '-id')
     serializer_class = OutgoingRequestSerializer
     permission_classes = [(permissions.IsAuthenticated & IsRequestedUser) | permissions.IsAdminUser]
 
     def get_queryset(self):
         user = get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
-        queryset = Friendship.objects.outgoing_requests_for_user(user)
+        queryset = FriendshipEdge.objects.of_user(user, 'outgoing')
         return queryset
 
-class FriendshipDetailView(RetrieveUpdateDestroyAPIView):
+class MutualFriendsView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    List the friends the user in the url has in common with another user,
+    from the in-memory friendship graph (see apps/friendships/graph.py).
+    '''
+    values_rows = True
+    serializer_class = UserSerializer
+    pagination_class = MutualFriendsPagination
+    permission_classes = [(permissions.IsAuthenticated & IsRequestedUser) | permissions.IsAdminUser]
+
+    def get_queryset(self):
+        get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
+        get_object_or_404(User.objects.all(), id=self.kwargs['other_id'])
+        return User.objects.all()
+
+class FriendSuggestionListView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    List the people the user in the url may know, most mutual friends first
+    (see apps/friendships/suggestions.py).
+    '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-mutual_friends', '-id')
+    serializer_class = FriendSuggestionSerializer
+    permission_classes = [(permissions.IsAuthenticated & IsRequestedUser) | permissions.IsAdminUser]
+
+    def get_queryset(self):
+        user = get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
+        return suggestions_for(user)
+
+class FriendshipDetailView(ConditionalDetailMixin, PlannedQuerysetMixin, RetrieveUpdateDestroyAPIView):
     ''' View designated for managing specific friendships. '''
     queryset = Friendship.objects.all()
     serializer_class = FriendshipSerializer
+    # Changes of a friendship bump the generations of both its users.
+    etag_owner_field = 'low_id'
 
     # Disable PUT since we only want to be able to change status
     http_method_names = ['get', 'patch', 'delete']
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from apps.jobs.models import Job
+
+class PeriodicTaskCommand(BaseCommand):
+    '''
+    Base of the commands of self-rescheduling tasks: runs the work once, or
+    with --schedule starts the chain of jobs unless it is already running.
+
+    Attributes:
+        task (apps.jobs.registry.Task): The task that reschedules itself.
+    '''
+    task = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', action='store_true',
+                            help='Enqueue the job, which reschedules itself, unless it is already scheduled.')
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            scheduled = Job.objects.filter(
+                    task=self.task.name,
+                    status__in=[Job.Status.QUEUED, Job.Status.RUNNING]
+            ).exists()
+            if scheduled:
+                self.stdout.write(f'{self.task.name} is already scheduled.')
+            else:
+                self.task.enqueue()
+                self.stdout.write(f'Scheduled {self.task.name}.')
+            return
+        self.stdout.write(self.run(**options))
+
+    def run(self, **options):
+        ''' Does the work once and returns a line to print. '''
+        raise NotImplementedError
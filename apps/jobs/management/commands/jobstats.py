@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.jobs.models import Job
+
+class Command(BaseCommand):
+    help = 'Prints queue depth, throughput and lag of every job queue.'
+
+    def handle(self, *args, **options):
+        stats = Job.objects.queue_stats()
+        if not stats:
+            self.stdout.write('No jobs.')
+            return
+        for queue, row in sorted(stats.items()):
+            self.stdout.write(
+                    f"{queue}: queued={row['queued']} running={row['running']} "
+                    f"failed={row['failed']} throughput={row['throughput']:.2f}/s "
+                    f"lag={row['lag']:.1f}s"
+            )
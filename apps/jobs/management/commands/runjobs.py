@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.jobs.worker import Worker
+import multiprocessing
+import signal
+
+class Command(BaseCommand):
+    help = 'Runs background job workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of worker processes to start.')
+        parser.add_argument('--queues', default='',
+                            help='Comma separated queues to work on. Defaults to every configured queue.')
+        parser.add_argument('--once', action='store_true',
+                            help='Run the ready jobs once and exit instead of polling.')
+
+    def handle(self, *args, **options):
+        queues = [queue for queue in options['queues'].split(',') if queue] or None
+
+        if options['once']:
+            worker = Worker(queues=queues)
+            while worker.run_once():
+                pass
+            worker.report_metrics(force=True)
+            return
+
+        if options['processes'] <= 1:
+            run_worker(queues)
+            return
+
+        # Children must not share the parent's database connection.
+        connections.close_all()
+        processes = [
+                multiprocessing.Process(target=run_worker, args=(queues,), daemon=False)
+                for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def shutdown(signum, frame):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        for process in processes:
+            process.join()
+
+def run_worker(queues):
+    ''' Runs a worker until the process receives SIGINT/SIGTERM. '''
+    worker = Worker(queues=queues)
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run()
@@ -0,0 +1,77 @@
+from django.db.models import Manager, Q, Count, Min, Max
+from django.utils import timezone
+from datetime import timedelta
+
+class JobManager(Manager):
+    def ready(self, queue, now=None):
+        '''
+        Retrieve jobs of a queue that a worker may claim right now.
+
+        A job is ready if it is queued and its run_at has passed, or if it is
+        running but its lease has expired (the worker holding it died or stopped
+        heartbeating).
+
+        Args:
+            queue (str): The name of the queue.
+            now (datetime, optional): The reference time. Defaults to timezone.now().
+
+        Returns:
+            QuerySet: The claimable jobs, highest priority and oldest first.
+        '''
+        now = now or timezone.now()
+        return self.filter(
+                Q(status='queued', run_at__lte=now) |
+                Q(status='running', lease_expires_at__lt=now),
+                queue=queue
+        ).order_by('-priority', 'run_at', 'id')
+
+    def running(self, queue, now=None):
+        '''
+        Retrieve jobs of a queue that are held by a live lease.
+
+        Args:
+            queue (str): The name of the queue.
+            now (datetime, optional): The reference time. Defaults to timezone.now().
+
+        Returns:
+            QuerySet: The jobs currently being worked on.
+        '''
+        now = now or timezone.now()
+        return self.filter(queue=queue, status='running', lease_expires_at__gte=now)
+
+    def queue_stats(self, window=timedelta(minutes=1)):
+        '''
+        Compute per-queue metrics from the jobs table.
+
+        Because every worker process writes to the same table, these numbers
+        cover all workers, not only the calling process.
+
+        Args:
+            window (timedelta, optional): The period used to compute throughput. Defaults to 1 minute.
+
+        Returns:
+            dict: Maps each queue name to a dict with 'queued', 'running', 'failed',
+                  'throughput' (finished jobs per second over the window) and 'lag'
+                  (seconds the oldest ready job has been waiting).
+        '''
+        now = timezone.now()
+        stats = {}
+        rows = self.values('queue').annotate(
+                queued=Count('id', filter=Q(status='queued')),
+                running=Count('id', filter=Q(status='running')),
+                failed=Count('id', filter=Q(status='failed')),
+                finished=Count('id', filter=Q(finished_at__gte=now - window)),
+                oldest_ready=Min('run_at', filter=Q(status='queued', run_at__lte=now)),
+                last_finished=Max('finished_at')
+        )
+        for row in rows:
+            oldest = row['oldest_ready']
+            stats[row['queue']] = {
+                    'queued': row['queued'],
+                    'running': row['running'],
+                    'failed': row['failed'],
+                    'throughput': row['finished'] / window.total_seconds(),
+                    'lag': (now - oldest).total_seconds() if oldest else 0.0,
+                    'last_finished': row['last_finished']
+            }
+        return stats
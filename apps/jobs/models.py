@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+from apps.jobs.managers import JobManager
+
+class Job(models.Model):
+    '''
+    A unit of background work stored in the database.
+
+    Workers (see apps.jobs.worker) claim ready jobs by taking a lease on them.
+    While a job runs, its worker keeps extending the lease (heartbeat); a job
+    whose lease expires is considered abandoned and can be claimed again.
+    Failed jobs are retried with exponential backoff until max_attempts is
+    reached.
+    '''
+    class Status(models.TextChoices):
+        ''' Possible status values for a job '''
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        SUCCEEDED = 'succeeded'
+        FAILED = 'failed'
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    # Higher priority jobs are claimed first within a queue.
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(choices=Status.choices, default=Status.QUEUED, max_length=10)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    lease_expires_at = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    objects = JobManager()
+
+    class Meta:
+        indexes = [
+                models.Index(fields=['queue', 'status', 'priority', 'run_at'], name='job_claim_idx'),
+                models.Index(fields=['status', 'lease_expires_at'], name='job_lease_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.task} [{self.queue}] ({self.status})'
@@ -0,0 +1,91 @@
+'''
+Registry of background tasks.
+
+Tasks are plain functions decorated with @task, usually declared in an app's
+tasks.py (those modules are imported when the jobs app is ready). A task
+receives its job payload as keyword arguments, so the payload must be JSON
+serializable.
+
+EX:
+    @task(queue='media', max_attempts=3)
+    def delete_video_file(name):
+        default_storage.delete(name)
+
+    delete_video_file.enqueue(name=video.video.name)
+'''
+
+from django.utils import timezone
+from apps.jobs.models import Job
+
+_registry = {}
+
+class Task:
+    ''' A registered background task. Calling it runs the function inline. '''
+    def __init__(self, func, name, queue, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, priority=None, delay=None, **payload):
+        '''
+        Stores a job for this task to be ran by a worker.
+
+        Args:
+            priority (int, optional): Overrides the task's default priority.
+            delay (timedelta, optional): Postpones the first run by this amount.
+            **payload: The keyword arguments passed to the task when it runs.
+
+        Returns:
+            apps.jobs.models.Job: The created job.
+        '''
+        run_at = timezone.now()
+        if delay is not None:
+            run_at += delay
+        return Job.objects.create(
+                queue=self.queue,
+                task=self.name,
+                payload=payload,
+                priority=self.priority if priority is None else priority,
+                max_attempts=self.max_attempts,
+                run_at=run_at
+        )
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.name)
+
+def task(queue='default', priority=0, max_attempts=5, name=None):
+    '''
+    Decorator that registers a function as a background task.
+
+    Args:
+        queue (str, optional): The queue the task's jobs are placed in. Defaults to 'default'.
+        priority (int, optional): Default priority of the task's jobs. Defaults to 0.
+        max_attempts (int, optional): How many times a job is tried before it fails. Defaults to 5.
+        name (str, optional): The registered name. Defaults to '<module>.<function name>'.
+
+    Returns:
+        Task: The registered task wrapping the function.
+    '''
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registered = Task(func, task_name, queue, priority, max_attempts)
+        _registry[task_name] = registered
+        return registered
+    return decorator
+
+def get_task(name):
+    '''
+    Looks up a registered task by name.
+
+    Raises:
+        LookupError: If no task is registered under the name.
+    '''
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No task registered as '{name}'")
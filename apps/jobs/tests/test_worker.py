@@ -0,0 +1,133 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps.jobs.models import Job
+from apps.jobs.registry import task
+from apps.jobs.worker import Worker
+from datetime import timedelta
+
+'''
+This module provides tests for claiming and running background jobs.
+
+Classes:
+    - RunJobTest: Provides methods to test running, retrying and failing jobs.
+    - ClaimJobTest: Provides methods to test priorities, leases and concurrency limits.
+'''
+
+calls = []
+
+@task(queue='test', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+@task(queue='test', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+TEST_JOBS = {
+        'QUEUES': {'test': {'concurrency': 1}},
+        'RETRY_BACKOFF_SECONDS': 10
+}
+
+@override_settings(JOBS=TEST_JOBS)
+class RunJobTest(TestCase):
+    ''' Tests running jobs to completion '''
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(worker_id='test-worker', heartbeat=False)
+
+    def test_run_job(self):
+        ''' A ready job should be ran with its payload and marked succeeded '''
+        job = record.enqueue(value=42)
+        self.assertEqual(self.worker.run_once(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [42])
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_delayed_job_not_ran(self):
+        ''' A job whose run_at is in the future should not be claimed '''
+        record.enqueue(delay=timedelta(minutes=5), value=1)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retried_with_backoff(self):
+        ''' A failing job should be requeued later until it runs out of attempts '''
+        job = explode.enqueue()
+        self.worker.run_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        # Make the retry due immediately.
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.worker.run_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_unknown_task_fails(self):
+        ''' A job for a task that isn't registered should fail, not crash the worker '''
+        job = Job.objects.create(queue='test', task='missing.task', max_attempts=1)
+        self.worker.run_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+
+@override_settings(JOBS=TEST_JOBS)
+class ClaimJobTest(TestCase):
+    ''' Tests claiming jobs '''
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(worker_id='test-worker', heartbeat=False)
+
+    def test_higher_priority_claimed_first(self):
+        ''' Jobs with a higher priority should run before older, lower priority jobs '''
+        record.enqueue(value='low')
+        record.enqueue(priority=10, value='high')
+        self.worker.run_once()
+        self.worker.run_once()
+        self.assertEqual(calls, ['high', 'low'])
+
+    def test_concurrency_limit(self):
+        ''' No job should be claimed while the queue is at its concurrency limit '''
+        record.enqueue(value=1)
+        record.enqueue(value=2)
+        other = Worker(worker_id='other-worker', heartbeat=False)
+
+        self.assertIsNotNone(other.claim('test'))
+        self.assertIsNone(self.worker.claim('test'))
+
+    def test_expired_lease_reclaimed(self):
+        ''' A running job whose lease expired should be claimed by another worker '''
+        job = record.enqueue(value=1)
+        self.assertIsNotNone(Worker(worker_id='dead-worker', heartbeat=False).claim('test'))
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.worker.run_once(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_reclaimed_lag_from_lease_expiry(self):
+        ''' The lag of a reclaimed job should count from its lease expiry, not its run_at '''
+        job = record.enqueue(value=1)
+        Job.objects.filter(id=job.id).update(run_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNotNone(Worker(worker_id='dead-worker', heartbeat=False).claim('test'))
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.worker.run_once()
+        self.assertLess(self.worker.lag_max, 60)
+
+    def test_live_lease_not_reclaimed(self):
+        ''' A running job with a live lease should not be claimed again '''
+        record.enqueue(value=1)
+        self.assertIsNotNone(Worker(worker_id='busy-worker', heartbeat=False).claim('test'))
+        with self.settings(JOBS={'QUEUES': {'test': {'concurrency': None}}}):
+            self.assertIsNone(Worker(worker_id='test-worker', heartbeat=False).claim('test'))
@@ -0,0 +1,273 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from apps.jobs.models import Job
+from apps.jobs.registry import get_task
+from datetime import timedelta
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger('apps.jobs.metrics')
+
+DEFAULTS = {
+        # Queue name -> {'concurrency': max running jobs across all workers (None = unlimited)}
+        'QUEUES': {'default': {'concurrency': None}},
+        'LEASE_SECONDS': 60,
+        'HEARTBEAT_SECONDS': 20,
+        'POLL_SECONDS': 1.0,
+        'RETRY_BACKOFF_SECONDS': 10,
+        'RETRY_BACKOFF_MAX_SECONDS': 3600,
+        'METRICS_INTERVAL_SECONDS': 60
+}
+
+def get_setting(name):
+    ''' Returns a jobs setting from settings.JOBS, falling back to DEFAULTS. '''
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+def retry_delay(attempts):
+    '''
+    Exponential backoff (with jitter) before retrying a job.
+
+    Args:
+        attempts (int): How many times the job has been tried so far.
+
+    Returns:
+        timedelta: The delay before the next attempt.
+    '''
+    base = get_setting('RETRY_BACKOFF_SECONDS')
+    delay = min(base * 2 ** max(attempts - 1, 0), get_setting('RETRY_BACKOFF_MAX_SECONDS'))
+    # Jitter spreads out retries of jobs that failed together.
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+class Heartbeat(threading.Thread):
+    '''
+    Background thread that keeps extending the lease of a running job so that
+    other workers don't reclaim it.
+    '''
+    def __init__(self, job, worker_id, lease, interval):
+        super().__init__(daemon=True)
+        self.job_id = job.id
+        self.worker_id = worker_id
+        self.lease = lease
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Job.objects.filter(
+                        id=self.job_id,
+                        locked_by=self.worker_id,
+                        status=Job.Status.RUNNING
+                ).update(lease_expires_at=timezone.now() + self.lease)
+        finally:
+            # The thread got its own connection; don't leak it.
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class Worker:
+    '''
+    Claims and runs jobs from one or more queues.
+
+    Several workers (in one or many processes) can run against the same table.
+    A job is claimed with a conditional UPDATE, so only one worker can win it,
+    and per-queue concurrency limits are checked again after claiming (and the
+    claim released if the limit was exceeded by a concurrent claim).
+
+    Args:
+        queues (list of str, optional): The queues to work on. Defaults to every configured queue.
+        worker_id (str, optional): Identifies the worker in locked_by. Defaults to '<host>:<pid>'.
+        heartbeat (bool, optional): Whether to extend leases while a job runs. Defaults to True.
+    '''
+    def __init__(self, queues=None, worker_id=None, heartbeat=True):
+        self.queue_config = get_setting('QUEUES')
+        self.queues = list(queues or self.queue_config.keys())
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.heartbeat = heartbeat
+        self.lease = timedelta(seconds=get_setting('LEASE_SECONDS'))
+        self.stopping = False
+        self.reset_metrics()
+
+    def concurrency(self, queue):
+        return self.queue_config.get(queue, {}).get('concurrency')
+
+    def claim(self, queue):
+        '''
+        Takes a lease on the next ready job of a queue.
+
+        Args:
+            queue (str): The queue to claim from.
+
+        Returns:
+            apps.jobs.models.Job or None: The claimed job, or None if nothing could be claimed.
+        '''
+        limit = self.concurrency(queue)
+        now = timezone.now()
+        if limit is not None and Job.objects.running(queue, now).count() >= limit:
+            return None
+        candidates = Job.objects.ready(queue, now).values_list('id', 'status', 'run_at', 'lease_expires_at')[:5]
+        for job_id, status, run_at, lease_expires_at in candidates:
+            claimed = Job.objects.ready(queue, now).filter(id=job_id).update(
+                    status=Job.Status.RUNNING,
+                    locked_by=self.worker_id,
+                    lease_expires_at=now + self.lease,
+                    attempts=F('attempts') + 1,
+                    started_at=now
+            )
+            if not claimed:
+                # Another worker won this job; try the next one.
+                continue
+            if limit is not None and Job.objects.running(queue, now).count() > limit:
+                # A concurrent claim pushed the queue over its limit. Give the
+                # job back untouched so that it doesn't count as an attempt.
+                Job.objects.filter(id=job_id, locked_by=self.worker_id).update(
+                        status=Job.Status.QUEUED,
+                        locked_by='',
+                        lease_expires_at=None,
+                        attempts=F('attempts') - 1
+                )
+                return None
+            job = Job.objects.get(id=job_id)
+            # When the job became claimable: a reclaimed job waited for its
+            # lease to expire, not since run_at.
+            job.ready_at = lease_expires_at if status == Job.Status.RUNNING else run_at
+            return job
+        return None
+
+    def execute(self, job):
+        '''
+        Runs a claimed job and records its outcome.
+
+        Args:
+            job (apps.jobs.models.Job): A job claimed by this worker.
+
+        Returns:
+            bool: True if the job succeeded.
+        '''
+        lag = (job.started_at - getattr(job, 'ready_at', job.run_at)).total_seconds()
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+
+        if job.attempts > job.max_attempts:
+            # The lease expired on the last allowed attempt (e.g. the worker
+            # crashed). Don't run it again.
+            self.finish(job, Job.Status.FAILED, error=job.last_error or 'Lease expired on final attempt')
+            return False
+
+        beat = None
+        if self.heartbeat:
+            beat = Heartbeat(job, self.worker_id, self.lease, get_setting('HEARTBEAT_SECONDS'))
+            beat.start()
+        try:
+            get_task(job.task)(**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Job %s (%s) failed on attempt %d', job.id, job.task, job.attempts, exc_info=True)
+            if job.attempts >= job.max_attempts:
+                self.finish(job, Job.Status.FAILED, error=error)
+            else:
+                self.finish(job, Job.Status.QUEUED, error=error, run_at=timezone.now() + retry_delay(job.attempts))
+            return False
+        finally:
+            if beat is not None:
+                beat.stop()
+        self.finish(job, Job.Status.SUCCEEDED)
+        return True
+
+    def finish(self, job, status, error='', run_at=None):
+        '''
+        Releases the lease of a job and stores its new status.
+
+        The update is conditional on this worker still holding the lease, so a
+        worker that lost its lease can't overwrite the result of the worker that
+        reclaimed the job.
+        '''
+        now = timezone.now()
+        fields = {
+                'status': status,
+                'locked_by': '',
+                'lease_expires_at': None,
+                'last_error': error
+        }
+        if run_at is not None:
+            fields['run_at'] = run_at
+        if status in (Job.Status.SUCCEEDED, Job.Status.FAILED):
+            fields['finished_at'] = now
+            if status == Job.Status.SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        else:
+            self.retried += 1
+        Job.objects.filter(id=job.id, locked_by=self.worker_id).update(**fields)
+
+    def run_once(self):
+        '''
+        Claims and runs at most one job per queue.
+
+        Returns:
+            int: The number of jobs that were ran.
+        '''
+        ran = 0
+        for queue in self.queues:
+            job = self.claim(queue)
+            if job is not None:
+                self.execute(job)
+                ran += 1
+        return ran
+
+    def run(self):
+        ''' Works until stop() is called, sleeping when every queue is empty. '''
+        poll = get_setting('POLL_SECONDS')
+        logger.info('Worker %s started on queues: %s', self.worker_id, ', '.join(self.queues))
+        while not self.stopping:
+            if not self.run_once():
+                time.sleep(poll)
+            self.report_metrics()
+        self.report_metrics(force=True)
+        logger.info('Worker %s stopped', self.worker_id)
+
+    def stop(self, *args):
+        ''' Finishes the current job, then stops. Usable as a signal handler. '''
+        self.stopping = True
+
+    def reset_metrics(self):
+        self.metrics_started = time.monotonic()
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def report_metrics(self, force=False):
+        '''
+        Logs this worker's throughput and queue lag (time between a job becoming
+        claimable, its run_at or the expiry of an abandoned lease, and the
+        moment it was claimed) for the last interval, then resets them.
+        '''
+        elapsed = time.monotonic() - self.metrics_started
+        if not force and elapsed < get_setting('METRICS_INTERVAL_SECONDS'):
+            return
+        processed = self.succeeded + self.failed + self.retried
+        metrics_logger.info(
+                'worker=%s processed=%d succeeded=%d failed=%d retried=%d throughput=%.2f/s lag_avg=%.3fs lag_max=%.3fs',
+                self.worker_id,
+                processed,
+                self.succeeded,
+                self.failed,
+                self.retried,
+                processed / elapsed if elapsed else 0.0,
+                self.lag_total / processed if processed else 0.0,
+                self.lag_max
+        )
+        self.reset_metrics()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PrivateGroupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.private_groups'
+
+    def ready(self):
+        import apps.private_groups.signals
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('private_groups', '0002_alter_privategroupmembership_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='privategroup',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='privategroup',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='private_group_recent_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from apps.users.models import User
 
 class PrivateGroup(models.Model):
@@ -9,6 +10,13 @@ class PrivateGroup(models.Model):
     '''
     group_name = models.CharField(max_length=24)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # A user's groups, most recent first (keyset pagination).
+            models.Index(fields=['creator', '-created_at', '-id'], name='private_group_recent_idx')
+        ]
 
 class PrivateGroupMembership(models.Model):
     '''
@@ -2,12 +2,16 @@ from rest_framework import serializers
 from apps.private_groups.models import PrivateGroup, PrivateGroupMembership
 from apps.users.models import User
 from apps.users.serializers import UserSerializer
+from utils.query_planner import uses_related
+from utils.serializers import BaseHyperlinkedSerializer
+from utils.links import CachedHyperlinkedIdentityField
+from utils.compiled import CompiledListSerializer, render_nested
 
-class PrivateGroupReadSerializer(serializers.HyperlinkedModelSerializer):
+class PrivateGroupReadSerializer(BaseHyperlinkedSerializer):
     '''
     Serializer class for displaying private groups.
     '''
-    self = serializers.HyperlinkedIdentityField(
+    self = CachedHyperlinkedIdentityField(
             view_name='private-group-detail'
     )
     members = serializers.SerializerMethodField()
@@ -16,36 +20,21 @@ class PrivateGroupReadSerializer(serializers.HyperlinkedModelSerializer):
         model = PrivateGroup
         fields = ['self', 'group_name', 'creator', 'members']
         read_only_fields = ['self', 'group_name', 'creator', 'members']
+        # Listing members for every group would obfuscate list output.
+        expandable = ['members']
+        list_serializer_class = CompiledListSerializer
 
+    @uses_related('memberships__user', serializer=UserSerializer)
     def get_members(self, obj):
         '''
         Get the members (users) in the group.
 
-        Takes an optional 'is_list' key in the context dictionary. When set to
-        True, the members won't be listed. This makes the response cleaner when
-        listing multiple groups, as including members can obfuscate the output.
-        '''
-        # Set value to None to be later remove in the representation.
-        if self.context.get('is_list', False) is True:
-            return None
-        
-        members = User.objects.filter(private_memberships__group=obj)
-
-        return UserSerializer(
-                members,
-                many=True,
-                context={'request': self.context['request']}
-        ).data
-
-    def to_representation(self, instance):
-        '''
-        Override to_representation to not include 'members' if the value is
-        None (triggered from get_members function).
+        Not rendered in lists unless expanded (see Meta.expandable).
         '''
-        rep = super().to_representation(instance)
-        if rep['members'] is None:
-            del rep['members']
-        return rep
+        # Iterate the relation (rather than querying users) so that a
+        # prefetched memberships is used.
+        members = [membership.user for membership in obj.memberships.all()]
+        return render_nested(UserSerializer, members, self.context, many=True)
 
 class PrivateGroupWriteSerializer(serializers.HyperlinkedModelSerializer):
     '''
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.private_groups.models import PrivateGroup, PrivateGroupMembership
+from apps.users.models import User
+from apps.users.signals import is_login
+from utils.generations import bump_generation
+
+'''
+Invalidates the cached private group lists of a creator (see
+utils/generations.py) when their groups, the groups' members or the
+members' cards change.
+'''
+
+@receiver(post_save, sender=PrivateGroup)
+@receiver(post_delete, sender=PrivateGroup)
+def group_changed(sender, instance, **kwargs):
+    bump_generation(instance.creator_id)
+
+@receiver(post_save, sender=PrivateGroupMembership)
+@receiver(post_delete, sender=PrivateGroupMembership)
+def membership_changed(sender, instance, **kwargs):
+    creator_id = (PrivateGroup.objects.filter(id=instance.group_id)
+            .values_list('creator_id', flat=True).first())
+    bump_generation(creator_id)
+
+@receiver(post_save, sender=User)
+def member_changed(sender, instance, created, **kwargs):
+    if created or is_login(kwargs):
+        return
+    bump_generation(*PrivateGroupMembership.objects.filter(user=instance)
+            .values_list('group__creator_id', flat=True))
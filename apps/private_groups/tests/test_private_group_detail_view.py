@@ -10,6 +10,7 @@ Classes:
     - GetSinglePrivateGroupsTest: Provides methods to test GET on private-group-detail endpoint.
     - UpdatePrivateGroupTest: Provides methods to test POST on private-group-detail endpoint.
     - DeletePrivateGroupTest: Provides methods to test POST on private-group-detail endpoint.
+    - ConditionalPrivateGroupTest: Provides methods to test If-Match on private-group-detail endpoint.
 '''
 
 class GetSinglePrivateGroupTest(APITestCase):
@@ -255,3 +256,27 @@ class DeletePrivateGroupTest(APITestCase):
                 reverse(self.url, args=[999]),
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ConditionalPrivateGroupTest(APITestCase):
+    ''' Tests conditional PUT/PATCH of an instance of Private Group '''
+    def setUp(self):
+        helper = TestHelper()
+
+        self.creator = helper.create_user()
+        self.members = [helper.create_user() for i in range(2)]
+        self.priv_group = helper.create_priv_group(self.creator, self.members)
+        self.url = reverse('private-group-detail', args=[self.priv_group.id])
+        self.client.force_authenticate(user=self.creator)
+
+    def test_patch_with_current_etag(self):
+        ''' Should be able to update a group that didn't change since it was retrieved '''
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'group_name': 'CHANGED'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_patch_after_member_change(self):
+        ''' Should not be able to update a group whose members changed since it was retrieved '''
+        etag = self.client.get(self.url)['ETag']
+        self.priv_group.memberships.first().delete()
+        response = self.client.patch(self.url, {'group_name': 'CHANGED'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
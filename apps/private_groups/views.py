@@ -5,6 +5,10 @@ from apps.private_groups.models import PrivateGroup, PrivateGroupMembership
 from apps.private_groups.permissions import IsRequestedUser, IsCreator
 from apps.users.models import User
 from django.shortcuts import get_object_or_404
+from utils.query_planner import PlannedQuerysetMixin
+from utils.streaming import StreamingListMixin
+from utils.response_cache import CachedListMixin
+from utils.conditional import ConditionalDetailMixin
 
 '''
 Handles views for PrivateGroups and PrivateGroupMembers.
@@ -13,12 +17,16 @@ Naming convention notes:
     'ListView' = collection/
     'DetailView' = collection/<collection_item>/
 '''
-class PrivateGroupListView(ListCreateAPIView):
+class PrivateGroupListView(StreamingListMixin, CachedListMixin, PlannedQuerysetMixin, ListCreateAPIView):
     '''
     List and create private groups.
 
     Should be nested under user-detail view.
     '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-created_at', '-id')
+
     def get_permissions(self):
         if self.request.method == 'GET':
             permission_classes = [IsRequestedUser | permissions.IsAdminUser]
@@ -31,23 +39,12 @@ class PrivateGroupListView(ListCreateAPIView):
     def get_serializer_class(self):
         return (PrivateGroupReadSerializer if self.request.method == 'GET'
                 else PrivateGroupWriteSerializer)
-
-    def get_serializer_context(self):
-        ''' 
-        Override this function to add 'is_list' key into the context 
-        dictionary. In the serializer, if 'is_list' is true, then we won't
-        list the members in the serialized output.
-        '''
-        context = super().get_serializer_context()
-        if self.request.method == 'GET':
-            context['is_list'] = True
-        return context
     
     def get_queryset(self):
         user = get_object_or_404(User.objects.all(), id=self.kwargs['user_id'])
         return PrivateGroup.objects.filter(creator=user)
 
-class PrivateGroupDetailView(RetrieveUpdateDestroyAPIView):
+class PrivateGroupDetailView(ConditionalDetailMixin, PlannedQuerysetMixin, RetrieveUpdateDestroyAPIView):
     ''' View to retrieve, update, or delete a Private Group instance. '''
 
     queryset = PrivateGroup.objects.all()
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from utils import fragments
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
+
+    def ready(self):
+        fragments.track(self.get_model('User'))
+        import apps.users.signals
@@ -15,3 +15,9 @@ class User(AbstractUser):
     username = models.CharField(max_length=24, unique=True)
     email = models.EmailField(max_length=254, unique=True, blank=False)
     storage_limit = models.BigIntegerField(default=10737418240) # default is 10GB 
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The user list, oldest first (keyset pagination).
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx')
+        ]
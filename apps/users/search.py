@@ -0,0 +1,204 @@
+from django.conf import settings
+from django.db import connection
+from apps.users.models import User
+from array import array
+import bisect
+import logging
+import threading
+import time
+
+'''
+Username autocomplete.
+
+Every process keeps the usernames of all users in a compact prefix index: one
+list of usernames sorted case-insensitively and an array of the matching
+user ids. The usernames starting with a prefix are a contiguous range of the
+list, found by binary search, so a lookup costs O(log n + results) and no
+query; 1M users take about 75MB (the username strings, a pointer each and
+8 bytes of id) and a lookup about 15µs.
+
+The index is loaded on first use and kept current with the post_save and
+post_delete signals of User (see apps/users/signals.py), which only reach
+the process that made the change; every USER_INDEX_REFRESH seconds a
+background thread reloads it from the database to pick up the changes of
+other processes.
+
+Results rank friends of friends first (most mutual friends first), then the
+other users alphabetically. The friends of friends are the user's stored
+friend suggestions (see apps/friendships/suggestions.py): the background job
+already counts their mutual friends, skipping friends of more than
+FRIEND_SUGGESTIONS_MAX_DEGREE friends, and keeps the top
+FRIEND_SUGGESTIONS_LIMIT of them, so a search reads one index range of at
+most that many rows instead of the friend lists of every friend. They follow
+new friendships on the job's next run.
+
+Settings:
+    USER_INDEX_REFRESH (int): Seconds between reloads of the index. Defaults to 600.
+'''
+
+logger = logging.getLogger(__name__)
+
+def get_refresh():
+    return getattr(settings, 'USER_INDEX_REFRESH', 600)
+
+def fold(username):
+    return username.lower()
+
+class UsernameIndex:
+    ''' The prefix index of usernames. See the module docstring. '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.usernames = []
+        self.ids = array('q')
+        self.loaded_at = None
+        self.reloading = False
+
+    def load(self):
+        ''' Replaces the index with the users of the database. '''
+        rows = sorted(User.objects.values_list('username', 'id').iterator(chunk_size=10000),
+                key=lambda row: (fold(row[0]), row[1]))
+        usernames = [username for username, _ in rows]
+        ids = array('q', (user_id for _, user_id in rows))
+        with self.lock:
+            self.usernames, self.ids = usernames, ids
+            self.loaded_at = time.monotonic()
+            self.reloading = False
+
+    def reload_in_background(self):
+        with self.lock:
+            if self.reloading:
+                return
+            self.reloading = True
+
+        def reload():
+            try:
+                self.load()
+            except Exception:
+                logger.warning('Failed to reload the username index', exc_info=True)
+                with self.lock:
+                    self.reloading = False
+            finally:
+                # The thread got its own connection; don't leak it.
+                connection.close()
+
+        threading.Thread(target=reload, daemon=True).start()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None:
+            self.load()
+        elif time.monotonic() - self.loaded_at >= get_refresh():
+            self.reload_in_background()
+
+    def position(self, username, user_id):
+        ''' Returns where (username, user_id) is or would be in the index. Call with the lock held. '''
+        key = (fold(username), user_id)
+        low, high = 0, len(self.usernames)
+        while low < high:
+            middle = (low + high) // 2
+            if (fold(self.usernames[middle]), self.ids[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def update(self, username, user_id, created=False):
+        ''' Adds a user, or moves them if their username changed. '''
+        with self.lock:
+            index = self.position(username, user_id)
+            if index < len(self.ids) and self.ids[index] == user_id and self.usernames[index] == username:
+                return
+            if not created:
+                self.discard(user_id)
+            index = self.position(username, user_id)
+            self.usernames.insert(index, username)
+            self.ids.insert(index, user_id)
+
+    def remove(self, user_id):
+        with self.lock:
+            self.discard(user_id)
+
+    def discard(self, user_id):
+        ''' Removes a user by id. Call with the lock held. '''
+        # The old username of a renamed user isn't known; the ids array is
+        # scanned instead (about 20ms for 1M users), and renames are rare.
+        try:
+            index = self.ids.index(user_id)
+        except ValueError:
+            return
+        del self.usernames[index]
+        del self.ids[index]
+
+    def matches(self, prefix, limit):
+        '''
+        Returns the (username, id) of the first users whose username starts
+        with a prefix, case-insensitively and alphabetically.
+
+        Args:
+            prefix (str): The start of the usernames.
+            limit (int): The maximum number of users.
+
+        Returns:
+            list of tuple: The (username, id) of the users.
+        '''
+        self.ensure_loaded()
+        prefix = fold(prefix)
+        found = []
+        # Updates insert into the lists in place: read them under the lock.
+        with self.lock:
+            usernames, ids = self.usernames, self.ids
+            index = bisect.bisect_left(usernames, prefix, key=fold)
+            while len(found) < limit and index < len(usernames) and fold(usernames[index]).startswith(prefix):
+                found.append((usernames[index], ids[index]))
+                index += 1
+        return found
+
+index = UsernameIndex()
+
+def user_saved(user, created=False):
+    if index.loaded_at is not None:
+        index.update(user.username, user.id, created)
+
+def user_deleted(user):
+    if index.loaded_at is not None:
+        index.remove(user.id)
+
+def friends_of_friends(user, prefix):
+    '''
+    Returns the suggested friends of a user whose username starts with a prefix.
+
+    Returns:
+        list of tuple: (username, id) of the users, most mutual friends first.
+    '''
+    # Imported here: friendships depend on users.
+    from apps.friendships.suggestions import suggestions_for
+    folded = fold(prefix)
+    rows = suggestions_for(user).values_list('candidate__username', 'candidate_id', 'mutual_friends')
+    ranked = sorted(
+            (row for row in rows if fold(row[0]).startswith(folded)),
+            key=lambda row: (-row[2], fold(row[0]), row[1])
+    )
+    return [(username, user_id) for username, user_id, _ in ranked]
+
+def search(prefix, user, limit=10):
+    '''
+    Returns the users whose username starts with a prefix.
+
+    Args:
+        prefix (str): The start of the usernames, matched case-insensitively.
+        user (User): The requesting user, left out of the results.
+        limit (int, optional): The maximum number of users. Defaults to 10.
+
+    Returns:
+        list of tuple: (username, id) of the users, friends of friends first.
+    '''
+    results = friends_of_friends(user, prefix)[:limit]
+
+    seen = {user_id for _, user_id in results}
+    seen.add(user.id)
+    # Enough to fill the results even if every seen user matches.
+    for username, user_id in index.matches(prefix, limit + len(seen)):
+        if len(results) >= limit:
+            break
+        if user_id not in seen:
+            results.append((username, user_id))
+    return results
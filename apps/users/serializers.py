@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from apps.users.models import User
+from utils.serializers import BaseHyperlinkedSerializer
+from utils.compiled import CompiledListSerializer
+from utils.query_planner import uses_related
 
-class UserSerializer(serializers.HyperlinkedModelSerializer): 
+class UserSerializer(BaseHyperlinkedSerializer): 
     class Meta:
         model = User
         fields = ['self', 'id', 'username', 'password', 'email', 'first_name', 'last_name']
@@ -11,6 +14,9 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
                 'first_name': {'write_only': True},
                 'last_name': {'write_only': True}
         }
+        list_serializer_class = CompiledListSerializer
+        # User cards are rendered in most lists (see utils.fragments).
+        cache_fragments = True
 
     def create(self, validated_data):
         password = validated_data.pop('password')
@@ -18,3 +24,45 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         user.set_password(password)
         user.save()
         return user
+
+def get_graph():
+    # Imported here: friendships depend on users.
+    from apps.friendships.graph import graph
+    return graph
+
+class UserProfileSerializer(UserSerializer):
+    '''
+    Serializer class for the detail of a user: their card, their number of
+    friends and, for another signed-in user, whether they are friends and how
+    many friends they have in common. Counts come from the in-memory
+    friendship graph (see apps/friendships/graph.py).
+
+    NOTE: requires "request" in the context dict from the calling view.
+    '''
+    friend_count = serializers.SerializerMethodField()
+    is_friend = serializers.SerializerMethodField()
+    mutual_friend_count = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['friend_count', 'is_friend', 'mutual_friend_count']
+        # Only rendered for a viewer who isn't the user.
+        omit_if_none = ['is_friend', 'mutual_friend_count']
+        cache_fragments = False
+
+    def get_viewer_id(self, obj):
+        user = self.context['request'].user
+        return user.id if user.is_authenticated and user.id != obj.id else None
+
+    @uses_related()
+    def get_friend_count(self, obj):
+        return get_graph().friend_count(obj.id)
+
+    @uses_related()
+    def get_is_friend(self, obj):
+        viewer_id = self.get_viewer_id(obj)
+        return None if viewer_id is None else get_graph().are_friends(viewer_id, obj.id)
+
+    @uses_related()
+    def get_mutual_friend_count(self, obj):
+        viewer_id = self.get_viewer_id(obj)
+        return None if viewer_id is None else len(get_graph().mutual_friends(viewer_id, obj.id))
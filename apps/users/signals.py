@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.users.models import User
+from apps.users import search
+from utils.generations import bump_generation
+
+'''
+Invalidates the cached lists of a user (see utils/generations.py) when
+the user changes, and keeps the username index (see apps/users/search.py)
+up to date. Other apps invalidate the lists that embed the user's card.
+'''
+
+def is_login(kwargs):
+    ''' Whether a save only records a login (which isn't rendered anywhere). '''
+    update_fields = kwargs.get('update_fields')
+    return update_fields is not None and set(update_fields) <= {'last_login'}
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    if not is_login(kwargs):
+        bump_generation(instance.id)
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not is_login(kwargs):
+        search.user_saved(instance, created)
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    search.user_deleted(instance)
@@ -0,0 +1,127 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.friendships.models import Friendship
+from apps.friendships.suggestions import compute_suggestions
+from apps.users.models import User
+from apps.users import search
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+'''
+This module provides tests for username autocomplete (apps/users/search.py).
+
+Classes:
+    - UsernameIndexTest: Provides methods to test the in-memory username index.
+    - UserSearchViewTest: Provides methods to test searching users through the API.
+'''
+def make_user(username):
+    return User.objects.create(username=username, email=f'{username}@test.com')
+
+class UsernameIndexTest(APITestCase):
+    ''' Tests that the index finds usernames by prefix and follows user saves '''
+
+    def setUp(self):
+        self.users = [make_user(username) for username in ('bob', 'Bobby', 'alice', 'bobcat')]
+        self.index = search.UsernameIndex()
+        self.index.load()
+
+    def find(self, prefix):
+        return [username for username, _ in self.index.matches(prefix, 10)]
+
+    def test_prefix(self):
+        ''' Matches should be case-insensitive and alphabetical '''
+        self.assertEqual(self.find('BOB'), ['bob', 'Bobby', 'bobcat'])
+        self.assertEqual(self.find('al'), ['alice'])
+        self.assertEqual(self.find('z'), [])
+
+    def test_update(self):
+        ''' New, renamed and deleted users should be reflected without a reload '''
+        search.index, old_index = self.index, search.index
+        try:
+            make_user('bobo')
+            self.users[0].username = 'zed'
+            self.users[0].save()
+            self.users[1].delete()
+            self.assertEqual(self.find('bob'), ['bobcat', 'bobo'])
+            self.assertEqual(self.find('z'), ['zed'])
+        finally:
+            search.index = old_index
+
+    def test_no_queries(self):
+        ''' Lookups in a loaded index shouldn't query the database '''
+        with self.assertNumQueries(0):
+            self.find('bo')
+
+class UserSearchViewTest(APITestCase):
+    ''' Tests that searches rank friends of friends first '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = make_user('me')
+        self.friend = make_user('friend')
+        self.other_friend = make_user('otherfriend')
+        self.strangers = [make_user(f'sam{index}') for index in range(3)]
+        # sam2 is a friend of both friends, sam1 of one of them.
+        for user1, user2 in ((self.user, self.friend), (self.user, self.other_friend),
+                (self.friend, self.strangers[2]), (self.strangers[2], self.other_friend),
+                (self.strangers[1], self.friend)):
+            Friendship.objects.create(user1=user1, user2=user2, status='accepted')
+        compute_suggestions()
+        search.index.load()
+        self.url = reverse('user-search')
+
+    def get_names(self, **params):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data]
+
+    def test_rank(self):
+        ''' Friends of friends should come first, most mutual friends first '''
+        self.assertEqual(self.get_names(prefix='sa'), ['sam2', 'sam1', 'sam0'])
+        self.assertEqual(self.get_names(prefix='sa', limit=2), ['sam2', 'sam1'])
+
+    def test_requester_left_out(self):
+        ''' The requesting user shouldn't find themselves '''
+        self.assertEqual(self.get_names(prefix='m'), [])
+
+    def test_new_friendship(self):
+        ''' Friends of friends should follow new friendships of the user once suggestions are recomputed '''
+        new_friend = make_user('newfriend')
+        Friendship.objects.create(user1=new_friend, user2=self.strangers[0], status='accepted')
+        Friendship.objects.create(user1=self.user, user2=new_friend, status='accepted')
+        self.assertEqual(self.get_names(prefix='sa'), ['sam2', 'sam1', 'sam0'])
+        compute_suggestions()
+        self.assertEqual(self.get_names(prefix='sa'), ['sam2', 'sam0', 'sam1'])
+
+    def test_new_friend_left_out(self):
+        ''' A friend of friend the user befriended since the last run shouldn't be ranked first '''
+        Friendship.objects.create(user1=self.user, user2=self.strangers[1], status='accepted')
+        self.assertEqual(self.get_names(prefix='sa'), ['sam2', 'sam0', 'sam1'])
+
+    @override_settings(FRIEND_SUGGESTIONS_MAX_DEGREE=2)
+    def test_max_degree(self):
+        ''' The friends of friends with more friends than the degree limit should be skipped '''
+        compute_suggestions()
+        self.assertEqual(self.get_names(prefix='sa'), ['sam2', 'sam0', 'sam1'])
+
+    def test_queries(self):
+        ''' Ranking shouldn't read the friend lists of the user's friends '''
+        with self.assertNumQueries(1):
+            search.search('sa', self.user)
+
+    def test_rendered_from_index(self):
+        ''' Results should link to the users '''
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {'prefix': 'friend'})
+        self.assertEqual(response.data[0]['id'], self.friend.id)
+        self.assertTrue(response.data[0]['self'].endswith(reverse('user-detail', args=[self.friend.id])))
+
+    def test_invalid(self):
+        ''' Searches need a prefix and an authenticated user '''
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url, {'prefix': 'a'}).status_code, 401)
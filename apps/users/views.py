@@ -2,13 +2,60 @@ from django.http import HttpResponse, JsonResponse
 from rest_framework.parsers import JSONParser
 from rest_framework.viewsets import ModelViewSet
 from apps.users.models import User
-from apps.users.serializers import UserSerializer
+from apps.users.serializers import UserSerializer, UserProfileSerializer
 from apps.users.permissions import IsUserOrReadOnly
 from rest_framework import permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from apps.users.search import search as search_usernames
+from utils.query_planner import PlannedQuerysetMixin
+from utils.streaming import StreamingListMixin
+from utils.conditional import ConditionalDetailMixin, ConditionalListMixin
+from utils.generations import get_generation
 
 # Create your views here.
-class UserViewSet(ModelViewSet):
+class UserViewSet(StreamingListMixin, ConditionalListMixin, ConditionalDetailMixin, PlannedQuerysetMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    # A user's card and friendships bump their own generation.
+    etag_owner_field = 'id'
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('date_joined', 'id')
     permission_classes = [permissions.IsAdminUser | IsUserOrReadOnly]
+    # Autocomplete results are capped rather than paginated.
+    search_limit = 10
+    max_search_limit = 50
 
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return UserProfileSerializer
+        return UserSerializer
+
+    def get_etag_generations(self, instance, owner_id):
+        viewer = self.request.user
+        if viewer.is_authenticated and viewer.id != owner_id:
+            # Whether they are friends and their mutual friends also change
+            # with the viewer's friendships.
+            return (get_generation(viewer.id),)
+        return ()
+
+    @action(detail=False, url_path='search', permission_classes=[permissions.IsAuthenticated])
+    def search(self, request):
+        '''
+        Lists the users whose username starts with ?prefix=, friends of friends
+        first, from the in-memory username index (see apps/users/search.py).
+        '''
+        prefix = request.query_params.get('prefix', '').strip()
+        if not prefix:
+            raise ValidationError({'prefix': ['This parameter is required.']})
+        try:
+            limit = min(int(request.query_params.get('limit', self.search_limit)), self.max_search_limit)
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        # Rendered from the index, without loading the users.
+        users = [
+                User(id=user_id, username=username)
+                for username, user_id in search_usernames(prefix, request.user, max(limit, 1))
+        ]
+        return Response(self.get_serializer(users, many=True).data)
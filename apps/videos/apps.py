@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+from utils import fragments
 
 
 class VideosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.videos'
+
+    def ready(self):
+        fragments.track(self.get_model('Video'))
+        import apps.videos.signals
+        from apps.videos import search
+        post_migrate.connect(search.install_triggers, sender=self)
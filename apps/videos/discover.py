@@ -0,0 +1,132 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from apps.videos.models import Video
+from utils.pagination import EntryPagination
+import bisect
+
+'''
+Discover: public videos of every creator, most popular first.
+
+Popularity is a time-decayed score of a video's views (the "gravity" ranking
+of news aggregators):
+
+    score = views / (age in hours + 2) ** DISCOVER_GRAVITY
+
+Since every score decays continuously, scores aren't updated on each view.
+recompute_scores() recomputes them for all public videos in batches (run by
+the recompute_discover_scores job every DISCOVER_INTERVAL seconds, or with
+`manage.py recomputescores`) and stores them in Video.score, backed by a
+partial index on public videos.
+
+The top DISCOVER_WINDOW (score, id) pairs are cached as one window that is
+replaced after each recomputation; pages are cut from the window, so serving
+discover doesn't touch the scores at all. New videos show up after the next
+recomputation.
+
+Settings:
+    DISCOVER_GRAVITY (float): How fast scores decay. Defaults to 1.5.
+    DISCOVER_INTERVAL (int): Seconds between recomputations. Defaults to 300.
+    DISCOVER_WINDOW (int): Number of videos discover lists. Defaults to 500.
+'''
+
+WINDOW_KEY = 'discover:window'
+
+def get_gravity():
+    return getattr(settings, 'DISCOVER_GRAVITY', 1.5)
+
+def get_interval():
+    return getattr(settings, 'DISCOVER_INTERVAL', 300)
+
+def get_window_size():
+    return getattr(settings, 'DISCOVER_WINDOW', 500)
+
+def compute_scores(views, uploaded_at, now, gravity):
+    '''
+    Returns the scores of a batch of videos.
+
+    Args:
+        views (list of int): The views of the videos.
+        uploaded_at (list of datetime): The upload times of the videos.
+        now (datetime): The reference time.
+        gravity (float): How fast scores decay.
+
+    Returns:
+        list of float: The scores, in the same order.
+    '''
+    ages = [max((now - uploaded).total_seconds(), 0) / 3600 for uploaded in uploaded_at]
+    return [count / (age + 2) ** gravity for count, age in zip(views, ages)]
+
+def recompute_scores(chunk_size=1000):
+    '''
+    Recomputes the scores of every public video, a chunk at a time, then
+    replaces the cached window.
+
+    Returns:
+        int: The number of updated videos.
+    '''
+    now = timezone.now()
+    gravity = get_gravity()
+    updated = 0
+    last_id = 0
+    while True:
+        chunk = list(Video.objects.filter(is_public=True, id__gt=last_id).order_by('id')
+                .values_list('id', 'views', 'uploaded_at', 'score')[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        ids, views, uploaded_at, scores = zip(*chunk)
+        videos = [
+                Video(id=video_id, score=score)
+                for video_id, score, old in zip(ids, compute_scores(views, uploaded_at, now, gravity), scores)
+                if score != old
+        ]
+        Video.objects.bulk_update(videos, ['score'], batch_size=chunk_size)
+        updated += len(videos)
+    refresh_window()
+    return updated
+
+def load_window():
+    return list(Video.objects.filter(is_public=True).order_by('-score', '-id')
+            .values_list('score', 'id')[:get_window_size()])
+
+def refresh_window():
+    window = load_window()
+    # Kept until replaced; the timeout only bounds a window that stopped being recomputed.
+    cache.set(WINDOW_KEY, window, get_interval() * 2)
+    return window
+
+def get_window():
+    ''' Returns the cached (score, id) pairs of the top videos, most popular first. '''
+    window = cache.get(WINDOW_KEY)
+    if window is None:
+        window = refresh_window()
+    return window
+
+def read_window(cursor=None, limit=50):
+    '''
+    Returns a page of the window.
+
+    Args:
+        cursor (tuple, optional): (score, id) of the last entry of the previous
+            page. Defaults to None (the first page).
+        limit (int, optional): The maximum number of entries. Defaults to 50.
+    '''
+    window = get_window()
+    start = 0
+    if cursor is not None:
+        # The window is sorted by descending (score, id).
+        keys = [(-score, -video_id) for score, video_id in window]
+        start = bisect.bisect_right(keys, (-cursor[0], -cursor[1]))
+    return window[start:start + limit]
+
+class DiscoverPagination(EntryPagination):
+    '''
+    Paginates discover by (score, id) cursor within the cached window. The view's
+    queryset only holds public videos, which drops videos unpublished since the
+    window was cached.
+    '''
+    names = ['score', 'id']
+
+    def get_entries(self, request, view, cursor, limit):
+        return read_window(cursor, limit)
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from apps.friendships.models import Friendship, FriendshipEdge
+from apps.videos.models import Video, Shared, VideoVisibility, TimelineEntry
+from apps.videos.visibility import after
+from utils.pagination import EntryPagination
+import heapq
+import itertools
+
+'''
+Home feed: the videos of a user's friends and the videos shared with them,
+most recent first.
+
+The feed is a hybrid of fan-out on write and fan-out on read:
+    - When a video is uploaded, published or shared, a background job
+      (apps/videos/tasks.py) writes a TimelineEntry for each of its viewers:
+      the users it is shared with and, if it is public, the creator's friends.
+      Reading such a feed is one range of the timeline index.
+    - Creators with at least FEED_FANOUT_LIMIT friends would write too many
+      rows per upload, so their public videos aren't fanned out. Instead, a
+      read pulls the recent public videos of the high-degree friends of the
+      viewer from the visibility index (apps/videos/visibility.py) and merges
+      them with the timeline (a k-way heap merge of sorted streams).
+
+Every stream is read from the page's cursor with LIMIT page_size + 1, so a
+page costs a few index ranges whatever the size of the feed.
+
+Settings:
+    FEED_FANOUT_LIMIT (int): Friends above which a creator's public videos are
+        pulled on read. Defaults to 1000.
+    FEED_BACKFILL (int): Recent public videos added to a feed when its user
+        makes a friend. Defaults to 100.
+'''
+
+HIGH_DEGREE_KEY = 'feed:high-degree'
+HIGH_DEGREE_TIMEOUT = 300
+
+def get_fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+def get_backfill():
+    return getattr(settings, 'FEED_BACKFILL', 100)
+
+def high_degree_users():
+    '''
+    Returns the ids of the users with at least FEED_FANOUT_LIMIT friends. Cached
+    for HIGH_DEGREE_TIMEOUT seconds, and used by both writes and reads so that
+    they agree on who is pulled.
+    '''
+    users = cache.get(HIGH_DEGREE_KEY)
+    if users is None:
+        users = frozenset(
+                FriendshipEdge.objects.filter(status='accepted')
+                .values('owner').annotate(count=Count('id'))
+                .filter(count__gte=get_fanout_limit()).values_list('owner', flat=True)
+        )
+        cache.set(HIGH_DEGREE_KEY, users, HIGH_DEGREE_TIMEOUT)
+    return users
+
+def read_feed(viewer_id, cursor=None, limit=50):
+    '''
+    Returns a page of a user's feed.
+
+    Args:
+        viewer_id (int): The user whose feed is read.
+        cursor (tuple, optional): (uploaded_at, video_id) of the last entry of
+            the previous page. Defaults to None (the first page).
+        limit (int, optional): The maximum number of entries. Defaults to 50.
+
+    Returns:
+        list of tuple: (uploaded_at, video_id) entries, most recent first.
+    '''
+    streams = [TimelineEntry.objects.filter(after(cursor), viewer_id=viewer_id)]
+    pulled = Friendship.objects.friend_ids_of_user(viewer_id) & high_degree_users()
+    streams += [
+            VideoVisibility.objects.filter(after(cursor), creator_id=creator_id, viewer__isnull=True)
+            for creator_id in pulled
+    ]
+    streams = [
+            stream.order_by('-uploaded_at', '-video_id').values_list('uploaded_at', 'video_id')[:limit]
+            for stream in streams
+    ]
+    # A video shared with the viewer may also be pulled.
+    seen = set()
+    entries = (
+            entry for entry in heapq.merge(*streams, reverse=True)
+            if not (entry[1] in seen or seen.add(entry[1]))
+    )
+    return list(itertools.islice(entries, limit))
+
+def fan_out_video(video_id):
+    ''' Writes (or removes) the timeline entries of a video to match its viewers. '''
+    video = Video.objects.filter(id=video_id).values_list('creator_id', 'is_public', 'uploaded_at').first()
+    if video is None:
+        return
+    creator_id, is_public, uploaded_at = video
+
+    viewers = set(Shared.objects.filter(video_id=video_id).values_list('user_id', flat=True))
+    if is_public and creator_id is not None and creator_id not in high_degree_users():
+        viewers |= Friendship.objects.friend_ids_of_user(creator_id)
+    viewers.discard(creator_id)
+
+    entries = TimelineEntry.objects.filter(video_id=video_id)
+    existing = set(entries.values_list('viewer_id', flat=True))
+    entries.exclude(viewer_id__in=viewers).delete()
+    entries.exclude(uploaded_at=uploaded_at).update(uploaded_at=uploaded_at)
+    TimelineEntry.objects.bulk_create([
+            TimelineEntry(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+            for viewer_id in viewers - existing
+    ], batch_size=1000, ignore_conflicts=True)
+
+def sync_friend_timelines(user_id, friend_id):
+    '''
+    Adds the recent public videos of two new friends to each other's feeds, or
+    removes them (but not the videos shared with the user) when they are no
+    longer friends.
+    '''
+    are_friends = friend_id in Friendship.objects.friend_ids_of_user(user_id)
+    high_degree = high_degree_users()
+    for viewer_id, creator_id in ((user_id, friend_id), (friend_id, user_id)):
+        if not are_friends:
+            (TimelineEntry.objects.filter(viewer_id=viewer_id, creator_id=creator_id)
+                    .exclude(video__shared_with__user_id=viewer_id).delete())
+        elif creator_id not in high_degree:
+            recent = (Video.objects.filter(creator_id=creator_id, is_public=True)
+                    .order_by('-uploaded_at', '-id').values_list('id', 'uploaded_at')[:get_backfill()])
+            TimelineEntry.objects.bulk_create([
+                    TimelineEntry(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+                    for video_id, uploaded_at in recent
+            ], ignore_conflicts=True)
+
+class FeedPagination(EntryPagination):
+    '''
+    Paginates a feed by (uploaded_at, id) cursor. The view's queryset only holds
+    the videos the viewer can see, which drops entries whose video was unshared
+    since it was fanned out.
+    '''
+    names = ['uploaded_at', 'id']
+
+    def get_entries(self, request, view, cursor, limit):
+        return read_feed(request.user.id, cursor, limit)
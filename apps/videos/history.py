@@ -0,0 +1,215 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.videos.models import HistoryEntry, Video
+from apps.users.models import User
+from utils.pagination import EntryPagination
+import atexit
+import logging
+import threading
+import time
+
+'''
+Watch history: the videos a user watched, most recent first, with the
+position to resume each of them from.
+
+Players report their position every few seconds, so writing each report
+would mostly rewrite the same rows. Reports are coalesced in a per-process
+buffer instead, where only the last position of each (user, video) is kept,
+and written with one upsert per flush:
+
+    INSERT INTO videos_historyentry (user_id, video_id, position, watched_at) VALUES ...
+    ON CONFLICT (user_id, video_id) DO UPDATE SET position = EXCLUDED.position, ...
+
+A flush happens when the buffer holds WATCH_HISTORY_FLUSH_SIZE entries, on
+the first report received WATCH_HISTORY_FLUSH_INTERVAL seconds after the
+last flush, and when the process exits. Reading a history first flushes
+the buffered entries of its user, so a user sees their own reports at once
+(reports buffered by other processes show up after their next flush).
+
+Each flush then evicts the oldest entries of the flushed users beyond
+WATCH_HISTORY_LIMIT, so a history never holds more than the limit for
+longer than a flush.
+
+Entries of videos or users deleted while they were buffered are dropped at
+the flush; the foreign key would fail the whole upsert otherwise.
+
+Settings:
+    WATCH_HISTORY_LIMIT (int): Entries kept per user. Defaults to 200.
+    WATCH_HISTORY_FLUSH_SIZE (int): Buffered entries that trigger a flush. Defaults to 500.
+    WATCH_HISTORY_FLUSH_INTERVAL (float): Seconds after which a report triggers a flush. Defaults to 10.
+'''
+
+logger = logging.getLogger(__name__)
+
+# Entries written per INSERT statement.
+FLUSH_BATCH_SIZE = 500
+
+def get_limit():
+    return getattr(settings, 'WATCH_HISTORY_LIMIT', 200)
+
+def get_flush_size():
+    return getattr(settings, 'WATCH_HISTORY_FLUSH_SIZE', 500)
+
+def get_flush_interval():
+    return getattr(settings, 'WATCH_HISTORY_FLUSH_INTERVAL', 10)
+
+class HistoryBuffer:
+    '''
+    A thread-safe buffer of playback positions, keeping the last one of each
+    (user, video). See the module docstring.
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        # {user id: {video id: (position, watched_at)}}
+        self.pending = {}
+        self.size = 0
+        self.last_flush = time.monotonic()
+
+    def record(self, user_id, video_id, position, watched_at=None):
+        ''' Buffers a position, flushing the buffer when it's due. '''
+        watched_at = watched_at or timezone.now()
+        with self.lock:
+            entries = self.pending.setdefault(user_id, {})
+            self.size += video_id not in entries
+            entries[video_id] = (position, watched_at)
+            due = (self.size >= get_flush_size() or
+                    time.monotonic() - self.last_flush >= get_flush_interval())
+        if due:
+            self.flush()
+
+    def take(self, user_id=None):
+        ''' Removes and returns the buffered entries, of every user or of one. '''
+        with self.lock:
+            if user_id is not None:
+                entries = self.pending.pop(user_id, None)
+                if entries is None:
+                    return {}
+                self.size -= len(entries)
+                return {user_id: entries}
+            pending, self.pending, self.size = self.pending, {}, 0
+            self.last_flush = time.monotonic()
+        return pending
+
+    def restore(self, pending):
+        ''' Puts back entries that failed to be written, unless newer ones were buffered since. '''
+        with self.lock:
+            for user_id, entries in pending.items():
+                current = self.pending.setdefault(user_id, {})
+                for video_id, entry in entries.items():
+                    if video_id not in current:
+                        current[video_id] = entry
+                        self.size += 1
+
+    def flush(self, user_id=None):
+        '''
+        Writes the buffered entries, of every user or of one.
+
+        Returns:
+            int: The number of written entries.
+        '''
+        pending = self.take(user_id)
+        if not pending:
+            return 0
+        try:
+            try:
+                return write_entries(pending)
+            except IntegrityError:
+                # A video or user was deleted between the check and the
+                # insert; check again.
+                return write_entries(pending)
+        except IntegrityError:
+            # Restoring entries that can't be written would block every later flush.
+            logger.warning('Dropped %d watch history entries', sum(map(len, pending.values())), exc_info=True)
+            return 0
+        except Exception:
+            logger.warning('Failed to flush %d watch history entries', sum(map(len, pending.values())), exc_info=True)
+            self.restore(pending)
+            return 0
+
+def write_entries(pending):
+    '''
+    Upserts entries ({user id: {video id: (position, watched_at)}}) of existing
+    users and videos, and evicts beyond the limit.
+
+    Returns:
+        int: The number of written entries.
+    '''
+    user_ids = set(User.objects.filter(id__in=pending.keys()).values_list('id', flat=True))
+    video_ids = set(Video.objects.filter(
+            id__in={video_id for videos in pending.values() for video_id in videos}
+    ).values_list('id', flat=True))
+    entries = [
+            HistoryEntry(user_id=user_id, video_id=video_id, position=position, watched_at=watched_at)
+            for user_id, videos in pending.items() if user_id in user_ids
+            for video_id, (position, watched_at) in videos.items() if video_id in video_ids
+    ]
+    if not entries:
+        return 0
+    with transaction.atomic():
+        HistoryEntry.objects.bulk_create(
+                entries,
+                batch_size=FLUSH_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['user', 'video'],
+                update_fields=['position', 'watched_at']
+        )
+        evict(user_ids)
+    return len(entries)
+
+def evict(user_ids):
+    ''' Deletes the oldest entries of users beyond WATCH_HISTORY_LIMIT. '''
+    limit = get_limit()
+    evicted = []
+    for user_id in user_ids:
+        # Reads past the limit on the history index; empty unless the user is over it.
+        evicted += (HistoryEntry.objects.filter(user_id=user_id)
+                .order_by('-watched_at', '-video_id').values_list('id', flat=True)[limit:])
+    if evicted:
+        HistoryEntry.objects.filter(id__in=evicted).delete()
+
+buffer = HistoryBuffer()
+atexit.register(buffer.flush)
+
+def record_position(user_id, video_id, position):
+    buffer.record(user_id, video_id, position)
+
+def after(cursor):
+    ''' Returns the filter of the entries after a (watched_at, video_id) cursor. '''
+    if cursor is None:
+        return Q()
+    watched_at, video_id = cursor
+    return Q(watched_at__lt=watched_at) | Q(watched_at=watched_at, video_id__lt=video_id)
+
+def read_history(user_id, cursor=None, limit=50):
+    '''
+    Returns a page of a user's watch history.
+
+    Args:
+        user_id (int): The user whose history is read.
+        cursor (tuple, optional): (watched_at, video_id) of the last entry of
+            the previous page. Defaults to None (the first page).
+        limit (int, optional): The maximum number of entries. Defaults to 50.
+
+    Returns:
+        list of tuple: (watched_at, video_id, position) entries, most recent first.
+    '''
+    return list(HistoryEntry.objects.filter(after(cursor), user_id=user_id)
+            .order_by('-watched_at', '-video_id').values_list('watched_at', 'video_id', 'position')[:limit])
+
+class HistoryPagination(EntryPagination):
+    '''
+    Paginates a watch history by (watched_at, video id) cursor. The positions of
+    the page are kept in `positions` ({video id: (position, watched_at)}) for the
+    serializer. The view's queryset only holds the videos the user can still
+    see.
+    '''
+    names = ['watched_at', 'video']
+    cursor_model = HistoryEntry
+
+    def get_entries(self, request, view, cursor, limit):
+        buffer.flush(request.user.id)
+        entries = read_history(request.user.id, cursor, limit)
+        self.positions = {video_id: (position, watched_at) for watched_at, video_id, position in entries}
+        return [(watched_at, video_id) for watched_at, video_id, _ in entries]
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from apps.videos.models import Like, LikeCounterShard
+from utils.generations import bump_generation
+import random
+
+'''
+Likes of videos, counted with sharded counters.
+
+A like is a Like row (one per user and video) and an increment of one of the
+video's LIKE_COUNTER_SHARDS counter rows, picked at random, in one
+transaction. Concurrent likes of a viral video update different rows instead
+of queueing on a single counter. Reading a count sums the shards; counts are
+cached per video (LIKE_COUNT_TIMEOUT) and deleted when they change.
+
+Lists load the counts and the viewer's likes of a whole page in one query each
+(see VideoReadSerializer.prepare_many).
+
+Settings:
+    LIKE_COUNTER_SHARDS (int): Counter rows per video. Defaults to 8.
+    LIKE_COUNT_TIMEOUT (int): Seconds a count is cached. Defaults to 300.
+'''
+
+def get_shards():
+    return getattr(settings, 'LIKE_COUNTER_SHARDS', 8)
+
+def get_timeout():
+    return getattr(settings, 'LIKE_COUNT_TIMEOUT', 300)
+
+def count_key(video_id):
+    return f'likes:{video_id}'
+
+def add_to_counter(video_id, delta):
+    ''' Adds delta to a random shard of a video's counter. '''
+    shard = random.randrange(get_shards())
+    shards = LikeCounterShard.objects.filter(video_id=video_id, shard=shard)
+    if shards.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            LikeCounterShard.objects.create(video_id=video_id, shard=shard, count=delta)
+    except IntegrityError:
+        # Created concurrently.
+        shards.update(count=F('count') + delta)
+
+def count_changed(video):
+    key = count_key(video.id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    # Lists of the creator render the count.
+    bump_generation(video.creator_id)
+
+def like(user, video):
+    '''
+    Likes a video.
+
+    Returns:
+        bool: False if the user already liked the video.
+    '''
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, video=video)
+            add_to_counter(video.id, 1)
+    except IntegrityError:
+        return False
+    count_changed(video)
+    return True
+
+def unlike(user, video):
+    '''
+    Removes a like of a video.
+
+    Returns:
+        bool: False if the user didn't like the video.
+    '''
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, video=video).delete()
+        if deleted:
+            add_to_counter(video.id, -1)
+    if deleted:
+        count_changed(video)
+    return bool(deleted)
+
+def get_counts(video_ids):
+    '''
+    Returns the like counts of videos, from the cache or summed from their shards.
+
+    Returns:
+        dict: Maps video ids to like counts.
+    '''
+    keys = {count_key(video_id): video_id for video_id in video_ids}
+    counts = {keys[key]: count for key, count in cache.get_many(keys).items()}
+    missed = [video_id for video_id in video_ids if video_id not in counts]
+    if missed:
+        summed = dict.fromkeys(missed, 0)
+        summed.update(LikeCounterShard.objects.filter(video_id__in=missed)
+                .values('video_id').annotate(total=Sum('count')).values_list('video_id', 'total'))
+        cache.set_many({count_key(video_id): count for video_id, count in summed.items()}, get_timeout())
+        counts.update(summed)
+    return counts
+
+def get_liked(user, video_ids):
+    ''' Returns the ids of the given videos that a user liked. '''
+    if not user.is_authenticated:
+        return set()
+    return set(Like.objects.filter(user=user, video_id__in=video_ids).values_list('video_id', flat=True))
@@ -0,0 +1,10 @@
+from apps.videos import visibility
+from utils.consistency import CheckCommand
+
+class Command(CheckCommand):
+    help = 'Checks the video visibility table against videos and shares, and optionally repairs it.'
+    rows = 'visibility rows'
+    sources = 'videos'
+
+    def check_table(self, repair, chunk_size):
+        return visibility.check(repair=repair, chunk_size=chunk_size)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.videos import search
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of videos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of videos indexed per transaction.')
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Indexed {indexed} videos.')
@@ -0,0 +1,11 @@
+from apps.jobs.management.base import PeriodicTaskCommand
+from apps.videos import discover
+from apps.videos.tasks import recompute_discover_scores
+
+class Command(PeriodicTaskCommand):
+    help = 'Recomputes the discover scores of public videos, or schedules their periodic recomputation.'
+    task = recompute_discover_scores
+
+    def run(self, **options):
+        updated = discover.recompute_scores()
+        return f'Updated the scores of {updated} videos.'
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_alter_shared_video_alter_video_is_public'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['creator', '-uploaded_at', '-id'], name='video_creator_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('videos', '0007_video_video_creator_recent_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uploaded_at', models.DateTimeField()),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='videos.video')),
+                ('viewer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='videovisibility',
+            index=models.Index(fields=['creator', 'viewer', '-uploaded_at', '-video'], name='video_visibility_idx'),
+        ),
+    ]
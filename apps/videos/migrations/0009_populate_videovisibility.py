@@ -0,0 +1,38 @@
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+def populate(apps, schema_editor):
+    ''' Fills the visibility table from the existing videos and shares (see apps/videos/visibility.py). '''
+    Video = apps.get_model('videos', 'Video')
+    Shared = apps.get_model('videos', 'Shared')
+    VideoVisibility = apps.get_model('videos', 'VideoVisibility')
+    last_id = 0
+    while True:
+        videos = list(Video.objects.filter(id__gt=last_id, creator__isnull=False).order_by('id')
+                .values_list('id', 'creator_id', 'is_public', 'uploaded_at')[:CHUNK_SIZE])
+        if not videos:
+            break
+        last_id = videos[-1][0]
+        shares = {}
+        for video_id, user_id in (Shared.objects.filter(video_id__in=[video[0] for video in videos])
+                .values_list('video_id', 'user_id')):
+            shares.setdefault(video_id, []).append(user_id)
+        VideoVisibility.objects.bulk_create([
+                VideoVisibility(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+                for video_id, creator_id, is_public, uploaded_at in videos
+                for viewer_id in ([None] if is_public else shares.get(video_id, ()))
+        ])
+
+def clear(apps, schema_editor):
+    apps.get_model('videos', 'VideoVisibility').objects.all().delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_videovisibility_videovisibility_video_visibility_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, clear),
+    ]
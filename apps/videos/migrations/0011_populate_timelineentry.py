@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import F
+
+BACKFILL = 100
+
+def populate(apps, schema_editor):
+    ''' Fills the feeds from the existing shares and friendships (see apps/videos/feed.py). '''
+    Video = apps.get_model('videos', 'Video')
+    Shared = apps.get_model('videos', 'Shared')
+    Friendship = apps.get_model('friendships', 'Friendship')
+    TimelineEntry = apps.get_model('videos', 'TimelineEntry')
+
+    shares = (Shared.objects.filter(video__creator__isnull=False)
+            .exclude(video__creator=F('user'))
+            .values_list('user_id', 'video__creator_id', 'video_id', 'video__uploaded_at'))
+    TimelineEntry.objects.bulk_create([
+            TimelineEntry(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+            for viewer_id, creator_id, video_id, uploaded_at in shares.iterator()
+    ], batch_size=1000, ignore_conflicts=True)
+
+    pairs = Friendship.objects.filter(status='accepted').values_list('user1_id', 'user2_id')
+    for user1_id, user2_id in pairs.iterator():
+        for viewer_id, creator_id in ((user1_id, user2_id), (user2_id, user1_id)):
+            recent = (Video.objects.filter(creator_id=creator_id, is_public=True)
+                    .order_by('-uploaded_at', '-id').values_list('id', 'uploaded_at')[:BACKFILL])
+            TimelineEntry.objects.bulk_create([
+                    TimelineEntry(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+                    for video_id, uploaded_at in recent
+            ], ignore_conflicts=True)
+
+def clear(apps, schema_editor):
+    apps.get_model('videos', 'TimelineEntry').objects.all().delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0002_friendship_friendship_user1_recent_idx_and_more'),
+        ('videos', '0010_timelineentry_timelineentry_timeline_recent_idx_and_more'),
+    ]
+    # Reads the friendships before they are stored as canonical pairs.
+    run_before = [
+        ('friendships', '0003_friendship_pair'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, clear),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_populate_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-score', '-id'], name='video_discover_idx'),
+        ),
+    ]
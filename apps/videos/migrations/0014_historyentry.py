@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-19 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('videos', '0013_likecountershard_like'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.FloatField(default=0)),
+                ('watched_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='videos.video')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='historyentry',
+            index=models.Index(fields=['user', '-watched_at', '-video'], name='history_recent_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='historyentry',
+            unique_together={('user', 'video')},
+        ),
+    ]
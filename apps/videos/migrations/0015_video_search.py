@@ -0,0 +1,39 @@
+from django.db import migrations
+
+'''
+Creates the full-text index of videos and the triggers keeping it in sync
+(see apps/videos/search.py), and indexes the existing videos.
+'''
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_historyentry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                '''CREATE VIRTUAL TABLE videos_video_fts USING fts5(
+                    video_name, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+                )''',
+                '''CREATE TRIGGER videos_video_fts_insert AFTER INSERT ON videos_video BEGIN
+                    INSERT INTO videos_video_fts (rowid, video_name, description) VALUES (new.id, new.video_name, new.description);
+                END''',
+                '''CREATE TRIGGER videos_video_fts_delete AFTER DELETE ON videos_video BEGIN
+                    DELETE FROM videos_video_fts WHERE rowid = old.id;
+                END''',
+                '''CREATE TRIGGER videos_video_fts_update AFTER UPDATE OF video_name, description ON videos_video BEGIN
+                    UPDATE videos_video_fts SET video_name = new.video_name, description = new.description WHERE rowid = old.id;
+                END''',
+                '''INSERT INTO videos_video_fts (rowid, video_name, description)
+                    SELECT id, video_name, description FROM videos_video''',
+            ],
+            reverse_sql=[
+                'DROP TRIGGER IF EXISTS videos_video_fts_update',
+                'DROP TRIGGER IF EXISTS videos_video_fts_delete',
+                'DROP TRIGGER IF EXISTS videos_video_fts_insert',
+                'DROP TABLE videos_video_fts',
+            ]
+        ),
+    ]
@@ -15,7 +15,99 @@ class Video(models.Model):
     )
     is_public = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(default=timezone.now)
+    views = models.PositiveBigIntegerField(default=0)
+    # Time-decayed popularity, recomputed in batches (see apps/videos/discover.py).
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # A user's videos, most recent first (keyset pagination).
+            models.Index(fields=['creator', '-uploaded_at', '-id'], name='video_creator_recent_idx'),
+            # Public videos, most popular first (discover).
+            models.Index(
+                fields=['-score', '-id'],
+                condition=models.Q(is_public=True),
+                name='video_discover_idx'
+            )
+        ]
 
 class Shared(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="shared_videos")
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name="shared_with")
+
+class VideoVisibility(models.Model):
+    '''
+    Materialized "who can see which video" (see apps/videos/visibility.py).
+
+    A public video has a single row with no viewer (everyone). A private video
+    has a row per user it is shared with. Its creator and staff see every video
+    of the creator, so they read the videos table directly.
+    '''
+    viewer = models.ForeignKey(User, null=True, on_delete=models.CASCADE, related_name='+')
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='visibility')
+    uploaded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The videos of a creator visible to a viewer, most recent first.
+            models.Index(fields=['creator', 'viewer', '-uploaded_at', '-video'], name='video_visibility_idx')
+        ]
+
+class TimelineEntry(models.Model):
+    '''
+    A video in a user's home feed, written when the video is fanned out to
+    them (see apps/videos/feed.py).
+    '''
+    viewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='+')
+    uploaded_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['viewer', 'video']
+        indexes = [
+            # A user's feed, most recent first.
+            models.Index(fields=['viewer', '-uploaded_at', '-video'], name='timeline_recent_idx')
+        ]
+
+class Like(models.Model):
+    ''' A user's like of a video. Counted by LikeCounterShard (see apps/videos/likes.py). '''
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='likes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'video']
+
+class LikeCounterShard(models.Model):
+    '''
+    One of the LIKE_COUNTER_SHARDS counters of a video's likes. Likes update a
+    random shard so that concurrent likes of a video don't all write one row;
+    the count of a video is the sum of its shards.
+    '''
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='like_shards')
+    shard = models.PositiveSmallIntegerField()
+    # Unlikes decrement a random shard, so a single shard may go negative.
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['video', 'shard']
+
+class HistoryEntry(models.Model):
+    '''
+    The last playback position of a video watched by a user. Written in batches
+    and capped per user (see apps/videos/history.py).
+    '''
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='+')
+    # Seconds into the video.
+    position = models.FloatField(default=0)
+    watched_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['user', 'video']
+        indexes = [
+            # A user's history, most recent first.
+            models.Index(fields=['user', '-watched_at', '-video'], name='history_recent_idx')
+        ]
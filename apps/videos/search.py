@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import FloatField
+from apps.videos.models import Video, VideoVisibility
+from utils.pagination import EntryPagination
+import re
+
+'''
+Full-text search over the names and descriptions of videos, backed by an
+SQLite FTS5 table.
+
+videos_video_fts holds (rowid = video id, video_name, description) and is kept
+in sync by triggers on videos_video, so every write (including
+queryset.update() and bulk operations, which don't send signals) updates the
+index in the same transaction. A search is a lookup of its terms in the
+index, filtered by visibility and ranked with BM25 (names weigh NAME_WEIGHT
+times more than descriptions) in one query.
+
+Scoring every match of a common word would cost time in proportion to the
+number of videos, so only the SEARCH_CANDIDATES most recent visible matches
+(which the index reads in rowid order, newest first) are scored and ranked.
+Searches with fewer matches are ranked exactly; common searches favor recent
+videos and list at most SEARCH_CANDIDATES results. BM25 still reads the whole
+match list of each word once per search (for its IDF), so words found in a
+large share of the videos remain the slowest searches (see
+benchmarks/bench_search.py).
+
+Queries are split into words, which must all match; the last word also
+matches as a prefix ("cat vid" finds "cat videos"). Prefixes of 2 and 3
+characters are indexed. FTS5 operators typed by users are ignored.
+
+SQLite drops the triggers of a table it rebuilds (which Django does for some
+migrations of Video), so they are recreated after every migrate, and
+`manage.py rebuildsearch` rebuilds the index a chunk of videos at a time.
+
+Settings:
+    SEARCH_CANDIDATES (int): Most recent matches ranked per search. Defaults to 5000.
+'''
+
+INDEX_TABLE = 'videos_video_fts'
+NAME_WEIGHT = 4.0
+
+TRIGGERS = [
+        f'''CREATE TRIGGER IF NOT EXISTS videos_video_fts_insert AFTER INSERT ON videos_video BEGIN
+            INSERT INTO {INDEX_TABLE} (rowid, video_name, description) VALUES (new.id, new.video_name, new.description);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS videos_video_fts_delete AFTER DELETE ON videos_video BEGIN
+            DELETE FROM {INDEX_TABLE} WHERE rowid = old.id;
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS videos_video_fts_update AFTER UPDATE OF video_name, description ON videos_video BEGIN
+            UPDATE {INDEX_TABLE} SET video_name = new.video_name, description = new.description WHERE rowid = old.id;
+        END''',
+]
+
+def get_candidates():
+    return getattr(settings, 'SEARCH_CANDIDATES', 5000)
+
+def install_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    '''
+    Creates the triggers keeping the index in sync, if they are missing.
+    Connected to post_migrate (see apps/videos/apps.py).
+    '''
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1 FROM sqlite_master WHERE type = %s AND name = %s', ['table', INDEX_TABLE])
+        if cursor.fetchone() is None:
+            # Not migrated yet.
+            return
+        for trigger in TRIGGERS:
+            cursor.execute(trigger)
+
+def rebuild(chunk_size=1000):
+    '''
+    Rewrites the index from videos_video, one chunk of ids per transaction so
+    that writers aren't blocked for the whole rebuild.
+
+    Returns:
+        int: The number of indexed videos.
+    '''
+    install_triggers()
+    indexed = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            ids = list(Video.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                # Also drops the rows of videos deleted within the chunk's range.
+                cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid > %s AND rowid <= %s', [last_id, ids[-1]])
+                cursor.execute(
+                        f'INSERT INTO {INDEX_TABLE} (rowid, video_name, description) '
+                        f'SELECT id, video_name, description FROM {Video._meta.db_table} WHERE id > %s AND id <= %s',
+                        [last_id, ids[-1]]
+                )
+            indexed += len(ids)
+            last_id = ids[-1]
+        cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid > %s', [last_id])
+        # Merges the index segments written chunk by chunk.
+        cursor.execute(f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}) VALUES ('optimize')")
+    return indexed
+
+def make_query(text):
+    '''
+    Returns the FTS5 query matching every word of a search, the last one as a
+    prefix, or None if the search holds no word.
+    '''
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def search(text, user, cursor=None, limit=50):
+    '''
+    Returns a page of the videos matching a search that a user can see.
+
+    Args:
+        text (str): The search.
+        user (User): The requesting user (may be anonymous).
+        cursor (tuple, optional): (score, id) of the last entry of the previous
+            page. Defaults to None (the first page).
+        limit (int, optional): The maximum number of entries. Defaults to 50.
+
+    Returns:
+        list of tuple: (score, video id) entries, best match first.
+    '''
+    query = make_query(text)
+    if query is None:
+        return []
+    # bm25() is lower for better matches; scores are negated to sort descending.
+    sql = [
+            f'SELECT score, id FROM (SELECT -bm25({INDEX_TABLE}, %s, 1.0) AS score, rowid AS id '
+            f'FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s'
+    ]
+    params = [NAME_WEIGHT, query]
+    if not user.is_staff:
+        # The rules of VideoListView: public videos, videos shared with the user and their own.
+        user_id = user.id if user.is_authenticated else None
+        sql.append(
+                f'AND (EXISTS (SELECT 1 FROM {VideoVisibility._meta.db_table} AS visibility '
+                f'WHERE visibility.video_id = {INDEX_TABLE}.rowid '
+                f'AND (visibility.viewer_id IS NULL OR visibility.viewer_id = %s)) '
+                f'OR EXISTS (SELECT 1 FROM {Video._meta.db_table} AS video '
+                f'WHERE video.id = {INDEX_TABLE}.rowid AND video.creator_id = %s))'
+        )
+        params += [user_id, user_id]
+    # Only the candidates are scored (see the module docstring).
+    sql.append('ORDER BY rowid DESC LIMIT %s) AS candidates')
+    params.append(get_candidates())
+    if cursor is not None:
+        sql.append('WHERE score < %s OR (score = %s AND id < %s)')
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql.append('ORDER BY score DESC, id DESC LIMIT %s')
+    params.append(limit)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(' '.join(sql), params)
+        return db_cursor.fetchall()
+
+class SearchPagination(EntryPagination):
+    '''
+    Paginates search results by (score, id) cursor. Scores change as the index
+    does, so a page after a write may skip or repeat a few results.
+    '''
+    names = ['score', 'id']
+
+    def get_cursor_fields(self, queryset):
+        return [FloatField(), Video._meta.pk]
+
+    def get_entries(self, request, view, cursor, limit):
+        return search(view.get_search(), request.user, cursor, limit)
@@ -1,9 +1,14 @@
 from rest_framework import serializers
 from apps.videos.models import Video, Shared
+from apps.videos import likes
 from apps.users.models import User
 from apps.users.serializers import UserSerializer
 from django.core.files.storage import FileSystemStorage
 from utils.defaults import CurrentUserIDDefault
+from utils.query_planner import uses_related
+from utils.serializers import BaseHyperlinkedSerializer
+from utils.links import CachedHyperlinkedIdentityField
+from utils.compiled import CompiledListSerializer, render_nested
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
@@ -12,53 +17,97 @@ import magic
 MAX_FILE_SIZE = 1073741824 #1GB
 ALLOWED_TYPES = ['video/mp4'] #mp4 MIME
 
-class VideoReadSerializer(serializers.HyperlinkedModelSerializer):
-    self = serializers.HyperlinkedIdentityField(
+class VideoReadSerializer(BaseHyperlinkedSerializer):
+    self = CachedHyperlinkedIdentityField(
             view_name='video-detail'
     )
     creator = serializers.SerializerMethodField()
     shared_with = serializers.SerializerMethodField()
+    likes = serializers.SerializerMethodField()
+    liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Video
-        fields = ['self', 'id', 'creator', 'video_name', 'description', 'is_public', 'uploaded_at', 'shared_with']
-        read_only_fields = ['id', 'creator', 'video_name', 'description', 'is_publc', 'uploaded_at', 'shared_with']
-
+        fields = ['self', 'id', 'creator', 'video_name', 'description', 'is_public', 'uploaded_at', 'views', 'likes', 'liked', 'shared_with']
+        read_only_fields = ['id', 'creator', 'video_name', 'description', 'is_publc', 'uploaded_at', 'views', 'likes', 'liked', 'shared_with']
+        # Listing shared users for every video would obfuscate list output.
+        expandable = ['shared_with']
+        # get_shared_with returns None for public videos.
+        omit_if_none = ['shared_with']
+        list_serializer_class = CompiledListSerializer
+        cache_fragments = True
+        # Who a video is shared with is only shown to those allowed to see
+        # it; never cache it. Views and likes are counted without saving the
+        # video (see apps/videos/view_counts.py and apps/videos/likes.py).
+        fragment_exclude = ['shared_with', 'views', 'likes', 'liked']
+        # The creator's card is part of the cached fragment.
+        fragment_depends_on = ['creator']
+
+    def prepare_many(self, instances):
+        ''' Loads the like counts and the requester's likes of a list of videos. '''
+        video_ids = [instance.pk for instance in instances]
+        self.like_counts = likes.get_counts(video_ids)
+        self.liked_ids = likes.get_liked(self.context['request'].user, video_ids)
+
+    @uses_related()
+    def get_likes(self, obj):
+        counts = getattr(self, 'like_counts', {})
+        if obj.pk not in counts:
+            return likes.get_counts([obj.pk])[obj.pk]
+        return counts[obj.pk]
+
+    @uses_related()
+    def get_liked(self, obj):
+        liked_ids = getattr(self, 'liked_ids', None)
+        if liked_ids is None:
+            return obj.pk in likes.get_liked(self.context['request'].user, [obj.pk])
+        return obj.pk in liked_ids
+
+    @uses_related('creator', serializer=UserSerializer)
     def get_creator(self, obj):
-        return UserSerializer(
-                obj.creator, 
-                context={'request': self.context['request']}
-        ).data
+        return render_nested(UserSerializer, obj.creator, self.context)
 
+    @uses_related('shared_with__user', serializer=UserSerializer, fields=['is_public'])
     def get_shared_with(self, obj):
         '''
         Get the users that the video is shared with.
 
-        Takes an optional 'is_list' key in the context dictionary. When set to
-        True, the members won't be listed. This makes the response cleaner when
-        listing multiple videos, as including shared_with can obfuscate the 
-        output.
+        Not rendered in lists unless expanded (see Meta.expandable).
         '''
         # Set value to None to be later remove in the representation.
-        if self.context.get('is_list', False) is True or obj.is_public is True:
+        if obj.is_public is True:
             return None
 
-        shared_with = User.objects.filter(shared_videos__video=obj)
-        return UserSerializer(
-                shared_with,
-                many=True,
-                context={'request': self.context['request']}
-        ).data
-
-    def to_representation(self, instance):
-        '''
-        Override to_representation to not include 'members' if the value is
-        None (triggered from get_members function).
-        '''
-        rep = super().to_representation(instance)
-        if rep['shared_with'] is None:
-            del rep['shared_with']
-        return rep
+        # Iterate the relation (rather than querying users) so that a
+        # prefetched shared_with is used.
+        shared_with = [share.user for share in obj.shared_with.all()]
+        return render_nested(UserSerializer, shared_with, self.context, many=True)
+
+class HistoryVideoSerializer(VideoReadSerializer):
+    '''
+    A video of a watch history, with the position to resume it from and when it
+    was last watched. Both are read from the 'positions' context
+    ({video id: (position, watched_at)}, see apps/videos/history.py).
+    '''
+    position = serializers.SerializerMethodField()
+    watched_at = serializers.SerializerMethodField()
+
+    class Meta(VideoReadSerializer.Meta):
+        fields = VideoReadSerializer.Meta.fields + ['position', 'watched_at']
+        read_only_fields = VideoReadSerializer.Meta.read_only_fields + ['position', 'watched_at']
+        fragment_exclude = VideoReadSerializer.Meta.fragment_exclude + ['position', 'watched_at']
+
+    @uses_related()
+    def get_position(self, obj):
+        return self.context['positions'][obj.pk][0]
+
+    @uses_related()
+    def get_watched_at(self, obj):
+        return serializers.DateTimeField().to_representation(self.context['positions'][obj.pk][1])
+
+class PositionSerializer(serializers.Serializer):
+    ''' A playback position reported by a player, in seconds into the video. '''
+    position = serializers.FloatField(min_value=0)
 
 class VideoWriteSerializer(serializers.HyperlinkedModelSerializer):
     self = serializers.HyperlinkedIdentityField(
@@ -0,0 +1,59 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.videos.models import Video, Shared
+from apps.users.models import User
+from apps.users.signals import is_login
+from apps.videos import visibility
+from apps.videos.tasks import fan_out_video, sync_friend_timelines
+from apps.friendships.models import Friendship
+from utils.generations import bump_generation
+
+'''
+Invalidates the cached video lists and ETags of a creator (see
+utils/generations.py) when their videos, the shares of their videos or the
+cards of the users they are shared with change, keeps the visibility
+table up to date (see apps/videos/visibility.py) and enqueues the fan-out
+of videos to feeds (see apps/videos/feed.py).
+'''
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def video_changed(sender, instance, **kwargs):
+    bump_generation(instance.creator_id)
+
+@receiver(post_save, sender=Shared)
+@receiver(post_delete, sender=Shared)
+def share_changed(sender, instance, **kwargs):
+    creator_id = (Video.objects.filter(id=instance.video_id)
+            .values_list('creator_id', flat=True).first())
+    bump_generation(creator_id)
+
+@receiver(post_save, sender=Video)
+def video_saved(sender, instance, **kwargs):
+    visibility.sync_video(instance)
+    fan_out_video.enqueue(video_id=instance.id)
+
+@receiver(post_save, sender=Shared)
+def video_shared(sender, instance, **kwargs):
+    visibility.add_share(instance)
+    fan_out_video.enqueue(video_id=instance.video_id)
+
+@receiver(post_delete, sender=Shared)
+def video_unshared(sender, instance, **kwargs):
+    visibility.remove_share(instance)
+    fan_out_video.enqueue(video_id=instance.video_id)
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def friendship_changed(sender, instance, **kwargs):
+    # Pending requests don't change feeds.
+    if kwargs['signal'] is post_save and instance.status != Friendship.Status.ACCEPTED:
+        return
+    sync_friend_timelines.enqueue(user_id=instance.low_id, friend_id=instance.high_id)
+
+@receiver(post_save, sender=User)
+def shared_user_changed(sender, instance, created, **kwargs):
+    if created or is_login(kwargs):
+        return
+    bump_generation(*Shared.objects.filter(user=instance)
+            .values_list('video__creator_id', flat=True))
@@ -0,0 +1,39 @@
+from django.core.files.storage import default_storage
+from apps.jobs.registry import task
+from apps.videos import discover, feed
+from datetime import timedelta
+
+@task(queue='media', max_attempts=5)
+def delete_video_file(name):
+    '''
+    Deletes an uploaded video file from storage.
+
+    Ran after the Video row is deleted so that the request doesn't wait on the
+    filesystem. Deleting a file that is already gone is a no-op, which makes
+    retries safe.
+    '''
+    default_storage.delete(name)
+
+@task(queue='feed')
+def fan_out_video(video_id):
+    ''' Writes the feed entries of a video (see apps/videos/feed.py). '''
+    feed.fan_out_video(video_id)
+
+@task(queue='feed')
+def sync_friend_timelines(user_id, friend_id):
+    ''' Adds or removes two users' videos from each other's feeds (see apps/videos/feed.py). '''
+    feed.sync_friend_timelines(user_id, friend_id)
+
+@task(max_attempts=1)
+def recompute_discover_scores(reschedule=True):
+    '''
+    Schedules the next recomputation in DISCOVER_INTERVAL seconds, then
+    recomputes the discover scores (see apps/videos/discover.py). Start the
+    chain with `manage.py recomputescores --schedule`.
+
+    The next run is scheduled first: a run whose worker dies isn't retried,
+    and mustn't end the chain. The next run makes up for a failed one.
+    '''
+    if reschedule:
+        recompute_discover_scores.enqueue(delay=timedelta(seconds=discover.get_interval()))
+    discover.recompute_scores()
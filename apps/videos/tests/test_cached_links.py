@@ -0,0 +1,99 @@
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from utils.test_helper import TestHelper
+from utils.links import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+from apps.videos.models import Video
+from apps.users.models import User
+from django.conf import settings
+from django.urls import reverse
+
+'''
+This module provides parity tests for the cached hyperlinked fields (utils/links.py).
+
+Classes:
+    - CachedLinkParityTest: Provides methods to compare cached and DRF links.
+    - RelativeLinkTest: Provides methods to test the opt-in relative link mode.
+'''
+class CachedLinkParityTest(APITestCase):
+    ''' Tests that cached hyperlinked fields build the same links as DRF '''
+
+    def setUp(self):
+        helper = TestHelper()
+        self.user = helper.create_user()
+        self.video = Video.objects.create(video_name='video', creator=self.user, video='uploads/a.mp4')
+
+    def request(self, **extra):
+        return Request(APIRequestFactory().get('/', SERVER_NAME=settings.ALLOWED_HOSTS[0], **extra))
+
+    def assertSameLink(self, cached, drf, instance, request):
+        context = {'request': request}
+        cached.bind('link', serializers.Serializer(context=context))
+        drf.bind('link', serializers.Serializer(context=context))
+        self.assertEqual(cached.to_representation(instance), drf.to_representation(instance))
+
+    def test_identity_links(self):
+        ''' Identity links should match for http and https requests '''
+        for request in (self.request(), self.request(secure=True)):
+            self.assertSameLink(
+                    CachedHyperlinkedIdentityField(view_name='video-detail'),
+                    serializers.HyperlinkedIdentityField(view_name='video-detail'),
+                    self.video,
+                    request
+            )
+
+    def test_related_links(self):
+        ''' Related links should match for users '''
+        self.assertSameLink(
+                CachedHyperlinkedRelatedField(view_name='user-detail', read_only=True),
+                serializers.HyperlinkedRelatedField(view_name='user-detail', read_only=True),
+                self.user,
+                self.request()
+        )
+
+    def test_relative_links_without_request(self):
+        ''' Links should be relative when there is no request '''
+        self.assertSameLink(
+                CachedHyperlinkedIdentityField(view_name='user-detail'),
+                serializers.HyperlinkedIdentityField(view_name='user-detail'),
+                self.user,
+                None
+        )
+
+    def test_unsaved_object(self):
+        ''' Unsaved objects should not be linked '''
+        field = CachedHyperlinkedIdentityField(view_name='user-detail')
+        field.bind('link', serializers.Serializer(context={'request': self.request()}))
+        self.assertIsNone(field.to_representation(User(username='unsaved')))
+
+class RelativeLinkTest(APITestCase):
+    ''' Tests that clients can opt in to host-relative links '''
+
+    def setUp(self):
+        helper = TestHelper()
+        self.user = helper.create_user()
+        self.video = Video.objects.create(
+                video_name='video', creator=self.user, video='uploads/a.mp4', is_public=True
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('video-detail', args=[self.video.id])
+
+    def test_absolute_by_default(self):
+        ''' Links should be absolute without the opt-in '''
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['self'], 'http://testserver' + self.url)
+
+    def test_query_flag(self):
+        ''' ?links=relative should render host-relative links '''
+        response = self.client.get(self.url, {'links': 'relative'})
+        self.assertEqual(response.data['self'], self.url)
+        self.assertEqual(
+                response.data['creator']['self'],
+                reverse('user-detail', args=[self.user.id])
+        )
+
+    def test_accept_parameter(self):
+        ''' The links=relative Accept parameter should render host-relative links '''
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json; links=relative')
+        self.assertEqual(response.data['self'], self.url)
+        self.assertEqual(response['Content-Type'], 'application/json')
@@ -0,0 +1,81 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from utils.test_helper import TestHelper
+from utils.serializers import FieldSelection
+from apps.videos.models import Video
+from apps.videos.serializers import VideoReadSerializer
+from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from apps.friendships.models import FriendshipEdge
+from apps.friendships.serializers import AcceptedFriendshipSerializer
+from django.test import override_settings
+from types import SimpleNamespace
+
+'''
+This module provides parity tests for the compiled read path (utils/compiled.py).
+
+Each test renders the same objects with COMPILED_SERIALIZERS enabled and
+disabled (plain DRF) and checks that the rendered JSON is byte-identical.
+
+Classes:
+    - CompiledSerializerParityTest: Provides methods to compare compiled and DRF output.
+'''
+class CompiledSerializerParityTest(APITestCase):
+    ''' Tests that compiled serializers render the same JSON as DRF '''
+
+    def setUp(self):
+        helper = TestHelper()
+        self.user = helper.create_user()
+        self.friends = [helper.create_user() for i in range(3)]
+        for friend in self.friends:
+            helper.make_friends(self.user, friend)
+        helper.make_friends(self.friends[0], self.friends[1])
+
+        # Videos are created without files; only their metadata is rendered.
+        self.public_video = Video.objects.create(
+                video_name='public', creator=self.user, video='uploads/a.mp4', is_public=True
+        )
+        self.private_video = Video.objects.create(
+                video_name='private', description='shared', creator=self.user, video='uploads/b.mp4'
+        )
+        self.orphan_video = Video.objects.create(video_name='orphan', video='uploads/c.mp4')
+        for friend in self.friends:
+            helper.share_video_with_user(self.private_video, friend)
+
+        request = Request(APIRequestFactory().get('/'))
+        self.view = SimpleNamespace(kwargs={'user_id': self.user.id})
+        self.context = lambda **extra: {'request': request, 'view': self.view, **extra}
+
+    def render(self, serializer_class, queryset, **context):
+        serializer = serializer_class(queryset, many=True, context=self.context(**context))
+        return JSONRenderer().render(serializer.data)
+
+    def assertParity(self, serializer_class, queryset, **context):
+        with override_settings(COMPILED_SERIALIZERS=False):
+            expected = self.render(serializer_class, queryset, **context)
+        actual = self.render(serializer_class, queryset, **context)
+        self.assertEqual(actual, expected)
+        return actual
+
+    def test_user_serializer(self):
+        ''' Users should render the same '''
+        self.assertParity(UserSerializer, User.objects.all())
+
+    def test_video_read_serializer_list(self):
+        ''' Videos should render the same in lists (shared users omitted) '''
+        rendered = self.assertParity(VideoReadSerializer, Video.objects.all())
+        self.assertNotIn(b'shared_with', rendered)
+
+    def test_video_read_serializer_detail(self):
+        ''' Videos should render the same with shared users and a missing creator '''
+        selection = FieldSelection(VideoReadSerializer, None, frozenset(['shared_with']))
+        rendered = self.assertParity(VideoReadSerializer, Video.objects.all(), field_selection=selection)
+        self.assertIn(b'shared_with', rendered)
+
+    def test_accepted_friendship_serializer(self):
+        ''' Friends should render the same '''
+        self.assertParity(
+                AcceptedFriendshipSerializer,
+                FriendshipEdge.objects.of_user(self.user, 'accepted')
+        )
@@ -0,0 +1,140 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from decouple import config
+import shutil
+
+'''
+This module provides tests for conditional requests on video endpoints
+(utils/conditional.py).
+
+Classes:
+    - ConditionalVideoListTest: Provides methods to test ETags of video-list.
+    - ConditionalVideoDetailTest: Provides methods to test ETags and If-Match on video-detail.
+    - ConditionalDiscoverTest: Provides methods to test body ETags of discover.
+'''
+@override_settings(MEDIA_ROOT=config('VIDEO_STORAGE_TEST'))
+class ConditionalVideoListTest(APITestCase):
+    ''' Tests If-None-Match on video-list '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.helper.upload_video(creator=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('user-videos', args=[self.user.id])
+
+    def test_unchanged_list_is_not_modified(self):
+        ''' Sending back the ETag of an unchanged list should give a 304 without queries '''
+        etag = self.client.get(self.url)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_changed_list_is_sent(self):
+        ''' A new video should change the ETag '''
+        etag = self.client.get(self.url)['ETag']
+        self.helper.upload_video(creator=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_viewer(self):
+        ''' Another viewer should not get a 304 with the owner's ETag '''
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(user=self.helper.create_user())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def tearDown(self):
+        shutil.rmtree(
+                config('VIDEO_STORAGE_TEST'),
+                ignore_errors=True
+        )
+
+@override_settings(MEDIA_ROOT=config('VIDEO_STORAGE_TEST'))
+class ConditionalVideoDetailTest(APITestCase):
+    ''' Tests If-None-Match and If-Match on video-detail '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.video = self.helper.upload_video(creator=self.creator)
+        self.client.force_authenticate(user=self.creator)
+        self.url = reverse('video-detail', args=[self.video.id])
+
+    def test_unchanged_video_is_not_modified(self):
+        ''' Sending back the ETag of an unchanged video should give a 304 '''
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_patch_with_current_etag(self):
+        ''' PATCH with the current ETag in If-Match should succeed and return the new ETag '''
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'video_name': 'changed'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url)['ETag'], response['ETag'])
+
+    def test_patch_with_etag_of_sparse_fields(self):
+        ''' An ETag read with ?fields= should differ for GET but still match for PATCH '''
+        etag = self.client.get(self.url, {'fields': 'video_name'})['ETag']
+        self.assertNotEqual(etag, self.client.get(self.url)['ETag'])
+        response = self.client.patch(self.url, {'video_name': 'changed'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_patch_with_stale_etag(self):
+        ''' PATCH with an outdated ETag in If-Match should fail without changing the video '''
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'video_name': 'first'})
+        response = self.client.patch(self.url, {'video_name': 'second'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.video_name, 'first')
+
+    def tearDown(self):
+        shutil.rmtree(
+                config('VIDEO_STORAGE_TEST'),
+                ignore_errors=True
+        )
+
+@override_settings(MEDIA_ROOT=config('VIDEO_STORAGE_TEST'))
+class ConditionalDiscoverTest(APITestCase):
+    ''' Tests If-None-Match on discover, whose ETag is a hash of the body '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.video = self.helper.upload_video(creator=self.creator)
+        self.url = reverse('discover')
+
+    def test_unchanged_list_is_not_modified(self):
+        ''' Sending back the ETag of an unchanged page should give a 304 '''
+        etag = self.client.get(self.url)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_changed_list_is_sent(self):
+        ''' A renamed video should change the ETag '''
+        etag = self.client.get(self.url)['ETag']
+        self.video.video_name = 'renamed'
+        self.video.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def tearDown(self):
+        shutil.rmtree(
+                config('VIDEO_STORAGE_TEST'),
+                ignore_errors=True
+        )
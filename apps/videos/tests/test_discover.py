@@ -0,0 +1,96 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.jobs.models import Job
+from apps.videos.models import Video
+from apps.videos.tasks import recompute_discover_scores
+from apps.videos import discover
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import re
+
+'''
+This module provides tests for the discover list (apps/videos/discover.py).
+
+Classes:
+    - DiscoverTest: Provides methods to test ranking and paginating public videos.
+'''
+class DiscoverTest(APITestCase):
+    ''' Tests that discover ranks public videos by time-decayed views '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        now = timezone.now()
+        # (views, hours ago): old popular videos decay below recent ones.
+        specs = [(100, 0), (1000, 200), (50, 1), (10, 0), (5, 3)]
+        self.videos = [
+                Video.objects.create(
+                    video_name='video', creator=self.user, video='uploads/a.mp4', is_public=True,
+                    views=views, uploaded_at=now - timedelta(hours=hours)
+                )
+                for views, hours in specs
+        ]
+        self.private = Video.objects.create(
+                video_name='video', creator=self.user, video='uploads/a.mp4', views=10000
+        )
+        self.url = reverse('discover')
+
+    def get_ids(self, response):
+        return [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+
+    def test_ranking(self):
+        ''' Videos should be ranked by score, and private videos left out '''
+        self.assertEqual(discover.recompute_scores(chunk_size=2), 5)
+        expected = [self.videos[i].id for i in (0, 2, 3, 4, 1)]
+        self.assertEqual(self.get_ids(self.client.get(self.url)), expected)
+
+    def test_pagination(self):
+        ''' Following the next links should list the window once '''
+        discover.recompute_scores()
+        response = self.client.get(self.url, {'page_size': 2})
+        ids = self.get_ids(response)
+        while 'Link' in response:
+            response = self.client.get(re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1))
+            ids += self.get_ids(response)
+        self.assertEqual(ids, [self.videos[i].id for i in (0, 2, 3, 4, 1)])
+
+    def test_window_size(self):
+        ''' Only the top of the ranking should be listed '''
+        with self.settings(DISCOVER_WINDOW=2):
+            discover.recompute_scores()
+            self.assertEqual(self.get_ids(self.client.get(self.url)), [self.videos[0].id, self.videos[2].id])
+
+    def test_unpublished_video_is_dropped(self):
+        ''' A video unpublished since the window was cached should not be listed '''
+        discover.recompute_scores()
+        self.videos[0].is_public = False
+        self.videos[0].save()
+        self.assertNotIn(self.videos[0].id, self.get_ids(self.client.get(self.url)))
+
+    def test_task_reschedules(self):
+        ''' The recompute job should schedule the next recomputation '''
+        call_command('recomputescores', '--schedule', stdout=StringIO())
+        call_command('recomputescores', '--schedule', stdout=StringIO())
+        jobs = Job.objects.filter(task=recompute_discover_scores.name)
+        self.assertEqual(jobs.count(), 1)
+
+        recompute_discover_scores(**jobs.get().payload)
+        self.assertNotEqual(Video.objects.get(id=self.videos[0].id).score, 0)
+        self.assertEqual(jobs.count(), 2)
+
+    def test_task_reschedules_before_running(self):
+        ''' The next recomputation should be scheduled before this one runs, in case it never finishes '''
+        jobs = Job.objects.filter(task=recompute_discover_scores.name)
+        def crash():
+            self.assertEqual(jobs.count(), 1)
+            raise RuntimeError('worker died')
+        with mock.patch.object(discover, 'recompute_scores', side_effect=crash):
+            with self.assertRaises(RuntimeError):
+                recompute_discover_scores()
+        self.assertEqual(jobs.count(), 1)
@@ -0,0 +1,119 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.jobs.worker import Worker
+from apps.videos.models import Video, Shared, TimelineEntry
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+import re
+
+'''
+This module provides tests for the home feed (apps/videos/feed.py).
+
+Classes:
+    - FeedTest: Provides methods to test fanned out feeds.
+    - HighDegreeFeedTest: Provides methods to test feeds merging pulled videos.
+'''
+class FeedTestCase(APITestCase):
+    ''' Base class of the feed tests, with helpers to upload videos and run the fan-out jobs '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.viewer = self.helper.create_user()
+        self.friend = self.helper.create_user()
+        self.stranger = self.helper.create_user()
+        self.helper.make_friends(self.viewer, self.friend)
+        self.now = timezone.now()
+        self.url = reverse('feed')
+
+    def upload(self, creator, minutes_ago, is_public=True):
+        return Video.objects.create(
+                video_name='video', creator=creator, video='uploads/a.mp4', is_public=is_public,
+                uploaded_at=self.now - timedelta(minutes=minutes_ago)
+        )
+
+    def run_jobs(self):
+        worker = Worker(queues=['feed'], heartbeat=False)
+        while worker.run_once():
+            pass
+
+    def get_feed(self, **params):
+        self.run_jobs()
+        self.client.force_authenticate(user=self.viewer)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_ids(self, response):
+        return [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+
+class FeedTest(FeedTestCase):
+    ''' Tests that feeds hold the videos of friends and the videos shared with the user '''
+
+    def test_friends_and_shares(self):
+        ''' The feed should hold friends' public videos and shared videos, most recent first '''
+        public = self.upload(self.friend, 3)
+        self.upload(self.friend, 2, is_public=False)
+        self.upload(self.stranger, 1)
+        shared = self.upload(self.stranger, 0, is_public=False)
+        self.helper.share_video_with_user(shared, self.viewer)
+        self.assertEqual(self.get_ids(self.get_feed()), [shared.id, public.id])
+
+    def test_unshare(self):
+        ''' An unshared video should leave the feed '''
+        shared = self.upload(self.stranger, 0, is_public=False)
+        self.helper.share_video_with_user(shared, self.viewer)
+        self.assertEqual(len(self.get_feed().data), 1)
+        Shared.objects.filter(video=shared).delete()
+        # Hidden before the fan-out job runs.
+        self.client.force_authenticate(user=self.viewer)
+        self.assertEqual(self.client.get(self.url).data, [])
+        self.run_jobs()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_friendship(self):
+        ''' Making a friend should add their videos, and unfriending remove them '''
+        video = self.upload(self.stranger, 0)
+        self.assertEqual(self.get_feed().data, [])
+        friendship = self.helper.make_friends(self.stranger, self.viewer)
+        self.assertEqual(self.get_ids(self.get_feed()), [video.id])
+        friendship.delete()
+        self.assertEqual(self.get_feed().data, [])
+
+    def test_pagination(self):
+        ''' Following the next links should list the whole feed once '''
+        videos = [self.upload(self.friend, minutes) for minutes in range(5)]
+        response = self.get_feed(page_size=2)
+        ids = self.get_ids(response)
+        while 'Link' in response:
+            next_url = re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1)
+            response = self.client.get(next_url)
+            ids += self.get_ids(response)
+        self.assertEqual(ids, [video.id for video in videos])
+
+    def test_requires_authentication(self):
+        ''' Anonymous users have no feed '''
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+class HighDegreeFeedTest(FeedTestCase):
+    ''' Tests that public videos of high-degree creators are pulled on read '''
+
+    def test_merge(self):
+        ''' Pulled videos should be merged with fanned out ones, in order '''
+        celebrity = self.helper.create_user()
+        self.helper.make_friends(celebrity, self.viewer)
+        for _ in range(2):
+            self.helper.make_friends(celebrity, self.helper.create_user())
+        with self.settings(FEED_FANOUT_LIMIT=3):
+            cache.clear()
+            pulled = [self.upload(celebrity, minutes) for minutes in (0, 2, 4)]
+            pushed = [self.upload(self.friend, minutes) for minutes in (1, 3)]
+            response = self.get_feed(page_size=4)
+
+            self.assertFalse(TimelineEntry.objects.filter(creator=celebrity).exists())
+            expected = [pulled[0].id, pushed[0].id, pulled[1].id, pushed[1].id]
+            self.assertEqual(self.get_ids(response), expected)
+            next_url = re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1)
+            self.assertEqual(self.get_ids(self.client.get(next_url)), [pulled[2].id])
@@ -0,0 +1,63 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video, Shared
+from django.core.cache import cache
+from django.urls import reverse
+
+'''
+This module provides tests for the fragment cache (utils/fragments.py).
+
+Classes:
+    - FragmentCacheTest: Provides methods to test cached video and user fragments.
+'''
+class FragmentCacheTest(APITestCase):
+    ''' Tests that cached fragments are invalidated and never hold viewer-dependent fields '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.friend = self.helper.create_user()
+        self.helper.make_friends(self.user, self.friend)
+        self.video = Video.objects.create(
+                video_name='video', creator=self.user, video='uploads/a.mp4'
+        )
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.client.force_authenticate(user=self.user)
+        self.videos_url = reverse('user-videos', args=[self.user.id])
+
+    def test_repeated_list_is_identical(self):
+        ''' A list rendered from the cache should match the first rendering '''
+        with self.settings(FRAGMENT_CACHE=False):
+            expected = self.client.get(self.videos_url).content
+        self.assertEqual(self.client.get(self.videos_url).content, expected)
+        self.assertEqual(self.client.get(self.videos_url).content, expected)
+
+    def test_video_change_invalidates(self):
+        ''' Saving a video should invalidate its fragment '''
+        self.client.get(self.videos_url)
+        self.video.video_name = 'renamed'
+        self.video.save()
+        self.assertEqual(self.client.get(self.videos_url).data[0]['video_name'], 'renamed')
+
+    def test_creator_change_invalidates(self):
+        ''' Saving a user should invalidate their cards and the videos embedding them '''
+        friends_url = reverse('user-friends', args=[self.friend.id])
+        self.client.get(self.videos_url)
+        self.client.get(friends_url)
+        self.user.username = 'renamed'
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.videos_url).data[0]['creator']['username'], 'renamed')
+        self.client.force_authenticate(user=self.friend)
+        self.assertEqual(self.client.get(friends_url).data[0]['friend']['username'], 'renamed')
+
+    def test_shared_users_are_never_cached(self):
+        ''' Shared users should be rendered for each request '''
+        response = self.client.get(self.videos_url, {'expand': 'shared_with'})
+        self.assertEqual(len(response.data[0]['shared_with']), 1)
+
+        # Removing a share doesn't change the video itself.
+        Shared.objects.filter(video=self.video).delete()
+        response = self.client.get(self.videos_url, {'expand': 'shared_with'})
+        self.assertEqual(response.data[0]['shared_with'], [])
@@ -0,0 +1,149 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import HistoryEntry, Shared
+from apps.videos.history import HistoryBuffer, buffer
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+import re
+
+'''
+This module provides tests for watch history (apps/videos/history.py).
+
+Classes:
+    - HistoryBufferTest: Provides methods to test coalescing, flushing and capping history entries.
+    - HistoryViewTest: Provides methods to test reporting positions and listing histories through the API.
+'''
+class HistoryBufferTest(APITestCase):
+    ''' Tests that positions are coalesced in memory and written in batches '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.videos = [self.helper.create_video(self.user) for _ in range(4)]
+        self.buffer = HistoryBuffer()
+
+    def get_positions(self):
+        return dict(HistoryEntry.objects.filter(user=self.user).values_list('video_id', 'position'))
+
+    def test_coalesce(self):
+        ''' Only the last position of a video should be written, in one INSERT '''
+        with self.settings(WATCH_HISTORY_FLUSH_SIZE=100, WATCH_HISTORY_FLUSH_INTERVAL=60):
+            for position in (5, 10, 15):
+                self.buffer.record(self.user.id, self.videos[0].id, position)
+            self.buffer.record(self.user.id, self.videos[1].id, 3)
+        self.assertEqual(self.get_positions(), {})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 2)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.get_positions(), {self.videos[0].id: 15, self.videos[1].id: 3})
+
+    def test_update(self):
+        ''' A flushed position should be replaced by a later one '''
+        with self.settings(WATCH_HISTORY_FLUSH_SIZE=1):
+            self.buffer.record(self.user.id, self.videos[0].id, 5)
+            self.buffer.record(self.user.id, self.videos[0].id, 20)
+        self.assertEqual(self.get_positions(), {self.videos[0].id: 20})
+
+    def test_evict(self):
+        ''' Histories over the limit should lose their oldest entries '''
+        now = timezone.now()
+        with self.settings(WATCH_HISTORY_LIMIT=2, WATCH_HISTORY_FLUSH_SIZE=100, WATCH_HISTORY_FLUSH_INTERVAL=60):
+            for index, video in enumerate(self.videos):
+                self.buffer.record(self.user.id, video.id, 1, now + timedelta(seconds=index))
+            self.buffer.flush()
+        self.assertEqual(set(self.get_positions()), {self.videos[2].id, self.videos[3].id})
+
+    def test_flush_user(self):
+        ''' Flushing a user should leave the entries of others buffered '''
+        other = self.helper.create_user()
+        with self.settings(WATCH_HISTORY_FLUSH_SIZE=100, WATCH_HISTORY_FLUSH_INTERVAL=60):
+            self.buffer.record(self.user.id, self.videos[0].id, 1)
+            self.buffer.record(other.id, self.videos[0].id, 2)
+        self.assertEqual(self.buffer.flush(self.user.id), 1)
+        self.assertEqual(self.buffer.size, 1)
+        self.assertFalse(HistoryEntry.objects.filter(user=other).exists())
+
+    def test_deleted_video(self):
+        ''' Entries of videos deleted since they were buffered should be dropped, not block later flushes '''
+        with self.settings(WATCH_HISTORY_FLUSH_SIZE=100, WATCH_HISTORY_FLUSH_INTERVAL=60):
+            self.buffer.record(self.user.id, self.videos[0].id, 1)
+            self.buffer.record(self.user.id, self.videos[1].id, 2)
+            self.videos[0].delete()
+            self.assertEqual(self.buffer.flush(), 1)
+            self.assertEqual(self.buffer.size, 0)
+
+            self.buffer.record(self.user.id, self.videos[2].id, 3)
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.get_positions(), {self.videos[1].id: 2, self.videos[2].id: 3})
+
+class HistoryViewTest(APITestCase):
+    ''' Tests that reported positions are listed in the user's history '''
+
+    def setUp(self):
+        cache.clear()
+        buffer.take()
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.user = self.helper.create_user()
+        self.videos = [self.helper.create_video(self.creator) for _ in range(5)]
+        self.url = reverse('history')
+        self.client.force_authenticate(user=self.user)
+
+    def report(self, video, position):
+        with self.settings(WATCH_HISTORY_FLUSH_SIZE=100, WATCH_HISTORY_FLUSH_INTERVAL=60):
+            return self.client.post(reverse('video-position', args=[video.id]), {'position': position})
+
+    def get_ids(self, response):
+        return [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+
+    def test_history(self):
+        ''' Reported positions should be listed at once, most recently watched first '''
+        self.assertEqual(self.report(self.videos[0], 30).status_code, 202)
+        self.report(self.videos[1], 12.5)
+        self.report(self.videos[0], 45)
+        response = self.client.get(self.url)
+        self.assertEqual(self.get_ids(response), [self.videos[0].id, self.videos[1].id])
+        self.assertEqual([video['position'] for video in response.data], [45, 12.5])
+
+    def test_pages(self):
+        ''' Following the next links should list the whole history once, with a constant number of queries '''
+        for video in self.videos:
+            self.report(video, 1)
+        buffer.flush()
+        ids = []
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            ids += self.get_ids(response)
+            if 'Link' not in response:
+                break
+            next_url = re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(next_url)
+            self.assertLessEqual(len(queries), len(first))
+        self.assertEqual(ids, [video.id for video in reversed(self.videos)])
+
+    def test_unshared(self):
+        ''' Videos the user can no longer see should be left out '''
+        video = self.helper.create_video(self.creator, is_public=False)
+        share = Shared.objects.create(video=video, user=self.user)
+        self.report(video, 10)
+        self.report(self.videos[0], 10)
+        share.delete()
+        self.assertEqual(self.get_ids(self.client.get(self.url)), [self.videos[0].id])
+
+    def test_invalid(self):
+        ''' Negative positions and videos the user can't see should be rejected '''
+        self.assertEqual(self.report(self.videos[0], -1).status_code, 400)
+        video = self.helper.create_video(self.creator, is_public=False)
+        self.assertEqual(self.report(video, 1).status_code, 403)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def tearDown(self):
+        buffer.take()
@@ -0,0 +1,108 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Like, LikeCounterShard
+from apps.videos import likes
+from django.core.cache import cache
+from django.urls import reverse
+
+'''
+This module provides tests for video likes and their sharded counters (apps/videos/likes.py).
+
+Classes:
+    - LikeCounterTest: Provides methods to test liking videos and counting likes.
+    - LikeViewTest: Provides methods to test liking videos through the API.
+'''
+class LikeCounterTest(APITestCase):
+    ''' Tests that likes are unique and counted across shards '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.users = [self.helper.create_user() for _ in range(5)]
+        self.video = self.helper.create_video(self.creator)
+
+    def test_like_once(self):
+        ''' A user should like a video at most once '''
+        self.assertTrue(likes.like(self.users[0], self.video))
+        self.assertFalse(likes.like(self.users[0], self.video))
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(likes.get_counts([self.video.id]), {self.video.id: 1})
+
+    def test_sum_shards(self):
+        ''' Counts should sum every shard of the video '''
+        with self.settings(LIKE_COUNTER_SHARDS=4):
+            for user in self.users:
+                likes.like(user, self.video)
+        self.assertLessEqual(LikeCounterShard.objects.filter(video=self.video).count(), 4)
+        self.assertEqual(likes.get_counts([self.video.id]), {self.video.id: 5})
+
+    def test_unlike(self):
+        ''' Unliking should decrement the count, once '''
+        likes.like(self.users[0], self.video)
+        likes.like(self.users[1], self.video)
+        self.assertTrue(likes.unlike(self.users[0], self.video))
+        self.assertFalse(likes.unlike(self.users[0], self.video))
+        self.assertEqual(likes.get_counts([self.video.id]), {self.video.id: 1})
+
+    def test_cached_count(self):
+        ''' Counts should be cached, and the cache dropped when they change '''
+        self.assertEqual(likes.get_counts([self.video.id]), {self.video.id: 0})
+        with self.assertNumQueries(0):
+            likes.get_counts([self.video.id])
+        likes.like(self.users[0], self.video)
+        self.assertEqual(likes.get_counts([self.video.id]), {self.video.id: 1})
+
+class LikeViewTest(APITestCase):
+    ''' Tests that likes made through the API show up in video representations '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.user = self.helper.create_user()
+        self.videos = [self.helper.create_video(self.creator) for _ in range(3)]
+        self.list_url = reverse('user-videos', args=[self.creator.id])
+
+    def test_like(self):
+        ''' Liking should answer 201, then 200 for a repeated like '''
+        self.client.force_authenticate(user=self.user)
+        url = reverse('video-like', args=[self.videos[0].id])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        response = self.client.get(reverse('video-detail', args=[self.videos[0].id]))
+        self.assertEqual((response.data['likes'], response.data['liked']), (1, True))
+
+    def test_unlike(self):
+        ''' Unliking should answer 204 and drop the like '''
+        self.client.force_authenticate(user=self.user)
+        url = reverse('video-like', args=[self.videos[0].id])
+        self.client.post(url)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Like.objects.exists())
+
+    def test_list(self):
+        ''' Lists should render the counts and the viewer's likes, even cached ones '''
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.list_url)
+        self.client.post(reverse('video-like', args=[self.videos[1].id]))
+        data = {item['id']: (item['likes'], item['liked']) for item in self.client.get(self.list_url).data}
+        self.assertEqual(data, {
+                self.videos[0].id: (0, False),
+                self.videos[1].id: (1, True),
+                self.videos[2].id: (0, False)
+        })
+        self.client.force_authenticate(user=self.creator)
+        data = {item['id']: item['liked'] for item in self.client.get(self.list_url).data}
+        self.assertFalse(any(data.values()))
+
+    def test_permissions(self):
+        ''' Anonymous users and users who can't see the video shouldn't like it '''
+        video = self.helper.create_video(self.creator, is_public=False)
+        url = reverse('video-like', args=[video.id])
+        self.assertEqual(self.client.post(url).status_code, 401)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+    def tearDown(self):
+        cache.clear()
@@ -0,0 +1,62 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video
+from django.core.cache import cache
+from django.urls import reverse
+from unittest import mock, skipUnless
+import utils.parsers
+import utils.renderers
+
+'''
+This module provides tests for the JSON and MessagePack renderers and parsers
+(utils/renderers.py, utils/parsers.py).
+
+Classes:
+    - MediaTypeTest: Provides methods to test rendering and parsing of each media type.
+'''
+class MediaTypeTest(APITestCase):
+    ''' Tests that every media type renders and parses the same data '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.video = Video.objects.create(
+                video_name='vid\u00e9o \u2028', creator=self.user, video='uploads/a.mp4'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('user-videos', args=[self.user.id])
+        self.detail_url = reverse('video-detail', args=[self.video.id])
+
+    def test_fast_json_matches_stdlib(self):
+        ''' JSON rendered with orjson should be identical to the stdlib rendering '''
+        with self.settings(RESPONSE_CACHE=False):
+            fast = self.client.get(self.list_url).content
+            with mock.patch.object(utils.renderers, 'orjson', None):
+                stdlib = self.client.get(self.list_url).content
+        self.assertEqual(fast, stdlib)
+
+    def test_invalid_json_body(self):
+        ''' A malformed JSON body should be rejected with a 400 '''
+        response = self.client.patch(self.detail_url, '{"video_name":', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_json_body_without_accelerator(self):
+        ''' JSON bodies should still be parsed by the stdlib fallback '''
+        with mock.patch.object(utils.parsers, 'orjson', None):
+            response = self.client.patch(self.detail_url, {'video_name': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['video_name'], 'renamed')
+
+    @skipUnless(utils.renderers.msgpack, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        ''' MessagePack responses should hold the same data as JSON ones '''
+        msgpack = utils.renderers.msgpack
+        response = self.client.get(self.detail_url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(self.detail_url).json())
+
+        body = msgpack.packb({'video_name': 'renamed'})
+        response = self.client.patch(self.detail_url, body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Video.objects.get(id=self.video.id).video_name, 'renamed')
@@ -0,0 +1,90 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from utils.response_cache import get_or_compute
+from apps.videos.models import Shared
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from decouple import config
+import shutil
+import threading
+
+'''
+This module provides tests for the response cache (utils/response_cache.py).
+
+Classes:
+    - ResponseCacheTest: Provides methods to test cached video lists.
+    - SingleFlightTest: Provides methods to test that concurrent misses compute once.
+'''
+@override_settings(MEDIA_ROOT=config('VIDEO_STORAGE_TEST'))
+class ResponseCacheTest(APITestCase):
+    ''' Tests that video lists are cached per viewer and invalidated by changes '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.friend = self.helper.create_user()
+        self.stranger = self.helper.create_user()
+        self.video = self.helper.upload_video(creator=self.user, is_public=False)
+        self.url = reverse('user-videos', args=[self.user.id])
+
+    def test_hit_runs_no_queries(self):
+        ''' A cached list should be served without querying the database '''
+        self.client.force_authenticate(user=self.user)
+        expected = self.client.get(self.url).data
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, expected)
+
+    def test_new_video_invalidates(self):
+        ''' Uploading a video should invalidate the creator's lists '''
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+        self.helper.upload_video(creator=self.user)
+        self.assertEqual(len(self.client.get(self.url).data), 2)
+
+    def test_viewers_are_separated(self):
+        ''' A video shared with one viewer should not be served to another '''
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.client.force_authenticate(user=self.friend)
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+        self.client.force_authenticate(user=self.stranger)
+        self.assertEqual(len(self.client.get(self.url).data), 0)
+
+    def test_unshare_invalidates(self):
+        ''' Removing a share should hide the video from the viewer '''
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.client.force_authenticate(user=self.friend)
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+        Shared.objects.filter(video=self.video, user=self.friend).delete()
+        self.assertEqual(len(self.client.get(self.url).data), 0)
+
+    def tearDown(self):
+        shutil.rmtree(
+                config('VIDEO_STORAGE_TEST'),
+                ignore_errors=True
+        )
+
+class SingleFlightTest(APITestCase):
+    ''' Tests that a miss being computed isn't computed again by other callers '''
+
+    def setUp(self):
+        cache.clear()
+
+    def test_waits_for_the_computing_caller(self):
+        ''' A caller should wait for the lock holder's result instead of computing '''
+        cache.add('key:lock', 1)
+        timer = threading.Timer(0.1, lambda: cache.set('key', 'computed'))
+        timer.start()
+        calls = []
+        value = get_or_compute('key', lambda: calls.append(1) or 'again', 60)
+        timer.join()
+        self.assertEqual(value, 'computed')
+        self.assertEqual(calls, [])
+
+    def test_computes_and_releases_the_lock(self):
+        ''' The first caller should compute, store the value and release the lock '''
+        self.assertEqual(get_or_compute('key', lambda: 'computed', 60), 'computed')
+        self.assertEqual(cache.get('key'), 'computed')
+        self.assertIsNone(cache.get('key:lock'))
@@ -0,0 +1,113 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Shared, Video
+from apps.videos import search
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from io import StringIO
+import re
+
+'''
+This module provides tests for full-text search of videos (apps/videos/search.py).
+
+Classes:
+    - SearchIndexTest: Provides methods to test keeping the index in sync and rebuilding it.
+    - SearchViewTest: Provides methods to test searching videos through the API.
+'''
+def indexed():
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT rowid, video_name FROM {search.INDEX_TABLE} ORDER BY rowid')
+        return cursor.fetchall()
+
+class SearchIndexTest(APITestCase):
+    ''' Tests that the index follows the videos '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.staff = self.helper.create_user(is_staff=True)
+        self.video = self.helper.create_video(self.user, 'cooking pasta')
+
+    def find(self, text):
+        return [video_id for _, video_id in search.search(text, self.staff)]
+
+    def test_sync(self):
+        ''' Inserts, updates (even through querysets) and deletes should be indexed '''
+        self.assertEqual(self.find('pasta'), [self.video.id])
+        Video.objects.filter(id=self.video.id).update(video_name='baking bread')
+        self.assertEqual(self.find('pasta'), [])
+        self.assertEqual(self.find('bread'), [self.video.id])
+        self.video.delete()
+        self.assertEqual(indexed(), [])
+
+    def test_query(self):
+        ''' Every word should match, the last one as a prefix, and operators be ignored '''
+        self.helper.create_video(self.user, 'cooking rice')
+        self.assertEqual(self.find('cook pasta'), [])
+        self.assertEqual(self.find('pasta cook'), [self.video.id])
+        self.assertEqual(self.find('pasta" OR "rice'), [])
+        self.assertEqual(search.search('!!', self.staff), [])
+
+    def test_rank(self):
+        ''' Matches in names should rank above matches in descriptions '''
+        described = self.helper.create_video(self.user, 'dinner', 'how to make tomato sauce')
+        named = self.helper.create_video(self.user, 'tomato sauce')
+        self.assertEqual(self.find('tomato'), [named.id, described.id])
+
+    def test_rebuild(self):
+        ''' Rebuilding should restore a drifted index '''
+        other = self.helper.create_video(self.user, 'hiking')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.INDEX_TABLE} WHERE rowid = %s', [self.video.id])
+            cursor.execute(f"INSERT INTO {search.INDEX_TABLE} (rowid, video_name) VALUES (999, 'ghost')")
+        out = StringIO()
+        call_command('rebuildsearch', chunk_size=1, stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Indexed 2 videos.')
+        self.assertEqual(indexed(), [(self.video.id, 'cooking pasta'), (other.id, 'hiking')])
+
+class SearchViewTest(APITestCase):
+    ''' Tests that searches list the matching videos the user can see '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.creator = self.helper.create_user()
+        self.user = self.helper.create_user()
+        self.url = reverse('video-search')
+
+    def get_ids(self, response):
+        return [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+
+    def test_visibility(self):
+        ''' Results should hold public videos, shared videos and the user's own '''
+        public = self.helper.create_video(self.creator, 'surf public')
+        private = self.helper.create_video(self.creator, 'surf private', is_public=False)
+        shared = self.helper.create_video(self.creator, 'surf shared', is_public=False)
+        Shared.objects.create(video=shared, user=self.user)
+        own = self.helper.create_video(self.user, 'surf own', is_public=False)
+
+        self.assertEqual(set(self.get_ids(self.client.get(self.url, {'q': 'surf'}))), {public.id})
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(set(self.get_ids(self.client.get(self.url, {'q': 'surf'}))), {public.id, shared.id, own.id})
+        self.client.force_authenticate(user=self.creator)
+        self.assertEqual(set(self.get_ids(self.client.get(self.url, {'q': 'surf'}))), {public.id, private.id, shared.id})
+
+    def test_pages(self):
+        ''' Following the next links should list every match once '''
+        videos = [self.helper.create_video(self.creator, f'skate {index}') for index in range(5)]
+        self.helper.create_video(self.creator, 'other')
+        ids = []
+        response = self.client.get(self.url, {'q': 'skate', 'page_size': 2})
+        while True:
+            ids += self.get_ids(response)
+            if 'Link' not in response:
+                break
+            response = self.client.get(re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1))
+        self.assertEqual(sorted(ids), [video.id for video in videos])
+
+    def test_missing_query(self):
+        ''' Searches without a query should be rejected '''
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': ' '}).status_code, 400)
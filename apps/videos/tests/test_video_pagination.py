@@ -0,0 +1,86 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+import re
+
+'''
+This module provides tests for keyset pagination (utils/pagination.py).
+
+Classes:
+    - VideoPaginationTest: Provides methods to test paginated video lists.
+'''
+def get_links(response):
+    ''' Returns the Link header of a response as a {rel: url} dict. '''
+    return {
+            rel: url
+            for url, rel in re.findall(r'<([^>]*)>; rel="(\w+)"', response.get('Link', ''))
+    }
+
+class VideoPaginationTest(APITestCase):
+    ''' Tests that video lists are paginated by cursor, most recent first '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        now = timezone.now()
+        # Two videos share a timestamp, so the id breaks the tie.
+        self.videos = [
+                Video.objects.create(
+                    video_name=f'video {i}', creator=self.user, video='uploads/a.mp4',
+                    uploaded_at=now - timedelta(minutes=min(i, 3))
+                )
+                for i in range(5)
+        ]
+        self.expected = [self.videos[i].id for i in (0, 1, 2, 4, 3)]
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('user-videos', args=[self.user.id])
+
+    def get_ids(self, response):
+        return [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+
+    def test_next_links_cover_the_list(self):
+        ''' Following the next links should list every video once, in order '''
+        ids = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertLessEqual(len(response.data), 2)
+            ids += self.get_ids(response)
+            if 'next' not in get_links(response):
+                break
+            response = self.client.get(get_links(response)['next'])
+        self.assertEqual(ids, self.expected)
+
+    def test_prev_link_returns_the_previous_page(self):
+        ''' The prev link of the second page should return the first page '''
+        first = self.client.get(self.url, {'page_size': 2})
+        second = self.client.get(get_links(first)['next'])
+        self.assertEqual(self.get_ids(second), self.expected[2:4])
+        previous = self.client.get(get_links(second)['prev'])
+        self.assertEqual(self.get_ids(previous), self.expected[:2])
+        self.assertNotIn('prev', get_links(previous))
+
+    def test_page_size_is_limited(self):
+        ''' The page size should be clamped to the server maximum '''
+        self.assertEqual(len(self.client.get(self.url, {'page_size': 1000}).data), 5)
+        self.assertEqual(len(self.client.get(self.url, {'page_size': 0}).data), 1)
+
+    def test_no_count_or_offset(self):
+        ''' Pages should be fetched without COUNT(*) or OFFSET '''
+        first = self.client.get(self.url, {'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(get_links(first)['next'])
+        sql = ' '.join(query['sql'] for query in queries.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        ''' A malformed cursor should return a 404 '''
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,138 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from utils.query_planner import plan_serializer
+from django.core.cache import cache
+from django.urls import reverse
+from apps.videos.serializers import VideoReadSerializer
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from decouple import config
+import shutil
+
+'''
+This module provides tests for the number of queries ran when reading videos.
+
+The query count must not depend on the number of videos (or shared users)
+being rendered; see utils/query_planner.py.
+
+Classes:
+    - VideoQueryPlanTest: Provides methods to test the planned queries of video endpoints.
+'''
+@override_settings(MEDIA_ROOT=config('VIDEO_STORAGE_TEST'))
+class VideoQueryPlanTest(APITestCase):
+    ''' Tests the queries ran by video-list and video-detail '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.shared_users = [self.helper.create_user() for i in range(3)]
+
+    def test_plan_of_read_serializer(self):
+        ''' The creator should be joined and the shared users prefetched '''
+        plan = plan_serializer(VideoReadSerializer)
+        self.assertEqual(plan.select, {'creator'})
+        self.assertIn('shared_with', plan.prefetch)
+        self.assertNotIn('creator__password', plan.only)
+        self.assertEqual(plan.unplanned, [])
+
+    def test_list_query_count_is_constant(self):
+        ''' Listing videos should cost the same number of queries for 1 or many videos '''
+        self.helper.upload_video(creator=self.user)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+
+        # Requested user lookup + the video rows with their creator joined +
+        # like counts + the requester's likes. Shared users aren't listed, so
+        # they aren't prefetched.
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 1)
+
+        for i in range(9):
+            self.helper.upload_video(creator=self.user)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 10)
+
+    def test_list_selects_only_rendered_columns(self):
+        ''' Listing videos should not load unrendered user columns '''
+        self.helper.upload_video(creator=self.user)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('password', sql)
+        self.assertNotIn('storage_limit', sql)
+        self.assertEqual(response.data[0]['creator']['username'], self.user.username)
+
+    def test_list_rows_render_like_instances(self):
+        ''' Rows should render the same as model instances '''
+        video = self.helper.upload_video(creator=self.user)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+        response = self.client.get(url)
+
+        detail = self.client.get(reverse('video-detail', args=[video.id])).data
+        for name, value in response.data[0].items():
+            self.assertEqual(value, detail[name])
+
+    def test_fields_skip_unrequested_relations(self):
+        ''' ?fields= should render only the requested fields and not join the creator '''
+        self.helper.upload_video(creator=self.user)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'self,video_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'self', 'video_name'})
+        self.assertNotIn('users_user', queries.captured_queries[-1]['sql'])
+
+    def test_expand_lists_shared_users(self):
+        ''' ?expand=shared_with should render shared users in lists '''
+        video = self.helper.upload_video(creator=self.user, is_public=False)
+        for user in self.shared_users:
+            self.helper.share_video_with_user(video, user)
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+
+        self.assertNotIn('shared_with', self.client.get(url).data[0])
+        # Requested user lookup + videos with creator + prefetched shares +
+        # the requester's likes (the like count was cached by the first request).
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'expand': 'shared_with'})
+        self.assertEqual(len(response.data[0]['shared_with']), len(self.shared_users))
+
+    def test_unknown_field(self):
+        ''' Requesting a field that doesn't exist should fail '''
+        self.client.force_authenticate(user=self.user)
+        url = reverse('user-videos', args=[self.user.id])
+        response = self.client.get(url, {'fields': 'self,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+    def test_detail_query_count_is_constant(self):
+        ''' Shared users of a private video should be loaded with one query '''
+        video = self.helper.upload_video(creator=self.user, is_public=False)
+        for user in self.shared_users:
+            self.helper.share_video_with_user(video, user)
+        self.client.force_authenticate(user=self.user)
+
+        # Video with creator + prefetched shares with their users + like
+        # count + whether the requester liked it.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('video-detail', args=[video.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['shared_with']), len(self.shared_users))
+
+    def tearDown(self):
+        shutil.rmtree(
+                config('VIDEO_STORAGE_TEST'),
+                ignore_errors=True
+        )
@@ -0,0 +1,65 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video
+from apps.videos.views import VideoListView
+from django.core.cache import cache
+from django.urls import reverse
+from unittest import mock
+import json
+
+'''
+This module provides tests for streamed lists (utils/streaming.py).
+
+Classes:
+    - VideoStreamingTest: Provides methods to test streamed video lists.
+'''
+class VideoStreamingTest(APITestCase):
+    ''' Tests that staff can stream complete video lists as JSON or NDJSON '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.staff = self.helper.create_user(is_staff=True)
+        for i in range(5):
+            Video.objects.create(video_name=f'video {i}', creator=self.user, video='uploads/a.mp4')
+        self.url = reverse('user-videos', args=[self.user.id])
+
+    def get_stream(self, stream_format):
+        response = self.client.get(self.url, {'stream': stream_format})
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_json_array(self):
+        ''' A JSON stream should match the paginated list, across chunks '''
+        self.client.force_authenticate(user=self.staff)
+        expected = json.loads(self.client.get(self.url, {'page_size': 200}).content)
+        with mock.patch.object(VideoListView, 'stream_chunk_size', 2):
+            response, content = self.get_stream('json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), expected)
+
+    def test_ndjson(self):
+        ''' An NDJSON stream should have one video per line '''
+        self.client.force_authenticate(user=self.staff)
+        response, content = self.get_stream('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['video_name'], 'video 4')
+
+    def test_empty_json_array(self):
+        ''' An empty list should stream as an empty array '''
+        Video.objects.all().delete()
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.get_stream('json')[1], '[]')
+
+    def test_requires_staff(self):
+        ''' Only staff should be able to stream a list '''
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(self.url, {'stream': 'json'}).status_code, 403)
+
+    def test_unknown_format(self):
+        ''' An unknown stream format should be rejected '''
+        self.client.force_authenticate(user=self.staff)
+        self.assertEqual(self.client.get(self.url, {'stream': 'xml'}).status_code, 400)
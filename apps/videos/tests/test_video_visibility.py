@@ -0,0 +1,141 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video, Shared, VideoVisibility
+from apps.videos import visibility
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+import re
+
+'''
+This module provides tests for the materialized video visibility (apps/videos/visibility.py).
+
+Classes:
+    - VideoVisibilityTest: Provides methods to test that the visibility table follows changes.
+    - VisibilityCheckTest: Provides methods to test the consistency checker.
+'''
+class VideoVisibilityTest(APITestCase):
+    ''' Tests that the visibility table follows shares, publishing and deletes '''
+
+    def setUp(self):
+        cache.clear()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.friend = self.helper.create_user()
+        self.stranger = self.helper.create_user()
+        self.video = self.helper.create_video(self.user, is_public=False)
+        self.url = reverse('user-videos', args=[self.user.id])
+
+    def get_viewers(self):
+        return set(VideoVisibility.objects.filter(video=self.video).values_list('viewer_id', flat=True))
+
+    def list_as(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.url).data
+
+    def test_share_and_unshare(self):
+        ''' Sharing should add the viewer's row, unsharing should remove it '''
+        self.assertEqual(self.get_viewers(), set())
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.assertEqual(self.get_viewers(), {self.friend.id})
+        self.assertEqual(len(self.list_as(self.friend)), 1)
+        self.assertEqual(len(self.list_as(self.stranger)), 0)
+
+        Shared.objects.filter(video=self.video, user=self.friend).delete()
+        self.assertEqual(self.get_viewers(), set())
+        self.assertEqual(len(self.list_as(self.friend)), 0)
+
+    def test_publish_and_unpublish(self):
+        ''' A public video should have a single row for everyone '''
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.video.is_public = True
+        self.video.save()
+        self.assertEqual(self.get_viewers(), {None})
+        self.assertEqual(len(self.list_as(self.stranger)), 1)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+
+        self.video.is_public = False
+        self.video.save()
+        self.assertEqual(self.get_viewers(), {self.friend.id})
+        self.assertEqual(len(self.list_as(self.stranger)), 0)
+
+    def test_delete(self):
+        ''' Deleting a video should delete its rows '''
+        self.helper.share_video_with_user(self.video, self.friend)
+        self.video.delete()
+        self.assertFalse(VideoVisibility.objects.exists())
+
+    def test_list_does_not_join_shares(self):
+        ''' Listing another user's videos should not read the shares '''
+        self.client.force_authenticate(user=self.friend)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('videos_shared' in query['sql'] for query in queries.captured_queries))
+
+    def test_list_pages_from_index_ranges(self):
+        ''' Another user's list should merge two sorted index ranges, page by page '''
+        now = timezone.now()
+        Video.objects.filter(id=self.video.id).update(uploaded_at=now - timedelta(minutes=10))
+        visible = [self.helper.create_video(self.user, is_public=index % 2 == 0) for index in range(4)]
+        for index, video in enumerate(visible):
+            Video.objects.filter(id=video.id).update(uploaded_at=now - timedelta(minutes=index))
+            if not video.is_public:
+                self.helper.share_video_with_user(video, self.friend)
+        visibility.check(repair=True)
+        self.client.force_authenticate(user=self.friend)
+
+        ids = []
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': 3})
+        # Read before the next request resets the query log.
+        ranges = [query['sql'] for query in context.captured_queries if 'FROM "videos_videovisibility"' in query['sql']]
+        while True:
+            ids += [int(video['self'].rstrip('/').rsplit('/', 1)[1]) for video in response.data]
+            if 'Link' not in response:
+                break
+            response = self.client.get(re.search(r'<([^>]*)>; rel="next"', response['Link']).group(1))
+        self.assertEqual(ids, [video.id for video in visible])
+
+        self.assertEqual(len(ranges), 2)
+        for sql in ranges:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertIn('video_visibility_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+class VisibilityCheckTest(APITestCase):
+    ''' Tests that the checker finds and repairs changes made without signals '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.friend = self.helper.create_user()
+        self.videos = [self.helper.create_video(self.user, is_public=False) for _ in range(3)]
+        self.helper.share_video_with_user(self.videos[0], self.friend)
+
+    def test_consistent(self):
+        ''' A table maintained by signals should be consistent '''
+        self.assertEqual(visibility.check(chunk_size=2), (0, 0))
+
+    def test_repair(self):
+        ''' Updates that skip signals should be found and repaired '''
+        Video.objects.filter(id=self.videos[0].id).update(is_public=True)
+        VideoVisibility.objects.create(
+                viewer=self.friend, creator=self.user, video=self.videos[1],
+                uploaded_at=self.videos[1].uploaded_at
+        )
+        self.assertEqual(visibility.check(chunk_size=2), (1, 2))
+
+        out = StringIO()
+        call_command('checkvisibility', '--repair', stdout=out)
+        self.assertIn('Repaired 1 missing and 2 extra', out.getvalue())
+        self.assertEqual(visibility.check(), (0, 0))
+        self.assertEqual(set(VideoVisibility.objects.values_list('viewer_id', 'video_id')),
+                         {(None, self.videos[0].id)})
@@ -0,0 +1,95 @@
+from rest_framework.test import APITestCase
+from utils.test_helper import TestHelper
+from apps.videos.models import Video
+from apps.videos.view_counts import ViewCounter, counter
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from unittest import mock
+
+'''
+This module provides tests for write-behind view counting (apps/videos/view_counts.py).
+
+Classes:
+    - ViewCounterTest: Provides methods to test buffering and flushing view counts.
+    - ViewCountViewTest: Provides methods to test counting views through the API.
+'''
+class ViewCounterTest(APITestCase):
+    ''' Tests that buffered views are aggregated and flushed in bulk '''
+
+    def setUp(self):
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.videos = [self.helper.create_video(self.user) for _ in range(2)]
+        self.counter = ViewCounter()
+
+    def get_views(self):
+        return [Video.objects.get(id=video.id).views for video in self.videos]
+
+    def test_flush_aggregates(self):
+        ''' A flush should add every buffered view with a single UPDATE '''
+        with self.settings(VIEW_COUNT_FLUSH_SIZE=100, VIEW_COUNT_FLUSH_INTERVAL=60):
+            for video_id in [self.videos[0].id] * 3 + [self.videos[1].id] * 2:
+                self.counter.record(video_id)
+        self.assertEqual(self.get_views(), [0, 0])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.counter.flush(), 5)
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.get_views(), [3, 2])
+
+    def test_size_threshold(self):
+        ''' Reaching the flush size should flush the buffer '''
+        with self.settings(VIEW_COUNT_FLUSH_SIZE=3, VIEW_COUNT_FLUSH_INTERVAL=60):
+            for _ in range(3):
+                self.counter.record(self.videos[0].id)
+        self.assertEqual(self.get_views(), [3, 0])
+
+    def test_interval(self):
+        ''' A view recorded after the flush interval should flush the buffer '''
+        with self.settings(VIEW_COUNT_FLUSH_SIZE=100, VIEW_COUNT_FLUSH_INTERVAL=0):
+            self.counter.record(self.videos[1].id)
+        self.assertEqual(self.get_views(), [0, 1])
+
+    def test_failed_flush_keeps_counts(self):
+        ''' Counts of a failed flush should be flushed again later '''
+        with self.settings(VIEW_COUNT_FLUSH_SIZE=100, VIEW_COUNT_FLUSH_INTERVAL=60):
+            self.counter.record(self.videos[0].id)
+        with mock.patch('apps.videos.view_counts.write_counts', side_effect=RuntimeError), \
+                self.assertLogs('apps.videos.view_counts', 'WARNING'):
+            self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.get_views(), [1, 0])
+
+class ViewCountViewTest(APITestCase):
+    ''' Tests that views counted through the API show up in video representations '''
+
+    def setUp(self):
+        cache.clear()
+        counter.take()
+        self.helper = TestHelper()
+        self.user = self.helper.create_user()
+        self.stranger = self.helper.create_user()
+        self.video = self.helper.create_video(self.user)
+        self.list_url = reverse('user-videos', args=[self.user.id])
+
+    def test_count_view(self):
+        ''' Flushed views should be rendered in lists, even cached ones '''
+        self.client.force_authenticate(user=self.stranger)
+        self.assertEqual(self.client.get(self.list_url).data[0]['views'], 0)
+        with self.settings(VIEW_COUNT_FLUSH_SIZE=100, VIEW_COUNT_FLUSH_INTERVAL=60):
+            response = self.client.post(reverse('video-views', args=[self.video.id]))
+        self.assertEqual(response.status_code, 202)
+        counter.flush()
+        self.assertEqual(self.client.get(self.list_url).data[0]['views'], 1)
+
+    def test_private_video(self):
+        ''' Views of a video the user can't see should be rejected '''
+        video = self.helper.create_video(self.user, is_public=False)
+        self.client.force_authenticate(user=self.stranger)
+        response = self.client.post(reverse('video-views', args=[video.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def tearDown(self):
+        counter.take()
@@ -1,14 +1,43 @@
 from django.urls import path, include
-from apps.videos.views import VideoListView, VideoDetailView
+from apps.videos.views import (DiscoverView, FeedView, HistoryView, VideoListView, VideoDetailView, VideoLikeView,
+        VideoPositionView, VideoSearchView, VideoViewCountView)
 from rest_framework.routers import DefaultRouter
 
 urlpatterns = [
+        path('feed/',
+             FeedView.as_view(),
+             name='feed'
+        ),
+        path('discover/',
+             DiscoverView.as_view(),
+             name='discover'
+        ),
+        path('history/',
+             HistoryView.as_view(),
+             name='history'
+        ),
         path('users/<int:user_id>/videos/', 
              VideoListView.as_view(),
              name='user-videos'
         ),
+        path('videos/search/',
+             VideoSearchView.as_view(),
+             name='video-search'
+        ),
         path('videos/<int:pk>/', 
              VideoDetailView.as_view(),
              name='video-detail'
         ),
+        path('videos/<int:pk>/views/',
+             VideoViewCountView.as_view(),
+             name='video-views'
+        ),
+        path('videos/<int:pk>/like/',
+             VideoLikeView.as_view(),
+             name='video-like'
+        ),
+        path('videos/<int:pk>/position/',
+             VideoPositionView.as_view(),
+             name='video-position'
+        ),
 ]
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, When
+from apps.videos.models import Video
+from utils.generations import bump_generation
+from collections import Counter
+import atexit
+import logging
+import threading
+import time
+
+'''
+Write-behind view counting.
+
+Incrementing Video.views on every playback would make every viewer of a
+video write the same row (SQLite serializes all writers anyway). Instead,
+views are counted in a per-process buffer, aggregated per video, and added
+to Video.views in one UPDATE per flush:
+
+    UPDATE videos_video SET views = views + CASE id WHEN 1 THEN 12 WHEN 7 THEN 3 END
+    WHERE id IN (1, 7)
+
+A flush happens when the buffer holds VIEW_COUNT_FLUSH_SIZE views, on the
+first view recorded VIEW_COUNT_FLUSH_INTERVAL seconds after the last flush,
+and when the process exits. A failed flush puts its counts back into the
+buffer. A crash loses at most the views buffered since the last flush.
+
+Flushes don't send signals: they invalidate the cached responses of the
+creators of the flushed videos (at most once per interval), while cached
+fragments never hold the count (VideoReadSerializer.Meta.fragment_exclude).
+
+Settings:
+    VIEW_COUNT_FLUSH_SIZE (int): Buffered views that trigger a flush. Defaults to 1000.
+    VIEW_COUNT_FLUSH_INTERVAL (float): Seconds after which a view triggers a flush. Defaults to 10.
+'''
+
+logger = logging.getLogger(__name__)
+
+# Videos updated per UPDATE statement.
+FLUSH_BATCH_SIZE = 500
+
+def get_flush_size():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_SIZE', 1000)
+
+def get_flush_interval():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+class ViewCounter:
+    ''' A thread-safe buffer of view counts. See the module docstring. '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.size = 0
+        self.last_flush = time.monotonic()
+
+    def record(self, video_id, count=1):
+        ''' Counts views of a video, flushing the buffer when it's due. '''
+        with self.lock:
+            self.pending[video_id] += count
+            self.size += count
+            due = (self.size >= get_flush_size() or
+                    time.monotonic() - self.last_flush >= get_flush_interval())
+        if due:
+            self.flush()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending, self.size = self.pending, Counter(), 0
+            self.last_flush = time.monotonic()
+        return pending
+
+    def flush(self):
+        '''
+        Adds the buffered views to the videos.
+
+        Returns:
+            int: The number of flushed views.
+        '''
+        pending = self.take()
+        if not pending:
+            return 0
+        try:
+            write_counts(pending)
+        except Exception:
+            logger.warning('Failed to flush %d view counts', len(pending), exc_info=True)
+            with self.lock:
+                self.pending.update(pending)
+                self.size += sum(pending.values())
+            return 0
+        return sum(pending.values())
+
+def write_counts(counts):
+    ''' Adds counts ({video id: views}) to the videos, in one transaction. '''
+    video_ids = sorted(counts)
+    with transaction.atomic():
+        for start in range(0, len(video_ids), FLUSH_BATCH_SIZE):
+            batch = video_ids[start:start + FLUSH_BATCH_SIZE]
+            Video.objects.filter(id__in=batch).update(views=F('views') + Case(
+                    *(When(id=video_id, then=counts[video_id]) for video_id in batch)
+            ))
+        bump_generation(*Video.objects.filter(id__in=video_ids).values_list('creator_id', flat=True).distinct())
+
+counter = ViewCounter()
+atexit.register(counter.flush)
+
+def record_view(video_id):
+    counter.record(video_id)
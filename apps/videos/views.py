@@ -1,45 +1,108 @@
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.db import transaction
 from rest_framework.parsers import JSONParser
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import GenericAPIView, ListAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.response import Response
+from rest_framework import status
 from rest_framework import permissions
-from apps.videos.models import Video
-from apps.videos.serializers import VideoReadSerializer, VideoWriteSerializer
+from rest_framework.exceptions import ValidationError
+from apps.videos.models import Video, VideoVisibility
+from apps.videos.serializers import HistoryVideoSerializer, PositionSerializer, VideoReadSerializer, VideoWriteSerializer
 from apps.videos.permissions import IsCreator, IsShared
+from apps.videos.tasks import delete_video_file
+from apps.videos.view_counts import record_view
+from apps.videos import likes
+from apps.videos.feed import FeedPagination
+from apps.videos.discover import DiscoverPagination
+from apps.videos.history import HistoryPagination, record_position
+from apps.videos.search import SearchPagination
+from apps.videos.visibility import VisibilityPagination
 from apps.users.models import User
+from utils.query_planner import PlannedQuerysetMixin
+from utils.streaming import StreamingListMixin
+from utils.response_cache import CachedListMixin
+from utils.conditional import ConditionalDetailMixin, ConditionalListMixin
 
-'''
-Eventually add a feed which can be used as homepage.
-class FeedView(ListAPIView):
-    queryset = Video.objects.all()
+class FeedView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    View to list the home feed of the requesting user: the videos of their friends
+    and the videos shared with them, most recent first (see apps/videos/feed.py).
+    '''
+    values_rows = True
+    ordering = ('-uploaded_at', '-id')
     serializer_class = VideoReadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
-        
-        # Filter the listed videos to videos the user can see if the user is not
-        # a staff member
-        if not (user.is_authenticated and user.is_staff):
-            # Include all public videos by default
-            queryset = Video.objects.filter(is_public=True)
-            if user.is_authenticated:
-                #TODO: also add videos that are shared with the user
-                queryset |= Video.objects.filter(creator=user)
-
-        return queryset
-    
-    def perform_destroy(self, instance):
-        instance.video.delete(False)
-        instance.delete()
-'''
+        # Feed entries are checked against the current visibility of their videos.
+        requester = self.request.user
+        visible = VideoVisibility.objects.filter(Q(viewer__isnull=True) | Q(viewer=requester))
+        return Video.objects.filter(id__in=visible.values('video_id'))
 
-class VideoListView(ListCreateAPIView):
+class DiscoverView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    View to list public videos of every creator, most popular first (see apps/videos/discover.py).
+    '''
+    values_rows = True
+    queryset = Video.objects.filter(is_public=True)
+    serializer_class = VideoReadSerializer
+    pagination_class = DiscoverPagination
+
+class VideoSearchView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    View to search the names and descriptions of the videos the requesting user
+    can see (?q=), best match first (see apps/videos/search.py).
+    '''
+    values_rows = True
+    serializer_class = VideoReadSerializer
+    pagination_class = SearchPagination
+    search_query_param = 'q'
+
+    def get_search(self):
+        text = self.request.query_params.get(self.search_query_param, '').strip()
+        if not text:
+            raise ValidationError({self.search_query_param: ['This parameter is required.']})
+        return text
+
+    def get_queryset(self):
+        # Results are filtered by visibility in the search query already.
+        return Video.objects.all()
+
+class HistoryView(ConditionalListMixin, PlannedQuerysetMixin, ListAPIView):
+    '''
+    View to list the watch history of the requesting user, most recently watched
+    first, with the position to resume each video from (see apps/videos/history.py).
+    '''
+    values_rows = True
+    serializer_class = HistoryVideoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HistoryPagination
+
+    def get_queryset(self):
+        # Videos unshared since they were watched are dropped.
+        requester = self.request.user
+        if requester.is_staff:
+            return Video.objects.all()
+        visible = VideoVisibility.objects.filter(Q(viewer__isnull=True) | Q(viewer=requester))
+        return Video.objects.filter(Q(creator=requester) | Q(id__in=visible.values('video_id')))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['positions'] = getattr(self.paginator, 'positions', {})
+        return context
+
+class VideoListView(StreamingListMixin, CachedListMixin, PlannedQuerysetMixin, ListCreateAPIView):
     '''
     View to list or post videos. Listing videos only shows their metadata, not the actual video.
     '''
+    values_rows = True
+    # Keyset pagination order (see utils/pagination.py).
+    ordering = ('-uploaded_at', '-id')
+
     def get_serializer_class(self):
         serializer_class = VideoReadSerializer
         if self.request.method == 'POST':
@@ -52,16 +115,16 @@ class VideoListView(ListCreateAPIView):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-    def get_serializer_context(self):
-        ''' 
-        Override this function to add 'is_list' key into the context 
-        dictionary. In the serializer, if 'is_list' is true, then we won't
-        list the shared users in the serialized output.
-        '''
-        context = super().get_serializer_context()
-        if self.request.method == 'GET':
-            context['is_list'] = True
-        return context
+    @property
+    def paginator(self):
+        # Other users' lists are paged from the visibility index.
+        if not hasattr(self, '_paginator'):
+            self._paginator = VisibilityPagination() if self.reads_visibility() else self.pagination_class()
+        return self._paginator
+
+    def reads_visibility(self):
+        requester = self.request.user
+        return not (requester.is_staff or requester.id == self.kwargs['user_id'])
 
     def get_queryset(self):
         user = get_object_or_404(User, id=self.kwargs['user_id'])
@@ -72,16 +135,19 @@ class VideoListView(ListCreateAPIView):
         #   -user: if the creator, sees all videos; else, sees only the videos
         #          of a user that is public or shared with them
         #   -anonymous: sees only a user's public videos
+        # Other users' visibility is read from the materialized visibility
+        # table (see apps/videos/visibility.py); their pages come from
+        # VisibilityPagination.
         if requester.is_authenticated:
-            if requester.is_staff:
+            if requester.is_staff or requester == user:
                 return Video.objects.filter(creator=user)
             return Video.objects.filter(
-                Q(creator=user) & 
-                (Q(is_public=True) | Q(shared_with__user=requester) | Q(creator=requester))
+                Q(visibility__creator=user) &
+                (Q(visibility__viewer__isnull=True) | Q(visibility__viewer=requester))
             )
-        return Video.objects.filter(Q(creator=user) & Q(is_public=True))
+        return Video.objects.filter(visibility__creator=user, visibility__viewer__isnull=True)
 
-class VideoDetailView(RetrieveUpdateDestroyAPIView):
+class VideoDetailView(ConditionalDetailMixin, PlannedQuerysetMixin, RetrieveUpdateDestroyAPIView):
     '''
     View to retrieve / update / delete video instances, including the video file
     and metadata.
@@ -104,5 +170,57 @@ class VideoDetailView(RetrieveUpdateDestroyAPIView):
         return [permission() for permission in permission_classes]
 
     def perform_destroy(self, instance):
-        instance.video.delete(False)
-        instance.delete()
+        # The file is removed by a background job. Enqueuing in the same
+        # transaction as the delete means the job exists only if the row is gone.
+        with transaction.atomic():
+            name = instance.video.name
+            instance.delete()
+            if name:
+                delete_video_file.enqueue(name=name)
+
+class VideoViewCountView(GenericAPIView):
+    '''
+    View to count a view (playback) of a video. Views are added to the video's
+    count in batches (see apps/videos/view_counts.py).
+    '''
+    queryset = Video.objects.all()
+    permission_classes = [((permissions.IsAuthenticated & IsCreator) | IsShared) | permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        video = self.get_object()
+        record_view(video.id)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+class VideoLikeView(GenericAPIView):
+    '''
+    View to like (POST) or unlike (DELETE) a video as the requesting user. Like
+    counts are kept in sharded counters (see apps/videos/likes.py).
+    '''
+    queryset = Video.objects.all()
+    permission_classes = [permissions.IsAuthenticated & (IsCreator | IsShared | permissions.IsAdminUser)]
+
+    def post(self, request, *args, **kwargs):
+        video = self.get_object()
+        created = likes.like(request.user, video)
+        return Response(status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        video = self.get_object()
+        likes.unlike(request.user, video)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class VideoPositionView(GenericAPIView):
+    '''
+    View to report the playback position of a video for the requesting user's
+    watch history. Positions are written in batches (see apps/videos/history.py).
+    '''
+    queryset = Video.objects.all()
+    serializer_class = PositionSerializer
+    permission_classes = [permissions.IsAuthenticated & (IsCreator | IsShared | permissions.IsAdminUser)]
+
+    def post(self, request, *args, **kwargs):
+        video = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        record_position(request.user.id, video.id, serializer.validated_data['position'])
+        return Response(status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models import Q
+from apps.videos.models import Video, Shared, VideoVisibility
+from utils.consistency import check_rows
+from utils.pagination import EntryPagination
+import heapq
+import itertools
+
+'''
+Maintains VideoVisibility, the materialized visibility of videos, so that
+"the videos of X visible to Y" is read from one index without joining the
+shares. It takes two ranges of the index:
+
+    (creator=X, viewer IS NULL)  public videos of X
+    (creator=X, viewer=Y)        private videos of X shared with Y
+
+A page of the list reads each range from the page's cursor, most recent first
+(with LIMIT page_size + 1), and merges them (see read_visible()). An OR of the
+two ranges would read every row of the creator, for all viewers, and sort them.
+
+Rows are written in the transaction of the change they follow (see
+apps/videos/signals.py):
+    - saving a video (publish, unpublish, reupload) rewrites its rows,
+    - sharing adds the viewer's row and unsharing removes it,
+    - deleting a video or a user cascades to the rows.
+
+Run `manage.py checkvisibility --repair` after bulk changes of videos or
+shares, which send no signals (see utils/consistency.py).
+'''
+
+def expected_rows(videos, shares):
+    '''
+    Returns the visibility rows of videos.
+
+    Args:
+        videos (iterable of tuple): (id, creator_id, is_public, uploaded_at) of the videos.
+        shares (dict): Maps video ids to the ids of the users they are shared with.
+
+    Returns:
+        set of tuple: (viewer_id, creator_id, video_id, uploaded_at) rows.
+    '''
+    rows = set()
+    for video_id, creator_id, is_public, uploaded_at in videos:
+        if creator_id is None:
+            continue
+        viewers = [None] if is_public else shares.get(video_id, ())
+        rows.update((viewer_id, creator_id, video_id, uploaded_at) for viewer_id in viewers)
+    return rows
+
+def get_shares(video_ids):
+    shares = {}
+    for video_id, user_id in Shared.objects.filter(video_id__in=video_ids).values_list('video_id', 'user_id'):
+        shares.setdefault(video_id, []).append(user_id)
+    return shares
+
+def create_rows(rows):
+    VideoVisibility.objects.bulk_create([
+            VideoVisibility(viewer_id=viewer_id, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+            for viewer_id, creator_id, video_id, uploaded_at in rows
+    ])
+
+def sync_video(video):
+    ''' Rewrites the visibility rows of a video. '''
+    with transaction.atomic():
+        VideoVisibility.objects.filter(video_id=video.id).delete()
+        videos = [(video.id, video.creator_id, video.is_public, video.uploaded_at)]
+        shares = {} if video.is_public else get_shares([video.id])
+        create_rows(expected_rows(videos, shares))
+
+def add_share(share):
+    ''' Adds the row of a new share, unless the video is public. '''
+    video = (Video.objects.filter(id=share.video_id)
+            .values_list('creator_id', 'is_public', 'uploaded_at').first())
+    if video is None:
+        return
+    creator_id, is_public, uploaded_at = video
+    if creator_id is None or is_public:
+        return
+    with transaction.atomic():
+        VideoVisibility.objects.filter(viewer_id=share.user_id, video_id=share.video_id).delete()
+        create_rows([(share.user_id, creator_id, share.video_id, uploaded_at)])
+
+def remove_share(share):
+    VideoVisibility.objects.filter(viewer_id=share.user_id, video_id=share.video_id).delete()
+
+def rewrite_rows(video_ids, rows):
+    VideoVisibility.objects.filter(video_id__in=video_ids).delete()
+    create_rows(rows)
+
+def check(repair=False, chunk_size=1000):
+    '''
+    Compares the visibility table with the videos and their shares (see
+    utils/consistency.py).
+
+    Returns:
+        tuple: (missing, extra) numbers of rows.
+    '''
+    fields = ['viewer_id', 'creator_id', 'video_id', 'uploaded_at']
+    return check_rows(
+            Video.objects.values_list('id', 'creator_id', 'is_public', 'uploaded_at'),
+            lambda videos: expected_rows(videos, get_shares([video[0] for video in videos])),
+            lambda first_id, last_id: VideoVisibility.objects.filter(
+                    video_id__gte=first_id, video_id__lte=last_id).values_list(*fields),
+            rewrite_rows,
+            fields.index('video_id'),
+            repair=repair,
+            chunk_size=chunk_size
+    )
+
+def after(cursor):
+    ''' Returns the filter of the entries after an (uploaded_at, video_id) cursor. '''
+    if cursor is None:
+        return Q()
+    uploaded_at, video_id = cursor
+    return Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, video_id__lt=video_id)
+
+def read_visible(creator_id, viewer_id=None, cursor=None, limit=50):
+    '''
+    Returns a page of the videos of a creator visible to a viewer.
+
+    Args:
+        creator_id (int): The creator of the videos.
+        viewer_id (int, optional): The viewer, None for anonymous users. Defaults to None.
+        cursor (tuple, optional): (uploaded_at, video_id) of the last entry of
+            the previous page. Defaults to None (the first page).
+        limit (int, optional): The maximum number of entries. Defaults to 50.
+
+    Returns:
+        list of tuple: (uploaded_at, video_id) entries, most recent first.
+    '''
+    ranges = [Q(viewer__isnull=True)]
+    if viewer_id is not None:
+        ranges.append(Q(viewer_id=viewer_id))
+    streams = [
+            VideoVisibility.objects.filter(viewers, after(cursor), creator_id=creator_id)
+            .order_by('-uploaded_at', '-video_id').values_list('uploaded_at', 'video_id')[:limit]
+            for viewers in ranges
+    ]
+    return list(itertools.islice(heapq.merge(*streams, reverse=True), limit))
+
+class VisibilityPagination(EntryPagination):
+    '''
+    Paginates the videos of the user in the url visible to the requesting user
+    by (uploaded_at, video id) cursor, from the visibility index.
+    '''
+    names = ['uploaded_at', 'video']
+    cursor_model = VideoVisibility
+
+    def get_entries(self, request, view, cursor, limit):
+        viewer_id = request.user.id if request.user.is_authenticated else None
+        return read_visible(view.kwargs['user_id'], viewer_id, cursor, limit)
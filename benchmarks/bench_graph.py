@@ -0,0 +1,94 @@
+'''
+Benchmarks the in-memory friendship graph (apps/friendships/graph.py): the
+time to build its arrays from the database, their size, and the time of
+friend counts, friendship checks and mutual friends.
+
+Users and accepted friendship edges are inserted into a throwaway test
+database, each user befriending random others (about --degree friends each).
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_graph [--users 100000] [--degree 20] [--repeat 5]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.utils import timezone
+from apps.users.models import User
+from apps.friendships.models import Friendship, FriendshipEdge
+from apps.friendships.graph import FriendGraph
+from benchmarks.bench_serializers import best_of
+
+def add_friendships(users, degree):
+    ''' Inserts users and about users * degree / 2 accepted friendships (with their edges). '''
+    rng = random.Random(0)
+    for start in range(0, users, 10000):
+        User.objects.bulk_create([
+                User(username=f'user{i}', email=f'user{i}@test.com')
+                for i in range(start, min(start + 10000, users))
+        ])
+    ids = list(User.objects.values_list('id', flat=True))
+    pairs = set()
+    while len(pairs) < users * degree // 2:
+        low, high = sorted(rng.sample(ids, 2))
+        pairs.add((low, high))
+    now = timezone.now()
+    pairs = sorted(pairs)
+    for start in range(0, len(pairs), 10000):
+        # bulk_create skips save(); the edges are written directly.
+        friendships = Friendship.objects.bulk_create([
+                Friendship(low_id=low, high_id=high, status='accepted')
+                for low, high in pairs[start:start + 10000]
+        ])
+        FriendshipEdge.objects.bulk_create([
+                FriendshipEdge(owner_id=owner, friend_id=friend, friendship_id=friendship.id,
+                               status='accepted', since=now)
+                for friendship, (low, high) in zip(friendships, pairs[start:start + 10000])
+                for owner, friend in ((low, high), (high, low))
+        ])
+    return ids, len(pairs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--degree', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        ids, friendships = add_friendships(args.users, args.degree)
+        graph = FriendGraph()
+        start = time.perf_counter()
+        graph.load()
+        build_time = time.perf_counter() - start
+        size = (graph.offsets.itemsize * len(graph.offsets) +
+                graph.neighbors.itemsize * len(graph.neighbors))
+        print(f'{friendships} friendships of {args.users} users: built in {build_time:.2f}s, '
+              f'{size / 2 ** 20:.1f}MB ({size / friendships * 1e6 / 2 ** 20:.1f}MB per million friendships)')
+
+        rng = random.Random(1)
+        samples = [tuple(rng.sample(ids, 2)) for _ in range(1000)]
+        cases = [
+                ('friend_count', lambda: [graph.friend_count(user_id) for user_id, _ in samples]),
+                ('are_friends', lambda: [graph.are_friends(user_id, other_id) for user_id, other_id in samples]),
+                ('mutual_friends', lambda: [graph.mutual_friends(user_id, other_id) for user_id, other_id in samples])
+        ]
+        print(f"{'lookup':<16} {'µs per call':>12}")
+        for name, func in cases:
+            elapsed, _ = best_of(args.repeat, func)
+            print(f'{name:<16} {elapsed / len(samples) * 1e6:>12.2f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+if __name__ == '__main__':
+    main()
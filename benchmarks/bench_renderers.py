@@ -0,0 +1,74 @@
+'''
+Benchmarks the JSON renderers and parsers (stdlib vs. orjson, see
+utils/renderers.py and utils/parsers.py) and MessagePack on real list
+payloads of VideoReadSerializer and AcceptedFriendshipSerializer.
+
+The payloads are rendered once up front, so only encoding and decoding
+are measured. Formats whose package isn't installed are skipped.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_renderers [--rows 1000 10000] [--repeat 5]
+'''
+import argparse
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from types import SimpleNamespace
+from apps.videos.serializers import VideoReadSerializer
+from apps.friendships.serializers import AcceptedFriendshipSerializer
+from benchmarks.bench_serializers import best_of, make_friendships, make_videos, stub_likes
+from utils import renderers
+from utils.parsers import FastJSONParser, MessagePackParser
+from utils.renderers import FastJSONRenderer, MessagePackRenderer
+
+def get_formats():
+    formats = [('stdlib json', JSONRenderer(), JSONParser())]
+    if renderers.orjson is not None:
+        formats.append(('orjson', FastJSONRenderer(), FastJSONParser()))
+    if renderers.msgpack is not None:
+        formats.append(('msgpack', MessagePackRenderer(), MessagePackParser()))
+    return formats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    stub_likes()
+
+    request = Request(APIRequestFactory().get('/', SERVER_NAME=settings.ALLOWED_HOSTS[0]))
+    context = {'request': request, 'view': SimpleNamespace(kwargs={'user_id': 1})}
+    cases = [
+            ('VideoReadSerializer', VideoReadSerializer, make_videos),
+            ('AcceptedFriendshipSerializer', AcceptedFriendshipSerializer, make_friendships)
+    ]
+    parser_context = {'encoding': 'utf-8'}
+
+    print(f"{'serializer':<30} {'rows':>7} {'format':<12} {'render (ms)':>12} {'parse (ms)':>11} {'bytes':>10}")
+    for name, serializer_class, factory in cases:
+        for rows in args.rows:
+            data = serializer_class(factory(rows), many=True, context=dict(context)).data
+            for format_name, renderer, format_parser in get_formats():
+                render_time, body = best_of(args.repeat, lambda: renderer.render(data))
+                parse_time, parsed = best_of(
+                        args.repeat,
+                        lambda: format_parser.parse(io.BytesIO(body), parser_context=parser_context)
+                )
+                assert len(parsed) == rows, f'{name}: {format_name} lost rows'
+                print(f'{name:<30} {rows:>7} {format_name:<12} {render_time * 1000:>12.1f} '
+                      f'{parse_time * 1000:>11.1f} {len(body):>10}')
+
+if __name__ == '__main__':
+    main()
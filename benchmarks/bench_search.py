@@ -0,0 +1,99 @@
+'''
+Benchmarks full-text search of videos (apps/videos/search.py): one page of
+results for rare, common and prefix searches, as an anonymous user and as a
+user with shares.
+
+Videos are inserted into a throwaway in-memory test database (migrated with
+the search index and its triggers), with names and descriptions drawn from
+a small vocabulary.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_search [--rows 100000 1000000] [--repeat 5]
+'''
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.utils import timezone
+from apps.users.models import User
+from apps.videos.models import Shared, Video, VideoVisibility
+from apps.videos import search
+from benchmarks.bench_serializers import best_of
+
+def make_words(count):
+    rng = random.Random(0)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(count)]
+
+# Words are drawn with a Zipf-like distribution: WORDS[0] is the most common.
+WORDS = make_words(5000)
+QUERIES = [
+        ('rare', WORDS[-2]),
+        ('uncommon', WORDS[99]),
+        ('common', WORDS[9]),
+        ('most common', WORDS[0]),
+        ('two common', f'{WORDS[0]} {WORDS[1]}'),
+        ('prefix', WORDS[0][:2])
+]
+
+def add_videos(count, user):
+    ''' Inserts count more videos, 90% public, and shares some private ones with user. '''
+    rng = random.Random(count)
+    now = timezone.now()
+    creators = list(User.objects.exclude(id=user.id))
+    pick = lambda: WORDS[min(int(rng.paretovariate(1.0)) - 1, len(WORDS) - 1)]
+    for start in range(0, count, 10000):
+        Video.objects.bulk_create([
+                Video(creator=creators[i % len(creators)], video_name=f'{pick()} {pick()} {pick()}',
+                      description=' '.join(pick() for _ in range(8)), is_public=rng.random() < 0.9,
+                      uploaded_at=now, video='uploads/a.mp4')
+                for i in range(start, min(start + 10000, count))
+        ])
+    # bulk_create sends no signals; fill the visibility table directly.
+    VideoVisibility.objects.all().delete()
+    VideoVisibility.objects.bulk_create([
+            VideoVisibility(viewer=None, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+            for video_id, creator_id, uploaded_at in
+            Video.objects.filter(is_public=True).values_list('id', 'creator_id', 'uploaded_at').iterator()
+    ], batch_size=10000)
+    private = list(Video.objects.filter(is_public=False).values_list('id', 'creator_id', 'uploaded_at')[:1000])
+    Shared.objects.bulk_create([Shared(video_id=video_id, user=user) for video_id, _, _ in private])
+    VideoVisibility.objects.bulk_create([
+            VideoVisibility(viewer=user, creator_id=creator_id, video_id=video_id, uploaded_at=uploaded_at)
+            for video_id, creator_id, uploaded_at in private
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create(username='viewer', email='viewer@test.com')
+        User.objects.bulk_create([User(username=f'creator{i}', email=f'creator{i}@test.com') for i in range(100)])
+        anonymous = AnonymousUser()
+        total = 0
+        print(f"{'query':<12} {'videos':>8} {'anonymous (ms)':>15} {'user (ms)':>10} {'results':>8}")
+        for rows in sorted(args.rows):
+            add_videos(rows - total, user)
+            total = rows
+            for name, query in QUERIES:
+                anonymous_time, results = best_of(args.repeat, lambda: search.search(query, anonymous))
+                user_time, _ = best_of(args.repeat, lambda: search.search(query, user))
+                print(f'{name:<12} {rows:>8} {anonymous_time * 1000:>15.2f} {user_time * 1000:>10.2f} {len(results):>8}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+'''
+Benchmarks the compiled read path (utils/compiled.py) against plain DRF
+rendering of list endpoints.
+
+Objects are built in memory (no database access), so only serialization
+is measured.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_serializers [--rows 1000 10000] [--repeat 3]
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from types import SimpleNamespace
+from apps.users.models import User
+from apps.users.serializers import UserSerializer
+from apps.videos.models import Video
+from apps.videos.serializers import VideoReadSerializer
+from apps.videos import likes
+from apps.friendships.models import FriendshipEdge
+from apps.friendships.serializers import AcceptedFriendshipSerializer
+
+def make_users(rows):
+    return [User(id=i, username=f'user{i}', email=f'user{i}@test.com') for i in range(1, rows + 1)]
+
+def make_videos(rows):
+    creators = make_users(50)
+    now = timezone.now()
+    return [
+            Video(id=i, creator=creators[i % 50], video_name=f'Video {i}',
+                  description='A clip', is_public=True, uploaded_at=now)
+            for i in range(1, rows + 1)
+    ]
+
+def make_friendships(rows):
+    owner = User(id=1, username='owner')
+    now = timezone.now()
+    return [
+            FriendshipEdge(id=i, owner=owner, friend=User(id=i + 1, username=f'user{i + 1}'),
+                           friendship_id=i, status='accepted', since=now)
+            for i in range(1, rows + 1)
+    ]
+
+def stub_likes():
+    ''' Likes are read from the database; only serialization is measured. '''
+    likes.get_counts = lambda video_ids: dict.fromkeys(video_ids, 0)
+    likes.get_liked = lambda user, video_ids: set()
+
+def render(serializer_class, objects, context):
+    data = serializer_class(objects, many=True, context=dict(context)).data
+    return JSONRenderer().render(data)
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    stub_likes()
+
+    request = Request(APIRequestFactory().get('/', SERVER_NAME=settings.ALLOWED_HOSTS[0]))
+    context = {'request': request, 'view': SimpleNamespace(kwargs={'user_id': 1})}
+    cases = [
+            ('UserSerializer', UserSerializer, make_users),
+            ('VideoReadSerializer', VideoReadSerializer, make_videos),
+            ('AcceptedFriendshipSerializer', AcceptedFriendshipSerializer, make_friendships)
+    ]
+
+    print(f"{'serializer':<30} {'rows':>7} {'drf (ms)':>10} {'compiled (ms)':>14} {'speedup':>8}")
+    for name, serializer_class, factory in cases:
+        for rows in args.rows:
+            objects = factory(rows)
+            with override_settings(COMPILED_SERIALIZERS=False):
+                drf_time, drf_output = best_of(args.repeat, lambda: render(serializer_class, objects, context))
+            compiled_time, compiled_output = best_of(args.repeat, lambda: render(serializer_class, objects, context))
+            assert drf_output == compiled_output, f'{name}: compiled output differs from DRF'
+            print(f'{name:<30} {rows:>7} {drf_time * 1000:>10.1f} {compiled_time * 1000:>14.1f} '
+                  f'{drf_time / compiled_time:>7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+Benchmarks the computation of friend suggestions (apps/friendships/suggestions.py):
+the top candidates of every user of a random graph, from its CSR arrays.
+
+The graph is generated in memory (no database): --friendships random pairs
+of --users users, so every user has about 2 * friendships / users friends.
+Storing the suggestions isn't measured.
+
+Usage (from the repository root, with the usual environment variables set):
+    python -m benchmarks.bench_suggestions [--users 100000] [--friendships 1000000]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from array import array
+from apps.friendships import suggestions
+
+def make_graph(users, friendships):
+    ''' Returns the (offsets, neighbors) CSR arrays of random friendships. '''
+    rng = random.Random(0)
+    pairs = set()
+    while len(pairs) < friendships:
+        first, second = rng.randrange(users), rng.randrange(users)
+        if first != second:
+            pairs.add((min(first, second), max(first, second)))
+    rows = [[] for _ in range(users)]
+    for first, second in pairs:
+        rows[first].append(second)
+        rows[second].append(first)
+    offsets = array('q', [0])
+    neighbors = array('i')
+    for row in rows:
+        row.sort()
+        neighbors.extend(row)
+        offsets.append(len(neighbors))
+    return offsets, neighbors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--friendships', type=int, default=1000000)
+    args = parser.parse_args()
+
+    offsets, neighbors = make_graph(args.users, args.friendships)
+    limit, max_degree = suggestions.get_limit(), suggestions.get_max_degree()
+    start = time.perf_counter()
+    stored = 0
+    for user_id in range(args.users):
+        stored += len(suggestions.top_candidates(offsets, neighbors, user_id, (), limit, max_degree))
+    elapsed = time.perf_counter() - start
+    print(f'{args.friendships} friendships of {args.users} users: {stored} suggestions in {elapsed:.1f}s '
+          f'({elapsed / args.users * 1e6:.0f}µs per user)')
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,7 +38,41 @@ REST_FRAMEWORK = {
             'rest_framework.authentication.TokenAuthentication',
             'rest_framework.authentication.SessionAuthentication'
         ],
-        'URL_FIELD_NAME': 'self'
+        'URL_FIELD_NAME': 'self',
+        # Lists are paginated by keyset on the view's `ordering` (see utils/pagination.py)
+        'DEFAULT_PAGINATION_CLASS': 'utils.pagination.KeysetPagination',
+        'PAGE_SIZE': 50,
+        # JSON uses orjson when installed (see utils/renderers.py, utils/parsers.py)
+        'DEFAULT_RENDERER_CLASSES': [
+            'utils.renderers.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer'
+        ],
+        'DEFAULT_PARSER_CLASSES': [
+            'utils.parsers.FastJSONParser',
+            'rest_framework.parsers.FormParser',
+            'rest_framework.parsers.MultiPartParser'
+        ]
+}
+
+# application/msgpack is only offered when the msgpack package is installed
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('utils.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('utils.parsers.MessagePackParser')
+
+# Log queries that still run per row while serializing (see utils/query_planner.py)
+QUERY_PLANNER_DEBUG = False
+
+# Background jobs (see apps/jobs). Run workers with `manage.py runjobs`.
+
+JOBS = {
+        'QUEUES': {
+            'default': {'concurrency': None},
+            'media': {'concurrency': 2},
+            'feed': {'concurrency': None}
+        },
+        'LEASE_SECONDS': 60,
+        'HEARTBEAT_SECONDS': 20,
+        'RETRY_BACKOFF_SECONDS': 10
 }
 
 INSTALLED_APPS = [
@@ -49,6 +84,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
+    'apps.jobs',
     'apps.users',
     'apps.videos',
     #'apps.groups',
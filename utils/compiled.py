@@ -0,0 +1,248 @@
+from django.conf import settings
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from utils.serializers import BaseHyperlinkedSerializer
+from utils.fragments import FragmentCache, is_cacheable
+
+'''
+Compiled read path for serializers.
+
+DRF renders every row by looping over the serializer's fields, calling
+get_attribute/to_representation through several layers of indirection, and
+our method fields used to build a new nested serializer (and all of its
+fields) for every row. This module generates a plain Python function per
+serializer class (and set of fields) that renders a row with direct attribute
+access where the field's conversion is trivial, and the already-bound field
+objects otherwise. The output is identical to Serializer.to_representation.
+
+Usage:
+    - Set `list_serializer_class = CompiledListSerializer` in a serializer's Meta
+      to render its lists with the compiled function.
+    - Use render_nested() in SerializerMethodFields instead of instantiating a
+      nested serializer per row.
+    - Define `prepare_many(instances)` on a serializer to load what its method
+      fields need for a whole list (or page) in one query before it's rendered.
+
+Serializers that opt in to the fragment cache (see utils.fragments) are
+rendered from it, both as list items and as nested objects.
+
+Set COMPILED_SERIALIZERS = False in settings to fall back to plain DRF rendering.
+'''
+
+# Field classes whose to_representation is a plain conversion of the value.
+# Only exact classes are listed; subclasses may change the conversion.
+CONVERSIONS = {
+        serializers.IntegerField: 'int(value)',
+        serializers.CharField: 'str(value)',
+        serializers.BooleanField: 'bool(value)',
+        serializers.ReadOnlyField: 'value'
+}
+
+_compiled = {}
+
+def is_enabled():
+    return getattr(settings, 'COMPILED_SERIALIZERS', True)
+
+def is_compilable(serializer_class):
+    ''' Serializers with a custom to_representation can't be compiled. '''
+    return serializer_class.to_representation in (
+            serializers.Serializer.to_representation,
+            BaseHyperlinkedSerializer.to_representation
+    )
+
+def model_field_names(serializer):
+    meta = getattr(serializer, 'Meta', None)
+    model = getattr(meta, 'model', None)
+    if model is None:
+        return set()
+    return {field.name for field in model._meta.concrete_fields}
+
+def generate_source(serializer):
+    '''
+    Generates the source of the render function factory of a serializer.
+
+    Returns:
+        str: Source code defining make(fields, methods, PKOnlyObject, SkipField),
+             which returns a function rendering one instance.
+    '''
+    columns = model_field_names(serializer)
+    # Bound fields and methods are unpacked into closure variables of render().
+    header = ['def make(fields, methods, PKOnlyObject, SkipField):']
+    lines = [
+            '    def render(instance):',
+            '        ret = {}'
+    ]
+    for index, field in enumerate(serializer._readable_fields):
+        name = repr(field.field_name)
+        conversion = CONVERSIONS.get(type(field))
+        if isinstance(field, serializers.SerializerMethodField):
+            header.append(f'    method{index} = methods[{index}]')
+            lines.append(f'        ret[{name}] = method{index}(instance)')
+        elif isinstance(field, serializers.HyperlinkedIdentityField):
+            header.append(f'    field{index} = fields[{index}]')
+            lines.append(f'        ret[{name}] = field{index}.to_representation(instance)')
+        elif (conversion is not None and len(field.source_attrs) == 1 and
+                field.source_attrs[0] in columns):
+            lines += [
+                    f'        value = instance.{field.source_attrs[0]}',
+                    f'        ret[{name}] = None if value is None else {conversion}'
+            ]
+        else:
+            # Same steps as Serializer.to_representation.
+            header.append(f'    field{index} = fields[{index}]')
+            lines += [
+                    '        try:',
+                    f'            value = field{index}.get_attribute(instance)',
+                    '        except SkipField:',
+                    '            pass',
+                    '        else:',
+                    '            check = value.pk if isinstance(value, PKOnlyObject) else value',
+                    f'            ret[{name}] = None if check is None else field{index}.to_representation(value)'
+            ]
+    if type(serializer).to_representation is BaseHyperlinkedSerializer.to_representation:
+        for name in getattr(serializer.Meta, 'omit_if_none', ()):
+            lines += [
+                    f'        if ret.get({name!r}, 0) is None:',
+                    f'            del ret[{name!r}]'
+            ]
+    lines += [
+            '        return ret',
+            '    return render'
+    ]
+    return '\n'.join(header + lines) + '\n'
+
+def compile_factory(serializer):
+    '''
+    Returns the compiled render function factory of a serializer, compiling it
+    on first use. Factories are cached per class and set of readable fields.
+    '''
+    key = (type(serializer), tuple(field.field_name for field in serializer._readable_fields))
+    factory = _compiled.get(key)
+    if factory is None:
+        namespace = {}
+        source = generate_source(serializer)
+        exec(compile(source, f'<compiled {type(serializer).__name__}>', 'exec'), namespace)
+        factory = _compiled[key] = namespace['make']
+    return factory
+
+def compiled_renderer(serializer):
+    '''
+    Returns a function rendering instances the same way as serializer.to_representation.
+
+    The function reuses the serializer's bound fields, so it must only be used
+    while the serializer's context is valid (i.e. for one request).
+
+    Args:
+        serializer (Serializer): A bound serializer (not a ListSerializer).
+
+    Returns:
+        function: Takes an instance and returns its representation.
+    '''
+    if not is_enabled() or not is_compilable(type(serializer)):
+        return serializer.to_representation
+    fields = []
+    methods = []
+    for field in serializer._readable_fields:
+        fields.append(field)
+        methods.append(
+                getattr(serializer, field.method_name)
+                if isinstance(field, serializers.SerializerMethodField) else None
+        )
+    return compile_factory(serializer)(fields, methods, PKOnlyObject, SkipField)
+
+def nested_renderer(serializer_class, context):
+    '''
+    Returns the (template serializer, render function, FragmentCache or None)
+    of a nested serializer class, created once per context.
+    '''
+    renderers = context.setdefault('compiled_renderers', {})
+    entry = renderers.get(serializer_class)
+    if entry is None:
+        template = serializer_class(context=context)
+        fragments = FragmentCache(template) if is_cacheable(template) else None
+        entry = renderers[serializer_class] = (template, compiled_renderer(template), fragments)
+    return entry
+
+def render_nested(serializer_class, instance, context, many=False):
+    '''
+    Renders related object(s) with a serializer that is created once per context
+    (i.e. once per request) instead of once per row.
+
+    Produces the same output as serializer_class(instance, many=many, context=context).data.
+
+    Args:
+        serializer_class (Serializer class): The serializer for the related object(s).
+        instance: The related object, or an iterable of them if many is True.
+        context (dict): The context of the calling serializer.
+        many (bool, optional): Whether instance is an iterable of objects. Defaults to False.
+    '''
+    if not is_enabled():
+        return serializer_class(instance, many=many, context=context).data
+    template, render, fragments = nested_renderer(serializer_class, context)
+    if many:
+        if fragments is not None:
+            return fragments.render_many(instance, render)
+        return [render(item) for item in instance]
+    if instance is None:
+        # Matches Serializer.data for a missing instance.
+        return template.get_initial()
+    if fragments is not None:
+        prefetched = context.get('prefetched_fragments', {}).get(serializer_class, {})
+        if instance.pk in prefetched:
+            return prefetched[instance.pk]
+        return fragments.render_many([instance], render)[0]
+    return render(instance)
+
+def prefetch_nested(serializer, instances):
+    '''
+    Loads the cached fragments of the objects that the method fields of a
+    serializer render with render_nested (declared with @uses_related), for
+    all instances at once, instead of one cache lookup per row.
+    '''
+    context = serializer.context
+    for field in serializer._readable_fields:
+        if not isinstance(field, serializers.SerializerMethodField):
+            continue
+        method = getattr(type(serializer), field.method_name)
+        serializer_class = getattr(method, 'related_serializer', None)
+        if serializer_class is None:
+            continue
+        template, render, fragments = nested_renderer(serializer_class, context)
+        if fragments is None:
+            continue
+        related = {}
+        for path in method.related_paths:
+            if '__' in path:
+                # Only objects reached through one forward relation are prefetched.
+                continue
+            for instance in instances:
+                obj = getattr(instance, path, None)
+                if obj is not None and not isinstance(obj, models.Manager):
+                    related[obj.pk] = obj
+        objs = list(related.values())
+        prefetched = context.setdefault('prefetched_fragments', {}).setdefault(serializer_class, {})
+        for obj, representation in zip(objs, fragments.render_many(objs, render)):
+            prefetched[obj.pk] = representation
+
+class CompiledListSerializer(serializers.ListSerializer):
+    ''' ListSerializer that renders its items with the compiled function of its child. '''
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        items = list(iterable)
+        # Lets the child load what its fields need for the whole list at once.
+        prepare = getattr(self.child, 'prepare_many', None)
+        if prepare is not None:
+            prepare(items)
+        render = compiled_renderer(self.child)
+        if render == self.child.to_representation:
+            return [render(item) for item in items]
+        if is_cacheable(self.child):
+            return FragmentCache(self.child).render_many(
+                    items,
+                    render,
+                    before_render=lambda missed: prefetch_nested(self.child, missed)
+            )
+        prefetch_nested(self.child, items)
+        return [render(item) for item in items]
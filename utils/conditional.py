@@ -0,0 +1,156 @@
+from django.http import HttpResponseNotModified
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from utils.links import link_prefix
+from utils.generations import get_generation, viewer_class
+import hashlib
+
+'''
+Conditional requests (ETag, If-None-Match, If-Match).
+
+ETags are computed from the owner's generation (see utils/generations.py)
+and what else the representation depends on, without loading or rendering
+anything: an unchanged resource gets a 304 before serialization.
+
+    - Lists nested under a user send weak ETags (see CachedListMixin).
+    - Detail views using ConditionalDetailMixin send strong ETags, so that
+      clients can update with If-Match and get a 412 instead of overwriting
+      someone else's change. Their ETags are "<version>-<variant>": the
+      version changes with the object, the variant with the representation
+      (query string, link mode, media type, viewer). If-None-Match compares
+      the whole ETag, If-Match only the version, so an ETag read with
+      ?fields= or another media type still allows an update.
+    - Lists that don't belong to one user (feed, discover, search, history...)
+      can't be keyed by a generation. ConditionalListMixin sends a weak ETag
+      of their rendered body instead, which saves the transfer of an unchanged
+      page but not its computation.
+'''
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has changed since it was retrieved.'
+    default_code = 'precondition_failed'
+
+def digest(parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+def make_etag(parts, weak=False):
+    '''
+    Returns an ETag for a representation.
+
+    Args:
+        parts (tuple): Everything the representation depends on.
+        weak (bool, optional): Whether the ETag is weak. Defaults to False.
+    '''
+    return f'W/"{digest(parts)}"' if weak else f'"{digest(parts)}"'
+
+def none_match(request, etag):
+    ''' Whether If-None-Match matches the ETag (weak comparison), i.e. a 304 should be sent. '''
+    header = request.headers.get('If-None-Match')
+    if not header or etag is None:
+        return False
+    etags = parse_etags(header)
+    return etags == ['*'] or etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in etags)
+
+def version_match(request, version):
+    '''
+    Whether an If-Match precondition holds, comparing the version part of
+    strong "<version>-<variant>" ETags; True without the header.
+    '''
+    header = request.headers.get('If-Match')
+    if not header:
+        return True
+    if version is None:
+        return False
+    etags = parse_etags(header)
+    return etags == ['*'] or any(
+            not etag.startswith('W/') and etag.strip('"').split('-')[0] == version
+            for etag in etags
+    )
+
+def not_modified(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+class ConditionalDetailMixin:
+    '''
+    Detail view mixin answering If-None-Match on GET with a 304 and checking
+    If-Match on PUT/PATCH.
+
+    Attributes:
+        etag_owner_field (str): Attribute of the object holding its owner's id,
+            whose generation is bumped whenever the object's representation changes.
+    '''
+    etag_owner_field = 'creator_id'
+
+    def get_version(self, instance):
+        ''' Returns the version of an object (see the module docstring), or None if it has no owner. '''
+        owner_id = getattr(instance, self.etag_owner_field)
+        if owner_id is None:
+            return None
+        return digest((type(self).__name__, instance.pk, get_generation(owner_id)))[:16]
+
+    def get_etag(self, instance):
+        ''' Returns the ETag of an object's representation, or None if it has no owner. '''
+        version = self.get_version(instance)
+        if version is None:
+            return None
+        owner_id = getattr(instance, self.etag_owner_field)
+        variant = digest((
+                viewer_class(self.request, owner_id),
+                self.request.META.get('QUERY_STRING', ''),
+                link_prefix(self.request),
+                getattr(self.request, 'accepted_media_type', None),
+                *self.get_etag_generations(instance, owner_id)
+        ))[:16]
+        return f'"{version}-{variant}"'
+
+    def get_etag_generations(self, instance, owner_id):
+        ''' Returns the generations the representation depends on besides the owner's. None by default. '''
+        return ()
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(instance)
+        if none_match(request, etag):
+            return not_modified(etag)
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    def update(self, request, *args, **kwargs):
+        if 'If-Match' in request.headers and not version_match(request, self.get_version(self.get_object())):
+            raise PreconditionFailed()
+        response = super().update(request, *args, **kwargs)
+        etag = self.get_etag(self.updated_instance)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.updated_instance = serializer.instance
+
+class ConditionalListMixin:
+    '''
+    View mixin sending a weak ETag of the rendered body with successful GET
+    responses that don't have one, and a 304 when it matches If-None-Match.
+    See the module docstring.
+    '''
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (request.method not in ('GET', 'HEAD') or response.status_code != status.HTTP_200_OK
+                or response.streaming or response.has_header('ETag')):
+            return response
+        response.render()
+        etag = f'W/"{hashlib.md5(response.content).hexdigest()}"'
+        if none_match(request, etag):
+            # Already finalized: a DRF Response would need its renderer set again.
+            unchanged = HttpResponseNotModified()
+            unchanged['ETag'] = etag
+            return unchanged
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,85 @@
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+'''
+Consistency checks of derived tables (friendship edges, video visibility...).
+
+A derived table holds rows computed from source objects and is written with
+them, but changes that skip save() and signals (queryset.update(),
+bulk_create(), raw SQL) leave it stale. check_rows() compares it with the
+rows it should hold, a chunk of source objects at a time, and can rewrite
+the rows of the inconsistent ones. Rows of deleted sources can't exist
+(on_delete=CASCADE), so only the rows of existing sources are compared.
+
+CheckCommand is the base of the management commands running the checks.
+'''
+
+def check_rows(sources, expected_rows, actual_rows, rewrite, source_index, repair=False, chunk_size=1000):
+    '''
+    Compares a derived table with its sources and optionally repairs it.
+
+    Args:
+        sources (QuerySet): values_list() of the source objects, their id first.
+        expected_rows (callable): Returns the set of rows of a list of sources.
+        actual_rows (callable): Returns the stored rows of the sources with
+            ids between two bounds, inclusive.
+        rewrite (callable): Replaces the stored rows of a set of source ids
+            with the given rows. Ran in a transaction.
+        source_index (int): Position of the source id in rows.
+        repair (bool, optional): Whether to rewrite the rows of inconsistent
+            sources. Defaults to False.
+        chunk_size (int, optional): Sources compared at a time. Defaults to 1000.
+
+    Returns:
+        tuple: (missing, extra) numbers of rows.
+    '''
+    missing = extra = 0
+    last_id = 0
+    while True:
+        chunk = list(sources.filter(id__gt=last_id).order_by('id')[:chunk_size])
+        if not chunk:
+            break
+        first_id, last_id = chunk[0][0], chunk[-1][0]
+        expected = expected_rows(chunk)
+        actual = Counter(actual_rows(first_id, last_id))
+        # Duplicated rows count as extra.
+        wrong = [row for row, count in actual.items() if row not in expected or count > 1]
+        wrong += [row for row in expected if row not in actual]
+        missing += sum(1 for row in expected if row not in actual)
+        extra += sum(count - (row in expected) for row, count in actual.items())
+        if repair and wrong:
+            source_ids = {row[source_index] for row in wrong}
+            with transaction.atomic():
+                rewrite(source_ids, [row for row in expected if row[source_index] in source_ids])
+    return missing, extra
+
+class CheckCommand(BaseCommand):
+    '''
+    Base of the commands checking a derived table. Subclasses implement
+    check_table() (check() runs Django's system checks).
+
+    Attributes:
+        rows (str): What the rows are called, e.g. 'visibility rows'.
+        sources (str): What the sources are called, e.g. 'videos'.
+    '''
+    rows = 'rows'
+    sources = 'objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true',
+                            help=f'Rewrite the {self.rows} of inconsistent {self.sources}.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help=f'Number of {self.sources} compared at a time.')
+
+    def handle(self, *args, **options):
+        missing, extra = self.check_table(repair=options['repair'], chunk_size=options['chunk_size'])
+        if not missing and not extra:
+            self.stdout.write(f'The {self.rows} are consistent.')
+            return
+        action = 'Repaired' if options['repair'] else 'Found'
+        self.stdout.write(f'{action} {missing} missing and {extra} extra {self.rows}.')
+
+    def check_table(self, repair, chunk_size):
+        ''' Runs the check (see check_rows()) and returns its (missing, extra). '''
+        raise NotImplementedError
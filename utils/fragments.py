@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from rest_framework.fields import SkipField
+from rest_framework.relations import Hyperlink, PKOnlyObject
+from utils.links import link_prefix
+import hashlib
+import uuid
+
+'''
+Cache of rendered serializer fragments.
+
+The same objects (e.g. a user's card: self, id, username) are rendered over
+and over in lists. Serializers that opt in store their representation in the
+cache under a key made of:
+    - the serializer and what changes its output (rendered fields, link prefix)
+    - the object's pk
+    - the object's version, and the versions of the objects it embeds
+
+Versions are random tokens stored in the cache and replaced on post_save and
+post_delete of tracked models (see track()), so a change invalidates every
+fragment of the object without scanning keys. A list page costs two get_many
+calls: one for the versions, one for the fragments.
+
+Meta options of the serializer:
+    cache_fragments (bool): Opt in.
+    fragment_exclude (list of str): Fields rendered for every request and never
+        cached, e.g. fields whose value depends on who is asking.
+    fragment_depends_on (list of str): Forward relations whose version is part
+        of the key (their objects are embedded in the fragment by the field
+        of the same name). Ignored when that field isn't rendered.
+
+NOTE: queryset.update() and bulk operations don't send signals; fragments of
+objects changed that way stay cached until FRAGMENT_CACHE_TIMEOUT.
+
+Set FRAGMENT_CACHE = False in settings to disable the cache.
+'''
+
+def is_enabled():
+    return getattr(settings, 'FRAGMENT_CACHE', True)
+
+def get_timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+
+def is_cacheable(serializer):
+    return is_enabled() and getattr(getattr(serializer, 'Meta', None), 'cache_fragments', False)
+
+def version_key(model, pk):
+    return f'fragment-version:{model._meta.label_lower}:{pk}'
+
+def new_version():
+    return uuid.uuid4().hex[:12]
+
+def bump_version(model, pk):
+    cache.set(version_key(model, pk), new_version(), None)
+
+def on_change(sender, instance, **kwargs):
+    pk = instance.pk
+    bump_version(sender, pk)
+    # Bump again once the change is visible to other connections: a request
+    # that read the old row before the commit may have cached it under the
+    # first new version.
+    transaction.on_commit(lambda: bump_version(sender, pk))
+
+def track(model):
+    ''' Invalidates the fragments of a model's objects when they are saved or deleted. '''
+    label = model._meta.label_lower
+    post_save.connect(on_change, sender=model, dispatch_uid=f'fragments-save-{label}')
+    post_delete.connect(on_change, sender=model, dispatch_uid=f'fragments-delete-{label}')
+
+def get_versions(keys):
+    ''' Returns the current version of each key, creating missing versions. '''
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() doesn't overwrite a version set by a concurrent change.
+            cache.add(key, new_version(), None)
+            # A version that can't be read back never matches a fragment.
+            versions[key] = cache.get(key) or new_version()
+    return versions
+
+def plain(value):
+    ''' Converts a representation to plain dicts, lists and strings before caching it. '''
+    if isinstance(value, Hyperlink):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    return value
+
+class FragmentCache:
+    '''
+    The fragments of a bound serializer (i.e. for one request).
+
+    Args:
+        serializer (Serializer): A serializer whose Meta has cache_fragments = True.
+    '''
+    def __init__(self, serializer):
+        meta = serializer.Meta
+        self.model = meta.model
+        excluded = set(getattr(meta, 'fragment_exclude', ()))
+        readable = list(serializer._readable_fields)
+        self.names = [field.field_name for field in readable]
+        self.private = [field for field in readable if field.field_name in excluded]
+        self.omit_if_none = set(getattr(meta, 'omit_if_none', ())) & excluded
+        self.depends_on = [
+                (attr, self.model._meta.get_field(attr).related_model)
+                for attr in getattr(meta, 'fragment_depends_on', ())
+                if attr in self.names
+        ]
+        variant = repr((
+                type(serializer).__module__,
+                type(serializer).__qualname__,
+                self.names,
+                link_prefix(serializer.context.get('request'))
+        ))
+        digest = hashlib.md5(variant.encode()).hexdigest()[:12]
+        self.prefix = f'fragment:{type(serializer).__name__}:{digest}'
+
+    def version_keys(self, instance):
+        keys = [version_key(self.model, instance.pk)]
+        for attr, model in self.depends_on:
+            related = getattr(instance, attr)
+            keys.append(None if related is None else version_key(model, related.pk))
+        return keys
+
+    def render_many(self, instances, render, before_render=None):
+        '''
+        Renders instances from the cache, rendering and storing the misses.
+
+        Args:
+            instances (iterable): The objects (or rows) to render.
+            render (function): Renders one instance, e.g. a compiled renderer.
+            before_render (function, optional): Called with the list of missed
+                instances before they are rendered.
+
+        Returns:
+            list of dict: The representations, in the order of instances.
+        '''
+        instances = list(instances)
+        if not instances:
+            return []
+        instance_keys = [self.version_keys(instance) for instance in instances]
+        versions = get_versions({key for keys in instance_keys for key in keys if key is not None})
+        keys = [
+                '%s:%s:%s' % (self.prefix, instance.pk, '.'.join(
+                        '-' if key is None else versions[key] for key in version_keys
+                ))
+                for instance, version_keys in zip(instances, instance_keys)
+        ]
+        fragments = cache.get_many(keys)
+
+        missed = [instance for instance, key in zip(instances, keys) if key not in fragments]
+        if missed and before_render is not None:
+            before_render(missed)
+
+        excluded = {field.field_name for field in self.private}
+        representations = []
+        store = {}
+        for instance, key in zip(instances, keys):
+            fragment = fragments.get(key)
+            if fragment is None:
+                representation = render(instance)
+                store[key] = plain({
+                        name: value for name, value in representation.items()
+                        if name not in excluded
+                })
+            else:
+                representation = self.complete(fragment, instance)
+            representations.append(representation)
+        if store:
+            cache.set_many(store, get_timeout())
+        return representations
+
+    def complete(self, fragment, instance):
+        ''' Adds the excluded fields, rendered for this request, to a cached fragment. '''
+        if not self.private:
+            return dict(fragment)
+        live = {}
+        # Same steps as Serializer.to_representation.
+        for field in self.private:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            value = None if check is None else field.to_representation(attribute)
+            if value is None and field.field_name in self.omit_if_none:
+                continue
+            live[field.field_name] = value
+        return {
+                name: fragment[name] if name in fragment else live[name]
+                for name in self.names if name in fragment or name in live
+        }
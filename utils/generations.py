@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db import transaction
+import uuid
+
+'''
+Per-user generations.
+
+A user's generation is a random token stored in the cache. Signal receivers
+of the apps call bump_generation() whenever something shown in the user's
+lists or objects changes (videos, shares, friendships, groups, user cards).
+Anything keyed by the generation (cached responses, ETags) is invalidated by
+a single cache write.
+'''
+
+def generation_key(user_id):
+    return f'generation:{user_id}'
+
+def new_generation():
+    return uuid.uuid4().hex[:12]
+
+def get_generation(user_id):
+    ''' Returns the current generation of a user, creating it if missing. '''
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # add() doesn't overwrite a generation set by a concurrent change.
+        cache.add(key, new_generation(), None)
+        generation = cache.get(key) or new_generation()
+    return generation
+
+def bump_generation(*user_ids):
+    '''
+    Invalidates the cached responses of users, now and again once the current
+    transaction commits (a request that read the old rows before the commit
+    may have cached them under the intermediate generation).
+    '''
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    def bump():
+        cache.set_many({generation_key(user_id): new_generation() for user_id in user_ids}, None)
+    if user_ids:
+        bump()
+        transaction.on_commit(bump)
+
+def viewer_class(request, owner_id):
+    '''
+    Returns who is asking, as far as a representation of the owner's data
+    depends on it: users other than the owner may see different videos
+    (e.g. shared with them).
+    '''
+    user = request.user
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff:
+        # Representations may depend on the requester (e.g. whether they liked a video).
+        return f'staff:{user.id}'
+    if user.id == owner_id:
+        return 'owner'
+    return f'user:{user.id}'
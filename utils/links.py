@@ -0,0 +1,101 @@
+from django.urls import NoReverseMatch, get_script_prefix, get_urlconf, reverse
+from rest_framework import serializers
+from rest_framework.utils.mediatypes import _MediaType
+
+'''
+Hyperlinked fields that build their URLs with string operations.
+
+DRF's hyperlinked fields call reverse() (which walks the URL resolver) and
+request.build_absolute_uri() for every link of every row. The fields below
+reverse each view name once per process into a (head, tail) pair around the
+lookup value, and compute the scheme and host prefix once per request:
+
+    'video-detail' -> ('/videos/', '/')
+    prefix + head + str(pk) + tail -> 'http://host/videos/42/'
+
+The output is identical to DRF's fields. Links that can't be precompiled
+(non-integer lookup values, format suffixes, versioned requests) fall back to
+the DRF implementation.
+
+Clients may opt in to host-relative links ('/videos/42/'), which drop the
+repeated scheme and host from every link, with either:
+    - the query flag ?links=relative
+    - the Accept header parameter: Accept: application/json; links=relative
+Relative references resolve against the request URL (RFC 3986), so clients
+that follow links keep working.
+'''
+
+RELATIVE = 'relative'
+
+# Stands in for the lookup value while reversing a view's URL pattern.
+SENTINEL = 8081828384858687
+
+_templates = {}
+
+def url_template(view_name, lookup_url_kwarg):
+    '''
+    Returns the URL of a view split around its lookup value, or None if the
+    view's pattern can't be split.
+
+    Cached per view name, lookup kwarg, script prefix and urlconf.
+    '''
+    key = (view_name, lookup_url_kwarg, get_script_prefix(), get_urlconf())
+    if key not in _templates:
+        try:
+            url = reverse(view_name, kwargs={lookup_url_kwarg: SENTINEL})
+        except NoReverseMatch:
+            template = None
+        else:
+            parts = url.split(str(SENTINEL))
+            template = tuple(parts) if len(parts) == 2 else None
+        _templates[key] = template
+    return _templates[key]
+
+def wants_relative_links(request):
+    ''' Whether the request opted in to host-relative links (see the module docstring). '''
+    if request is None:
+        return True
+    query_params = getattr(request, 'query_params', None)
+    if query_params is not None and query_params.get('links') == RELATIVE:
+        return True
+    media_type = getattr(request, 'accepted_media_type', None)
+    return bool(media_type) and _MediaType(media_type).params.get('links') == RELATIVE
+
+def link_prefix(request):
+    '''
+    Returns the scheme and host prefixed to the links of a request, computed
+    once per request. Empty for relative links.
+    '''
+    if request is None:
+        return ''
+    prefix = getattr(request, '_link_prefix', None)
+    if prefix is None:
+        prefix = '' if wants_relative_links(request) else request.build_absolute_uri('/')[:-1]
+        request._link_prefix = prefix
+    return prefix
+
+class CachedUrlMixin:
+    ''' Replaces get_url of DRF's hyperlinked fields; see the module docstring. '''
+
+    def get_url(self, obj, view_name, request, format):
+        if format or getattr(request, 'versioning_scheme', None) is not None:
+            return super().get_url(obj, view_name, request, format)
+        if link_prefix(request) == '':
+            # DRF builds relative links when there is no request.
+            request = None
+
+        # Unsaved objects will not yet have a valid URL.
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+
+        lookup_value = getattr(obj, self.lookup_field)
+        template = url_template(view_name, self.lookup_url_kwarg)
+        if type(lookup_value) is not int or template is None:
+            return super().get_url(obj, view_name, request, format)
+        return link_prefix(request) + template[0] + str(lookup_value) + template[1]
+
+class CachedHyperlinkedRelatedField(CachedUrlMixin, serializers.HyperlinkedRelatedField):
+    pass
+
+class CachedHyperlinkedIdentityField(CachedUrlMixin, serializers.HyperlinkedIdentityField):
+    pass
@@ -0,0 +1,193 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from utils.links import link_prefix
+import base64
+import json
+
+'''
+Keyset (cursor) pagination.
+
+Lists are ordered by the view's `ordering`, a stable (timestamp, id) ordering
+backed by a composite index, e.g. ('-uploaded_at', '-id'). A page is the first
+rows after the last row of the previous page:
+
+    WHERE uploaded_at < :t OR (uploaded_at = :t AND id < :id)
+    ORDER BY uploaded_at DESC, id DESC LIMIT :page_size + 1
+
+There is no COUNT(*) and no OFFSET, so every page costs the same. The extra row
+tells whether there is a next page.
+
+The body of a response stays a plain list; the pages are linked in the Link
+header (RFC 8288), which follows the request's link mode (see utils.links):
+
+    Link: <http://host/users/1/videos/?cursor=...>; rel="next",
+          <http://host/users/1/videos/?cursor=...>; rel="prev"
+
+Clients choose the page size with ?page_size=, up to max_page_size.
+'''
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, fields):
+        '''
+        Returns the (values, reverse) of the request's cursor, or None on the first page.
+
+        Raises:
+            rest_framework.exceptions.NotFound: The cursor is malformed.
+        '''
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = [field.to_python(value) for field, value in zip(fields, cursor['v'], strict=True)]
+            return values, bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        return self.encode_values([getattr(row, name) for name in self.names], reverse)
+
+    def encode_values(self, values, reverse):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        data = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def after(self, values, reverse):
+        ''' Returns the filter selecting the rows after the given values in the ordering. '''
+        condition = Q()
+        for index, (name, descending) in enumerate(zip(self.names, self.descending)):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {self.names[i]: values[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[index]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = view.ordering
+        self.names = [name.lstrip('-') for name in ordering]
+        self.descending = [name.startswith('-') for name in ordering]
+        fields = [queryset.model._meta.get_field(name) for name in self.names]
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, fields)
+        reverse = cursor is not None and cursor[1]
+        if reverse:
+            queryset = queryset.order_by(*(
+                    name if descending else f'-{name}'
+                    for name, descending in zip(self.names, self.descending)
+            ))
+        else:
+            queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor[0], reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.rows = rows
+        return rows
+
+    def get_link(self, cursor):
+        url = link_prefix(self.request) + self.request.get_full_path()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_links(self):
+        links = []
+        if self.rows and self.has_next:
+            links.append(f'<{self.get_link(self.encode_cursor(self.rows[-1], False))}>; rel="next"')
+        if self.rows and self.has_previous:
+            links.append(f'<{self.get_link(self.encode_cursor(self.rows[0], True))}>; rel="prev"')
+        elif not self.rows and self.has_previous:
+            # Went past the last row (e.g. it was deleted): start over.
+            url = link_prefix(self.request) + self.request.get_full_path()
+            links.append(f'<{remove_query_param(url, self.cursor_query_param)}>; rel="first"')
+        return links
+
+    def get_paginated_response(self, data):
+        links = self.get_links()
+        return Response(data, headers={'Link': ', '.join(links)} if links else None)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+class EntryPagination(KeysetPagination):
+    '''
+    Keyset pagination of lists whose pages are computed outside of the queryset,
+    e.g. merged from several sources or read from a cached window.
+
+    get_entries() returns the entries of a page, tuples of the values of `names`
+    ending with the object's id, most recent first. The queryset only loads the
+    objects of the page (and drops those it filters out). Pages only link to the
+    next page.
+
+    Attributes:
+        names (list of str): Fields of the model the cursor holds, the last one being the id.
+        cursor_model (Model class, optional): The model of the cursor fields, when
+            entries come from another table than the queryset's. Defaults to the
+            queryset's model.
+    '''
+    names = ['id']
+    cursor_model = None
+
+    def get_entries(self, request, view, cursor, limit):
+        '''
+        Returns the entries of a page.
+
+        Args:
+            request (rest_framework.request.Request): The request.
+            view (rest_framework.views.APIView): The view.
+            cursor (tuple): The values of the last entry of the previous page,
+                or None on the first page.
+            limit (int): The maximum number of entries.
+        '''
+        raise NotImplementedError('subclasses of EntryPagination must provide a get_entries() method')
+
+    def get_cursor_fields(self, queryset):
+        ''' Returns the model fields the values of the cursor are parsed with. '''
+        model = self.cursor_model or queryset.model
+        return [model._meta.get_field(name) for name in self.names]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.descending = [True] * len(self.names)
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, self.get_cursor_fields(queryset))
+        if cursor is not None and cursor[1]:
+            raise NotFound(self.invalid_cursor_message)
+        entries = self.get_entries(request, view, cursor and tuple(cursor[0]), page_size + 1)
+        ids = [entry[-1] for entry in entries[:page_size]]
+
+        position = {pk: index for index, pk in enumerate(ids)}
+        self.rows = sorted(queryset.filter(pk__in=ids), key=lambda row: position[row.pk])
+        self.has_next, self.has_previous = len(entries) > page_size, False
+        # The next page starts after the last entry, even if its object was filtered out.
+        self.last_entry = entries[page_size - 1] if self.has_next else None
+        return self.rows
+
+    def get_links(self):
+        if self.last_entry is None:
+            return []
+        return [f'<{self.get_link(self.encode_values(self.last_entry, False))}>; rel="next"']
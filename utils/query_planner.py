@@ -0,0 +1,391 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Prefetch, QuerySet
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.mixins import ListModelMixin
+from rest_framework.permissions import SAFE_METHODS
+from utils.rows import values_rows
+from utils.serializers import FieldSelection, parse_names
+import functools
+import logging
+
+'''
+Plans select_related / prefetch_related / only() for a queryset from the
+serializer that will render it.
+
+The planner walks the serializer's fields:
+    - regular fields add their column (and join any forward relation in their source)
+    - hyperlinked/primary key related fields only need the foreign key column
+    - nested serializers are joined (forward relations) or prefetched (reverse
+      and many-to-many relations) and planned recursively
+    - SerializerMethodFields must declare what they read with @uses_related,
+      otherwise the planner can't know and leaves them unplanned
+
+EX:
+    class VideoReadSerializer(serializers.HyperlinkedModelSerializer):
+        creator = serializers.SerializerMethodField()
+
+        @uses_related('creator', serializer=UserSerializer)
+        def get_creator(self, obj):
+            ...
+
+    queryset = plan_serializer(VideoReadSerializer).apply(Video.objects.all())
+
+Set QUERY_PLANNER_DEBUG = True in settings to log every query that still runs
+while rendering (row-level queries the plan could not eliminate).
+'''
+
+logger = logging.getLogger(__name__)
+
+def uses_related(*relations, serializer=None, fields=()):
+    '''
+    Declares the relations (and plain columns) a SerializerMethodField getter reads.
+
+    Args:
+        *relations (str): Relation paths in queryset notation, e.g. 'creator' or 'shared_with__user'.
+        serializer (Serializer class, optional): The serializer the related objects are rendered with.
+            Used to plan the columns of the related model. When omitted, every column is loaded.
+        fields (iterable of str, optional): Plain columns of the object the getter reads.
+    '''
+    def decorator(method):
+        method.related_paths = relations
+        method.related_serializer = serializer
+        method.related_fields = tuple(fields)
+        return method
+    return decorator
+
+def resolve_path(model, attrs):
+    '''
+    Resolves a list of attribute names to model fields, following relations.
+
+    Returns:
+        list of django.db.models.Field or None: The field of each hop, or None if
+                                                an attribute isn't a model field.
+    '''
+    hops = []
+    for attr in attrs:
+        if model is None:
+            return None
+        try:
+            field = model._meta.pk if attr == 'pk' else model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        hops.append(field)
+        model = field.related_model if field.is_relation else None
+    return hops
+
+def flatten_select_related(tree, prefix=''):
+    ''' Yields the paths of a query's nested select_related dict. '''
+    for name, children in tree.items():
+        path = f'{prefix}__{name}' if prefix else name
+        yield path
+        yield from flatten_select_related(children, path)
+
+class QueryPlan:
+    '''
+    The relations and columns a serializer needs from a model.
+
+    Attributes:
+        model (django.db.models.Model): The model the plan is for.
+        select (set of str): Paths to load with select_related.
+        prefetch (dict): Maps prefetch lookups to (related model, QueryPlan) used to build its queryset.
+        only (set of str or None): Columns to load with only(). None if they couldn't all be determined.
+        unplanned (list of str): Fields whose data access couldn't be planned.
+    '''
+    def __init__(self, model):
+        self.model = model
+        self.select = set()
+        self.prefetch = {}
+        self.only = set()
+        self.unplanned = []
+
+    def add_column(self, path):
+        if self.only is not None:
+            self.only.add(path)
+
+    def load_everything(self, field_name):
+        ''' Gives up on only(), e.g. because a field reads a property. '''
+        self.only = None
+        self.unplanned.append(field_name)
+
+    def add_column_path(self, attrs, field_name=''):
+        '''
+        Plans a column reached through forward relations, e.g. ['creator', 'username'],
+        by joining the relations and loading only the column.
+        '''
+        hops = resolve_path(self.model, attrs)
+        if hops is None or any(field.one_to_many or field.many_to_many for field in hops):
+            self.load_everything(field_name)
+            return
+        for index in range(1, len(attrs)):
+            path = '__'.join(attrs[:index])
+            self.select.add(path)
+            self.add_column(path)
+        self.add_column('__'.join(attrs))
+
+    def add_relation(self, attrs, serializer_class=None, field_name=''):
+        '''
+        Plans the loading of a relation path and, optionally, the columns its
+        serializer needs.
+
+        Forward (many-to-one/one-to-one) hops are joined with select_related.
+        From the first reverse or many-to-many hop on, the rest of the path is
+        loaded with a single Prefetch whose queryset is planned recursively.
+        '''
+        hops = resolve_path(self.model, attrs)
+        if hops is None or not hops[-1].is_relation:
+            self.load_everything(field_name)
+            return
+
+        for index, field in enumerate(hops):
+            path = '__'.join(attrs[:index + 1])
+            if field.one_to_many or field.many_to_many:
+                related_model = field.related_model
+                subplan = QueryPlan(related_model)
+                if index + 1 < len(attrs):
+                    subplan.add_relation(attrs[index + 1:], serializer_class, field_name)
+                elif serializer_class is not None:
+                    subplan.merge(plan_serializer(serializer_class), '')
+                else:
+                    subplan.only = None
+                if field.one_to_many:
+                    # The prefetch joins back to the parent through this key.
+                    subplan.add_column(field.field.name)
+                self.prefetch[path] = (related_model, subplan)
+                return
+            self.select.add(path)
+            self.add_column(path)
+
+        path = '__'.join(attrs)
+        if serializer_class is None:
+            # Unknown usage of the related object: load all of its columns.
+            self.only = None
+        else:
+            self.merge(plan_serializer(serializer_class), path)
+
+    def merge(self, other, prefix):
+        ''' Merges the plan of a related model into this one under a path prefix. '''
+        def prefixed(path):
+            return f'{prefix}__{path}' if prefix else path
+
+        self.select.update(prefixed(path) for path in other.select)
+        for path, spec in other.prefetch.items():
+            self.prefetch[prefixed(path)] = spec
+        if other.only is None:
+            self.only = None
+        else:
+            for path in other.only:
+                self.add_column(prefixed(path))
+        self.unplanned.extend(prefixed(name) for name in other.unplanned)
+
+    def apply(self, queryset):
+        '''
+        Applies the plan to a queryset of the plan's model.
+
+        Returns:
+            QuerySet: The queryset with select_related, prefetch_related and only() applied.
+        '''
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        for lookup, (related_model, subplan) in sorted(self.prefetch.items()):
+            queryset = queryset.prefetch_related(Prefetch(
+                    lookup,
+                    queryset=subplan.apply(related_model._default_manager.all())
+            ))
+        if self.only is not None:
+            existing = queryset.query.select_related
+            if existing is True:
+                # select_related() with no arguments follows every foreign
+                # key, which can't be combined with only().
+                return queryset
+            # Relations the queryset already joins must not be deferred.
+            joined = set(flatten_select_related(existing)) if existing else set()
+            queryset = queryset.only(*sorted(self.only | self.select | joined))
+        return queryset
+
+    @property
+    def supports_rows(self):
+        '''
+        Whether the serializer can be fed from values_list() rows
+        (see utils.rows): every column is known and nothing is prefetched.
+        '''
+        return self.only is not None and not self.prefetch and not self.unplanned
+
+    def __repr__(self):
+        return '%s(%s, select=%r, prefetch=%r, only=%r)' % (
+                self.__class__.__name__,
+                self.model.__name__,
+                sorted(self.select),
+                sorted(self.prefetch),
+                None if self.only is None else sorted(self.only)
+        )
+
+@functools.lru_cache(maxsize=None)
+def plan_serializer(serializer_class, is_list=False, selection=None, columns=()):
+    '''
+    Builds the QueryPlan of a model serializer. Plans are cached per class,
+    list/detail use and field selection.
+
+    Args:
+        serializer_class (ModelSerializer class): The serializer rendering the queryset.
+        is_list (bool, optional): Plan for the fields rendered in lists
+            (see BaseHyperlinkedSerializer's Meta.expandable). Defaults to False.
+        selection (utils.serializers.FieldSelection, optional): The requested fields.
+            Defaults to None (the default fields).
+        columns (tuple of str, optional): Extra columns to load, e.g. the ones
+            the view orders by. Defaults to ().
+
+    Returns:
+        QueryPlan: The plan for the serializer's Meta.model.
+    '''
+    context = {} if selection is None else {'field_selection': selection}
+    serializer = serializer_class(many=is_list, context=context)
+    if is_list:
+        serializer = serializer.child
+    plan = QueryPlan(serializer_class.Meta.model)
+    for column in columns:
+        plan.add_column(column)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(serializer_class, field.method_name)
+            paths = getattr(method, 'related_paths', None)
+            if paths is None:
+                plan.load_everything(name)
+                continue
+            for path in paths:
+                plan.add_relation(path.split('__'), method.related_serializer, name)
+            for column in method.related_fields:
+                plan.add_column(column)
+        elif isinstance(field, serializers.HyperlinkedIdentityField):
+            plan.add_column(plan.model._meta.pk.name)
+        elif field.source == '*':
+            plan.load_everything(name)
+        elif isinstance(field, serializers.ManyRelatedField):
+            plan.add_relation(field.source_attrs, None, name)
+        elif isinstance(field, serializers.RelatedField):
+            # Related fields render from the foreign key alone; only hops
+            # before the key need to be joined.
+            plan.add_column_path(field.source_attrs, name)
+        elif isinstance(field, serializers.BaseSerializer):
+            child = getattr(field, 'child', field)
+            plan.add_relation(field.source_attrs, type(child), name)
+        else:
+            plan.add_column_path(field.source_attrs, name)
+    return plan
+
+@functools.lru_cache(maxsize=None)
+def readable_field_names(serializer_class):
+    ''' Returns the names of every field a serializer class can render. '''
+    return frozenset(
+            name for name, field in serializer_class().fields.items()
+            if not field.write_only
+    )
+
+def report_row_queries(serializer):
+    '''
+    Renders a serializer and logs every query ran while doing so.
+
+    A queryset instance is evaluated (including its prefetches) first, so that
+    only queries ran per row are reported.
+
+    Returns:
+        list of dict: The captured queries.
+    '''
+    instance = serializer.instance
+    if isinstance(instance, QuerySet):
+        len(instance)
+    with CaptureQueriesContext(connection) as context:
+        serializer.data
+    name = getattr(serializer, 'child', serializer).__class__.__name__
+    for query in context.captured_queries:
+        logger.warning('Unplanned query while rendering %s: %s', name, query['sql'])
+    return context.captured_queries
+
+class PlannedQuerysetMixin:
+    '''
+    View mixin that applies the serializer's QueryPlan to the view's queryset
+    on read requests, and selects the rendered fields from the ?fields= and
+    ?expand= query parameters (see utils.serializers).
+
+    Must come before the generic view in the bases so that its filter_queryset
+    runs on the result of the view's get_queryset.
+
+    Attributes:
+        values_rows (bool): Set on list-only views to read narrow values_list()
+            rows instead of model instances when the plan allows it (see utils.rows).
+            Must not be set on views that call get_object().
+    '''
+    values_rows = False
+
+    def is_list_request(self):
+        action = getattr(self, 'action', None)
+        if action is not None:
+            return action == 'list'
+        return isinstance(self, ListModelMixin)
+
+    def get_field_selection(self):
+        '''
+        Returns the FieldSelection of a read request, or None if it doesn't
+        select fields.
+
+        Raises:
+            rest_framework.serializers.ValidationError: A requested field doesn't exist.
+        '''
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        params = self.request.query_params
+        fields = parse_names(params.get('fields'))
+        expand = parse_names(params.get('expand')) or frozenset()
+        if fields is None and not expand:
+            return None
+
+        serializer_class = self.get_serializer_class()
+        available = readable_field_names(serializer_class)
+        errors = {}
+        for param, names in (('fields', fields or ()), ('expand', expand)):
+            unknown = sorted(set(names) - available)
+            if unknown:
+                errors[param] = [f"Unknown field(s): {', '.join(unknown)}"]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return FieldSelection(serializer_class, fields, expand)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        selection = self.get_field_selection()
+        if selection is not None:
+            context['field_selection'] = selection
+        return context
+
+    def get_query_plan(self):
+        # Paginators read the ordering columns of the rows.
+        ordering = tuple(name.lstrip('-') for name in getattr(self, 'ordering', None) or ())
+        return plan_serializer(
+                self.get_serializer_class(),
+                self.is_list_request(),
+                self.get_field_selection(),
+                ordering
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method in SAFE_METHODS and isinstance(queryset, QuerySet):
+            plan = self.get_query_plan()
+            if self.values_rows and plan.supports_rows:
+                queryset = values_rows(queryset, plan)
+            else:
+                queryset = plan.apply(queryset)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if (getattr(settings, 'QUERY_PLANNER_DEBUG', False) and
+                self.request.method in SAFE_METHODS and
+                serializer.instance is not None):
+            report_row_queries(serializer)
+        return serializer
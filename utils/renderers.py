@@ -0,0 +1,57 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+'''
+Renderers of the API's media types.
+
+    - FastJSONRenderer renders JSON with orjson when it's installed and falls
+      back to DRF's JSONRenderer (the stdlib encoder) otherwise, and whenever
+      orjson can't render the data as DRF would (indented output, unsupported
+      types).
+    - MessagePackRenderer renders application/msgpack for clients that ask for
+      it with the Accept header. It requires the msgpack package, and is only
+      registered in REST_FRAMEWORK when it's installed.
+
+Both fall back on DRF's JSONEncoder for values they don't know natively
+(dates, decimals, lazy strings, ...), so every format renders the same data.
+
+See benchmarks/bench_renderers.py.
+'''
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes go through the encoder, which formats them like DRF.
+            ret = orjson.dumps(
+                    data,
+                    default=self.encoder_class().default,
+                    option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped for JavaScript, like JSONRenderer does.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = JSONRenderer.encoder_class
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encoder_class().default, use_bin_type=True)
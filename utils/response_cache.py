@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from utils.conditional import make_etag, none_match, not_modified
+from utils.fragments import plain
+from utils.generations import get_generation, viewer_class
+from utils.links import link_prefix
+import hashlib
+import time
+
+'''
+Response cache for lists nested under a user (their videos, friends and
+private groups).
+
+Responses are cached under a key made of:
+    (endpoint, owner id, viewer class, query string, link prefix, owner generation)
+
+The owner's generation (see utils/generations.py) changes whenever something
+shown in the owner's lists changes, which orphans every cached response of
+the owner at once: there are no keys to scan or delete.
+
+Concurrent misses of the same key are single-flighted: the first request
+takes a lock (cache.add) and renders, the others wait for its result.
+
+Settings:
+    RESPONSE_CACHE (bool): Enables the cache. Defaults to True.
+    RESPONSE_CACHE_TIMEOUT (int): Seconds a response is kept. Defaults to 600.
+'''
+
+# How long a recomputation may hold the lock, and how long others wait for it.
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 5
+LOCK_POLL = 0.05
+
+# Response headers cached along with the data.
+CACHED_HEADERS = ['Link']
+
+def is_enabled():
+    return getattr(settings, 'RESPONSE_CACHE', True)
+
+def get_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 600)
+
+def get_or_compute(key, compute, timeout):
+    '''
+    Returns the cached value of a key, or computes and caches it. Only one
+    caller computes a missing key at a time; the others wait for its result
+    (up to LOCK_WAIT seconds, after which they compute it themselves).
+    '''
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if time.monotonic() > deadline:
+            return compute()
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    finally:
+        cache.delete(lock_key)
+    return value
+
+class CachedListMixin:
+    '''
+    View mixin caching the data of list responses of views nested under a user
+    (with a 'user_id' url kwarg). See the module docstring.
+
+    Responses carry a weak ETag derived from the cache key, so a client sending
+    it back in If-None-Match gets a 304 without anything being loaded or
+    rendered (see utils/conditional.py).
+    '''
+    def get_response_cache_key(self):
+        owner_id = self.kwargs['user_id']
+        variant = repr((
+                self.request.META.get('QUERY_STRING', ''),
+                link_prefix(self.request)
+        ))
+        digest = hashlib.md5(variant.encode()).hexdigest()[:12]
+        return 'response:%s:%s:%s:%s:%s' % (
+                type(self).__name__,
+                owner_id,
+                viewer_class(self.request, owner_id),
+                digest,
+                get_generation(owner_id)
+        )
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_response_cache_key()
+        etag = make_etag(key, weak=True)
+        if none_match(request, etag):
+            return not_modified(etag)
+        render = super().list
+
+        def compute():
+            response = render(request, *args, **kwargs)
+            # The Link header holds the pagination links.
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            return {'data': plain(response.data), 'headers': headers}
+
+        if is_enabled():
+            cached = get_or_compute(key, compute, get_timeout())
+        else:
+            cached = compute()
+        return Response(cached['data'], headers={**cached['headers'], 'ETag': etag})
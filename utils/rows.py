@@ -0,0 +1,157 @@
+from django.db.models.query import ValuesListIterable
+
+'''
+Narrow row objects for read-only list endpoints.
+
+Building model instances costs a lot per row (signals, field descriptors,
+state objects) and loads columns nobody renders. For list views whose
+QueryPlan knows every column it needs (see utils.query_planner), the
+queryset is turned into a values_list() query over exactly those columns
+(joined through forward relations), and every tuple is wrapped in a small
+__slots__ object exposing the same attributes the serializer reads:
+
+    Video.objects.filter(...) -> values_list('id', 'video_name', 'creator',
+                                             'creator__id', 'creator__username', ...)
+    row.video_name, row.creator.username, row.creator.pk, row.pk
+
+A related object is None when its foreign key is NULL, like a model instance.
+
+The result is still a QuerySet, so it can be sliced, paginated and iterated
+with iterator().
+'''
+
+class Row:
+    '''
+    Base class of the generated row classes. Rows mimic the parts of a model
+    instance that serializers use: attributes, pk and serializable_value()
+    (used by related fields to read the foreign key).
+    '''
+    __slots__ = ()
+
+    def serializable_value(self, name):
+        value = getattr(self, name)
+        return value.pk if isinstance(value, Row) else value
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self.pk)
+
+class RowIterable(ValuesListIterable):
+    ''' Yields rows built by the class' build function instead of tuples. '''
+    build = None
+
+    def __iter__(self):
+        build = self.build
+        for values in super().__iter__():
+            yield build(values)
+
+_iterables = {}
+
+def build_tree(model, paths):
+    '''
+    Groups column paths by the object they belong to.
+
+    Returns:
+        dict: Node with 'model', 'columns' (attribute -> path), 'relations'
+              (attribute -> child node) and, for related nodes, 'key' (the
+              foreign key path).
+    '''
+    def node(model, key=None):
+        return {'model': model, 'columns': {}, 'relations': {}, 'key': key}
+
+    root = node(model)
+    for path in paths:
+        attrs = path.split('__')
+        current = root
+        for index, attr in enumerate(attrs):
+            opts = current['model']._meta
+            field = opts.pk if attr == 'pk' else opts.get_field(attr)
+            if field.is_relation:
+                key = '__'.join(attrs[:index + 1])
+                current = current['relations'].setdefault(attr, node(field.related_model, key))
+            elif index == len(attrs) - 1:
+                current['columns'][attr] = path
+    return root
+
+def generate_source(root):
+    '''
+    Generates the source of the classes' constructors and the build function.
+
+    Returns:
+        tuple: (source, list of (class name, attribute names), list of value paths)
+    '''
+    paths = []
+    classes = []
+
+    def index_of(path):
+        if path not in paths:
+            paths.append(path)
+        return paths.index(path)
+
+    def expression(node, pk_expr):
+        class_index = len(classes)
+        name = f"{node['model'].__name__}Row"
+        attrs = list(node['columns']) + [attr for attr in node['relations'] if attr not in node['columns']]
+        classes.append((name, attrs))
+        args = [pk_expr]
+        for attr in attrs:
+            if attr in node['relations']:
+                child = node['relations'][attr]
+                key = f"values[{index_of(child['key'])}]"
+                args.append(f'(None if {key} is None else {expression(child, key)})')
+            else:
+                args.append(f"values[{index_of(node['columns'][attr])}]")
+        return f"class{class_index}({', '.join(args)})"
+
+    pk_name = root['model']._meta.pk.name
+    pk_expr = f"values[{index_of(root['columns'].get(pk_name, pk_name))}]"
+    build = expression(root, pk_expr)
+
+    lines = []
+    for class_index, (name, attrs) in enumerate(classes):
+        params = ', '.join(['pk'] + attrs)
+        lines.append(f'def init{class_index}(self, {params}):')
+        lines.append('    self.pk = pk')
+        lines += [f'    self.{attr} = {attr}' for attr in attrs]
+    lines.append('def build(values):')
+    lines.append(f'    return {build}')
+    return '\n'.join(lines) + '\n', classes, paths
+
+def row_iterable(model, paths):
+    '''
+    Returns the iterable class and value paths building rows for the given
+    column paths of a model. Cached per (model, paths).
+    '''
+    key = (model, tuple(paths))
+    if key not in _iterables:
+        root = build_tree(model, paths)
+        # The primary key is always selected so that rows can be linked to.
+        root['columns'].setdefault(model._meta.pk.name, model._meta.pk.name)
+        source, classes, value_paths = generate_source(root)
+
+        namespace = {}
+        exec(compile(source, f'<rows {model.__name__}>', 'exec'), namespace)
+        for class_index, (name, attrs) in enumerate(classes):
+            namespace[f'class{class_index}'] = type(name, (Row,), {
+                    '__slots__': ('pk', *attrs),
+                    '__init__': namespace[f'init{class_index}']
+            })
+        iterable = type('RowIterable', (RowIterable,), {'build': staticmethod(namespace['build'])})
+        _iterables[key] = (iterable, value_paths)
+    return _iterables[key]
+
+def values_rows(queryset, plan):
+    '''
+    Turns a queryset into a values_list() queryset yielding rows with the
+    columns of a plan.
+
+    Args:
+        queryset (QuerySet): A queryset of plan.model.
+        plan (utils.query_planner.QueryPlan): A plan whose supports_rows is True.
+
+    Returns:
+        QuerySet: A queryset yielding Row objects.
+    '''
+    iterable, paths = row_iterable(queryset.model, sorted(plan.only))
+    queryset = queryset.values_list(*paths)
+    queryset._iterable_class = iterable
+    return queryset
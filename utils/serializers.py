@@ -0,0 +1,84 @@
+from collections import namedtuple
+from rest_framework import serializers
+from utils.links import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+
+'''
+Base serializer of the project and sparse fieldsets.
+
+Clients choose the fields of a response with query parameters:
+    ?fields=self,video_name   Only render these fields.
+    ?expand=shared_with       Also render fields that lists leave out by default
+                              (see Meta.expandable below).
+
+Views put a FieldSelection in the serializer context (see
+utils.query_planner.PlannedQuerysetMixin), and the query plan is built for
+the selected fields, so relations of unrequested fields are never joined or
+prefetched.
+'''
+
+class FieldSelection(namedtuple('FieldSelection', ['serializer_class', 'fields', 'expand'])):
+    '''
+    The fields requested for a serializer class.
+
+    Attributes:
+        serializer_class (Serializer class): The serializer the selection applies to.
+            Nested serializers sharing the context aren't affected.
+        fields (frozenset of str or None): The fields to render. None for the default fields.
+        expand (frozenset of str): Expandable fields to render in lists.
+    '''
+    def applies_to(self, serializer):
+        return type(serializer) is self.serializer_class
+
+def parse_names(value):
+    '''
+    Parses a comma separated query parameter.
+
+    Returns:
+        frozenset of str or None: The names, or None if the parameter is missing or empty.
+    '''
+    names = frozenset(name.strip() for name in (value or '').split(',') if name.strip())
+    return names or None
+
+class BaseHyperlinkedSerializer(serializers.HyperlinkedModelSerializer):
+    '''
+    Base class for hyperlinked model serializers of the project.
+
+    Links are built with the cached fields of utils.links. The fields rendered
+    follow the FieldSelection in the context, if any (see the module docstring).
+
+    Supports these extra Meta options:
+        expandable (list of str): Fields that aren't rendered in lists unless
+            requested with ?expand= (or ?fields=). Used to keep list output
+            short, e.g. members of a group are only listed on its detail view.
+        omit_if_none (list of str): Fields left out of the representation
+            when their value is None.
+
+    NOTE: utils.compiled relies on this being the only change to
+    to_representation. Subclasses that override to_representation are
+    rendered with the regular (slower) DRF path.
+    '''
+    serializer_url_field = CachedHyperlinkedIdentityField
+    serializer_related_field = CachedHyperlinkedRelatedField
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get('field_selection')
+        if selection is None or not selection.applies_to(self):
+            selection = FieldSelection(type(self), None, frozenset())
+
+        if selection.fields is not None:
+            for name in list(fields):
+                if name not in selection.fields and name not in selection.expand:
+                    del fields[name]
+        elif isinstance(self.parent, serializers.ListSerializer):
+            for name in getattr(self.Meta, 'expandable', ()):
+                if name not in selection.expand:
+                    fields.pop(name, None)
+        return fields
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        for name in getattr(self.Meta, 'omit_if_none', ()):
+            if name in rep and rep[name] is None:
+                del rep[name]
+        return rep
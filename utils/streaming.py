@@ -0,0 +1,99 @@
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+import itertools
+
+'''
+Streaming list responses for complete dumps (e.g. every video of a user).
+
+Paginated lists are built in memory one page at a time, which suits clients
+browsing a list but not staff or bulk clients that want all of it. With
+?stream=json (a JSON array) or ?stream=ndjson (one JSON object per line),
+StreamingListMixin iterates the queryset with iterator(chunk_size=...)
+instead: each chunk is rendered by the view's serializer, encoded and
+written out before the next one is fetched, so memory stays flat whatever
+the size of the list.
+
+Streamed responses skip pagination and the response cache, and are only
+available to stream_permission_classes (staff by default).
+'''
+
+STREAM_FORMATS = {
+        'json': 'application/json',
+        'ndjson': 'application/x-ndjson'
+}
+
+encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+def chunks(iterable, size):
+    ''' Yields lists of up to size items of an iterable. '''
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def stream_items(items, stream_format):
+    '''
+    Yields the encoded chunks of a stream of representations.
+
+    Args:
+        items (iterable of dict): The representations.
+        stream_format (str): 'json' for a JSON array, 'ndjson' for newline delimited JSON.
+    '''
+    if stream_format == 'ndjson':
+        for item in items:
+            yield encoder.encode(item) + '\n'
+        return
+    separator = '['
+    for item in items:
+        yield separator + encoder.encode(item)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+class StreamingListMixin:
+    '''
+    List view mixin streaming the whole list when ?stream=json or ?stream=ndjson
+    is requested (see the module docstring). Must come before CachedListMixin
+    in the bases so that streams aren't cached.
+
+    Attributes:
+        stream_chunk_size (int): Rows fetched and rendered at a time.
+        stream_permission_classes (list): Permissions required to stream.
+    '''
+    stream_chunk_size = 500
+    stream_permission_classes = [permissions.IsAdminUser]
+    stream_query_param = 'stream'
+
+    def get_stream_format(self):
+        stream_format = self.request.query_params.get(self.stream_query_param)
+        if stream_format is None:
+            return None
+        if stream_format not in STREAM_FORMATS:
+            raise ValidationError({self.stream_query_param: [
+                    f"Unknown format, expected one of: {', '.join(STREAM_FORMATS)}"
+            ]})
+        return stream_format
+
+    def check_stream_permissions(self, request):
+        for permission in (permission_class() for permission_class in self.stream_permission_classes):
+            if not permission.has_permission(request, self):
+                self.permission_denied(request, message=getattr(permission, 'message', None))
+
+    def iter_representations(self, queryset):
+        ''' Yields the representation of every object of the queryset, one chunk at a time. '''
+        ordering = getattr(self, 'ordering', None)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        for chunk in chunks(queryset.iterator(chunk_size=self.stream_chunk_size), self.stream_chunk_size):
+            yield from self.get_serializer(chunk, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format()
+        if stream_format is None:
+            return super().list(request, *args, **kwargs)
+        self.check_stream_permissions(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+                stream_items(self.iter_representations(queryset), stream_format),
+                content_type=STREAM_FORMATS[stream_format]
+        )
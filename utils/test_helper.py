@@ -235,6 +235,28 @@ class TestHelper:
         )
         return video
 
+    def create_video(self, creator, video_name=None, description='', is_public=True):
+        '''
+        Creates a video object pointing at a file name, without storing a file.
+
+        Args:
+            creator (apps.users.models.User): The creator of the video.
+            video_name (str, optional): The name of the video. Defaults to 'Video <n>'.
+            description (str, optional): The description of the video. Defaults to ''.
+            is_public (bool, optional): Whether the video should be visible to the public. Defaults to True.
+
+        Returns:
+            apps.videos.models.Video: The Video object
+        '''
+        self.video_count += 1
+        return Video.objects.create(
+                video_name=video_name or "Video " + str(self.video_count),
+                description=description,
+                creator=creator,
+                video='uploads/test.mp4',
+                is_public=is_public
+        )
+
     def share_video_with_user(self, video, user):
         '''
         Shares a video with a user.